@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文提取基准测试
+对比旧版 fetch() 的提取流程（extract 两次 + extract_metadata，每次各自解析 HTML）
+与单次解析流水线的单页耗时，并校验标题和正文逐字一致
+
+不指定页面时生成不同大小的合成文章页；也可以传入保存的 HTML 文件或目录
+
+使用方法:
+    python bench_extract.py
+    python bench_extract.py --sizes 50,200,1000 --repeat 10
+    python bench_extract.py saved_pages/ article.html --include-links
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(bench_dir), "scripts"))
+
+from extraction import FORMATS, extract_page
+
+
+def legacy_extract(downloaded: str, output_format: str, include_links: bool, include_images: bool) -> dict:
+    """旧版 fetch() 的提取部分"""
+    import trafilatura
+    output_format_map = {
+        "markdown": "xml",
+        "text": "txt",
+        "html": "html",
+    }
+    fmt = output_format_map.get(output_format, "xml")
+    content = trafilatura.extract(
+        downloaded,
+        output_format=fmt,
+        include_links=include_links,
+        include_images=include_images,
+        include_tables=True,
+    )
+    metadata = trafilatura.metadata.extract_metadata(downloaded)
+    title = metadata.title if metadata else ""
+    if output_format == "markdown":
+        content = trafilatura.extract(
+            downloaded,
+            output_format="txt",
+            include_links=include_links,
+            include_images=include_images,
+            include_tables=True,
+        )
+    elif output_format == "text":
+        content = trafilatura.extract(
+            downloaded,
+            output_format="txt",
+            include_links=False,
+            include_images=False,
+            include_tables=True,
+        )
+    elif output_format == "html":
+        content = trafilatura.extract(
+            downloaded,
+            output_format="html",
+            include_links=include_links,
+            include_images=include_images,
+            include_tables=True,
+        )
+    return {"title": title or "", "content": content or ""}
+
+
+WORDS = (
+    "data model search index latency cache request server client page result query engine "
+    "network parser token stream batch worker thread process memory buffer queue window"
+).split()
+
+
+def synthetic_page(size_kb: int, seed: int = 0) -> str:
+    """生成约 size_kb KB 的文章页：元数据、导航、正文段落（含链接和强调）、表格、侧栏和页脚"""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        if rng.random() < 0.3:
+            i = rng.randrange(len(words))
+            words[i] = f'<a href="/wiki/{words[i]}">{words[i]}</a>'
+        if rng.random() < 0.2:
+            i = rng.randrange(len(words))
+            words[i] = f"<strong>{words[i]}</strong>"
+        return " ".join(words).capitalize() + "."
+
+    nav = "".join(f'<li><a href="/section/{w}">{w}</a></li>' for w in WORDS)
+    head = (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>Benchmark article {seed}</title>"
+        f'<meta property="og:title" content="Benchmark article {seed}">'
+        '<meta name="author" content="Jane Doe">'
+        '<meta property="article:published_time" content="2024-05-01T08:00:00Z">'
+        "</head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header><main><article>"
+        f"<h1>Benchmark article {seed}</h1>"
+    )
+    tail = (
+        "</article></main>"
+        f"<aside><ul>{nav}</ul></aside>"
+        "<footer><p>Copyright 2024 Example Inc. All rights reserved.</p></footer></body></html>"
+    )
+
+    parts = [head]
+    size = len(head) + len(tail)
+    section = 0
+    while size < size_kb * 1024:
+        section += 1
+        block = [f"<h2>Section {section}</h2>"]
+        for _ in range(rng.randint(3, 6)):
+            block.append("<p>" + " ".join(sentence() for _ in range(rng.randint(3, 7))) + "</p>")
+        if section % 4 == 0:
+            rows = "".join(
+                f"<tr><td>{rng.choice(WORDS)}</td><td>{rng.randint(1, 999)}</td></tr>" for _ in range(5)
+            )
+            block.append(f"<table><tr><th>name</th><th>value</th></tr>{rows}</table>")
+        html = "".join(block)
+        parts.append(html)
+        size += len(html)
+    parts.append(tail)
+    return "".join(parts)
+
+
+def load_pages(paths: list, sizes: list) -> list:
+    """返回 [(名称, HTML)]"""
+    if not paths:
+        return [(f"synthetic-{size}kb", synthetic_page(size, seed=size)) for size in sizes]
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.htm*"))))
+        else:
+            files.append(path)
+    pages = []
+    for path in files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def timed(func, repeat: int) -> float:
+    """返回单次平均耗时（毫秒）"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="正文提取基准测试")
+    parser.add_argument(
+        "pages",
+        nargs="*",
+        help="HTML 文件或目录，不指定时使用合成文章页"
+    )
+    parser.add_argument(
+        "--sizes",
+        default="20,100,500",
+        help="合成页面的大小（KB），逗号分隔 (默认: 20,100,500)"
+    )
+    parser.add_argument(
+        "-f", "--format",
+        choices=FORMATS,
+        default="markdown",
+        help="单格式对比使用的输出格式 (默认: markdown)"
+    )
+    parser.add_argument(
+        "-l", "--include-links",
+        action="store_true",
+        help="保留链接"
+    )
+    parser.add_argument(
+        "-i", "--include-images",
+        action="store_true",
+        help="保留图片"
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        type=int,
+        default=5,
+        help="每个页面重复提取次数 (默认: 5)"
+    )
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, [int(s) for s in args.sizes.split(",") if s.strip()])
+    if not pages:
+        parser.error("没有可用的页面")
+
+    links, images = args.include_links, args.include_images
+    report = []
+    for name, html in pages:
+        # 单一格式：旧版三次解析 vs 单次解析
+        legacy = legacy_extract(html, args.format, links, images)
+        page = extract_page(html, [args.format], links, images)
+        identical = (page["title"], page["contents"][args.format]) == (legacy["title"], legacy["content"])
+        legacy_ms = timed(lambda: legacy_extract(html, args.format, links, images), args.repeat)
+        single_ms = timed(lambda: extract_page(html, [args.format], links, images), args.repeat)
+
+        # 全部格式：旧版每种格式各调用一次 vs 一次解析输出全部格式
+        page = extract_page(html, FORMATS, links, images)
+        for fmt in FORMATS:
+            identical = identical and page["contents"][fmt] == legacy_extract(html, fmt, links, images)["content"]
+        legacy_all_ms = timed(lambda: [legacy_extract(html, fmt, links, images) for fmt in FORMATS], args.repeat)
+        multi_ms = timed(lambda: extract_page(html, FORMATS, links, images), args.repeat)
+
+        report.append({
+            "page": name,
+            "size_kb": round(len(html.encode("utf-8")) / 1024, 1),
+            "legacy_ms": round(legacy_ms, 2),
+            "single_pass_ms": round(single_ms, 2),
+            "speedup": round(legacy_ms / single_ms, 1) if single_ms else None,
+            "legacy_all_formats_ms": round(legacy_all_ms, 2),
+            "single_pass_all_formats_ms": round(multi_ms, 2),
+            "all_formats_speedup": round(legacy_all_ms / multi_ms, 1) if multi_ms else None,
+            "identical": identical,
+        })
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not all(item["identical"] for item in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
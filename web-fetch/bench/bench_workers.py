@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量抓取提取进程数基准测试
+本地 HTTP 服务提供合成文章页（可配置延迟），用不同的 --workers 批量抓取同一组 URL，
+对比吞吐量（页/秒），并校验各配置的输出一致
+
+workers 为 0 时在本进程的线程池中提取（受 GIL 限制），作为对照；
+耗时包含提取进程的启动和预热，与命令行批量模式一致
+
+使用方法:
+    python bench_workers.py
+    python bench_workers.py --workers 0,1,2,4,8 --pages 400 --size 100
+    python bench_workers.py --latency 50 --concurrency 32
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, bench_dir)
+sys.path.insert(0, os.path.join(os.path.dirname(bench_dir), "scripts"))
+
+from batch_fetch import abatch_fetch
+from bench_extract import synthetic_page
+
+
+class PageServer:
+    """在后台线程中运行的合成页面服务，/page/<n> 返回第 n % variants 个页面"""
+
+    def __init__(self, size_kb: int, variants: int = 8, latency: float = 0.0):
+        """
+        Args:
+            size_kb: 页面大小（KB）
+            variants: 不同页面的数量
+            latency: 每个请求的延迟（毫秒）
+        """
+        self.latency = latency
+        self.pages = [synthetic_page(size_kb, seed=i).encode("utf-8") for i in range(variants)]
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                try:
+                    body = server.pages[int(self.path.rsplit("/", 1)[-1]) % len(server.pages)]
+                except ValueError:
+                    self.send_error(404)
+                    return
+                if server.latency:
+                    time.sleep(server.latency / 1000)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def run(urls: list, workers: int, concurrency: int, output_format: str) -> tuple:
+    """批量抓取一次，返回 (耗时秒数, 按 index 排序的结果)"""
+    out = io.StringIO()
+    start = time.perf_counter()
+    asyncio.run(abatch_fetch(
+        urls,
+        output_format=output_format,
+        concurrency=concurrency,
+        per_host=concurrency,
+        cache=False,
+        out=out,
+        workers=workers,
+    ))
+    elapsed = time.perf_counter() - start
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    records.sort(key=lambda r: r["index"])
+    return elapsed, [(r.get("title"), r.get("content"), r.get("error")) for r in records]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量抓取提取进程数基准测试")
+    parser.add_argument(
+        "--workers",
+        default="0,1,2,4,8",
+        help="要对比的提取进程数，逗号分隔，0 表示线程池 (默认: 0,1,2,4,8)"
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=200,
+        help="抓取的页面数 (默认: 200)"
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=100,
+        help="合成页面大小（KB）(默认: 100)"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="每个请求的服务端延迟（毫秒）(默认: 0)"
+    )
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=16,
+        help="同时下载的 URL 数 (默认: 16)"
+    )
+    parser.add_argument(
+        "-f", "--format",
+        default="markdown",
+        help="输出格式 (默认: markdown)"
+    )
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+    report = []
+    with PageServer(args.size, latency=args.latency) as server:
+        urls = [f"{server.base_url}/page/{i}" for i in range(args.pages)]
+        baseline, expected = None, None
+        for workers in worker_counts:
+            elapsed, results = run(urls, workers, args.concurrency, args.format)
+            if expected is None:
+                expected = results
+            baseline = baseline or elapsed
+            report.append({
+                "workers": workers,
+                "mode": "process" if workers > 0 else "thread",
+                "seconds": round(elapsed, 2),
+                "pages_per_second": round(args.pages / elapsed, 1),
+                "speedup": round(baseline / elapsed, 2),
+                "errors": sum(1 for r in results if r[2]),
+                "identical": results == expected,
+            })
+
+    print(json.dumps({
+        "cpu_count": os.cpu_count(),
+        "pages": args.pages,
+        "size_kb": args.size,
+        "latency_ms": args.latency,
+        "concurrency": args.concurrency,
+        "results": report,
+    }, ensure_ascii=False, indent=2))
+    if not all(item["identical"] and not item["errors"] for item in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+批量抓取
+逐行读取 URL，用 asyncio 并发流式下载（共享 httpx 连接池，复用连接，大小和内容类型检查见 download），
+原始字节交给进程池中预热过的提取进程（已导入 trafilatura），提取不受 GIL 限制、不阻塞下载；
+结果经有界队列交给输出协程，每完成一个 URL 立即输出一行 NDJSON（按完成顺序，包含输入序号 index）；
+同一 URL 在输入中重复出现且仍在处理中时只下载和提取一次，各自输出一行
+
+并发控制:
+    全局并发     同时下载的 URL 数
+    单主机并发   同一主机同时下载的 URL 数
+    主机间隔     同一主机相邻两次请求开始的最小间隔（礼貌延迟）
+    提取进程     并行提取正文的进程数，0 表示在本进程的线程池中提取
+
+内存有界：输入再长，同时驻留的 URL 不超过全局并发的 WINDOW_FACTOR 倍，
+主机状态在该主机没有进行中或排队的请求时释放
+"""
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+
+import page_cache
+from download import DownloadError, aread, decode_html, default_max_bytes, sniff_charset
+from extraction import FORMATS, extract_page, page_record
+
+
+# 默认全局并发数
+DEFAULT_CONCURRENCY = 16
+
+# 默认单主机并发数
+DEFAULT_PER_HOST = 2
+
+# 默认同一主机相邻请求的间隔（秒）
+DEFAULT_HOST_DELAY = 0.0
+
+# 单个 URL 的默认时限（秒），与 trafilatura 的默认下载超时一致
+DEFAULT_TIMEOUT = 30.0
+
+# 默认提取进程数
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# 同时驻留的 URL 数为全局并发的倍数：等待单主机名额的 URL 不占用下载名额，
+# 其他主机的 URL 可以越过它们先下载
+WINDOW_FACTOR = 4
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+class HostLimiter:
+    """
+    按主机限制并发和请求间隔
+
+    每个名额在请求开始 delay 秒后才归还（请求更早结束时延迟归还，不占用调用方），
+    因此同一主机每 delay 秒最多开始 per_host 个请求
+    """
+
+    def __init__(self, per_host: int = DEFAULT_PER_HOST, delay: float = DEFAULT_HOST_DELAY):
+        self.per_host = max(1, per_host)
+        self.delay = max(0.0, delay)
+        # 主机 -> [信号量, 持有或等待名额的请求数]
+        self._hosts: Dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._hosts)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str):
+        """占用主机的一个名额"""
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._leave(host, entry)
+            raise
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            yield
+        finally:
+            left = started + self.delay - loop.time()
+            if left > 0:
+                loop.call_later(left, self._release, host, entry)
+            else:
+                self._release(host, entry)
+
+    def _release(self, host: str, entry: list):
+        entry[0].release()
+        self._leave(host, entry)
+
+    def _leave(self, host: str, entry: list):
+        entry[1] -= 1
+        if entry[1] == 0 and self._hosts.get(host) is entry:
+            del self._hosts[host]
+
+
+class Downloader:
+    """共享连接池的异步下载器，受全局并发和单主机并发约束"""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, per_host: int = DEFAULT_PER_HOST,
+                 host_delay: float = DEFAULT_HOST_DELAY, timeout: float = DEFAULT_TIMEOUT,
+                 client=None, max_bytes: int = None):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_bytes = max_bytes or default_max_bytes()
+        self.hosts = HostLimiter(per_host, host_delay)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError("批量模式需要 httpx，请运行: pip install httpx")
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        return self._client
+
+    async def download(self, url: str, headers: dict = None):
+        """
+        流式下载页面，先占用主机名额再占用全局名额（等待主机名额时不占用全局名额）
+
+        Args:
+            headers: 额外的请求头，如条件请求头
+
+        Returns:
+            download.Download
+
+        Raises:
+            asyncio.TimeoutError: 超过 timeout 秒（从开始请求时计时，不含排队时间）
+            DownloadError: 内容不是 HTML 或超过 max_bytes，连接已关闭
+        """
+        async with self.hosts.slot(urlsplit(url).netloc.lower()):
+            async with self._semaphore:
+                return await asyncio.wait_for(self._stream(url, headers), self.timeout)
+
+    async def _stream(self, url: str, headers: dict = None):
+        async with self.client.stream("GET", url, headers=headers) as response:
+            return await aread(response.status_code, response.headers, response.aiter_bytes(), self.max_bytes)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+
+# 提取进程启动时提取一次的页面，预先加载 trafilatura、lxml 和正则等缓存
+_WARMUP_HTML = (
+    "<html><head><title>warmup</title></head><body><article><h1>warmup</h1>"
+    + "<p>Warm up the extraction worker before the first real page arrives.</p>" * 10
+    + "</article></body></html>"
+)
+
+
+def _init_worker():
+    """提取进程的初始化函数"""
+    extract_page(_WARMUP_HTML, FORMATS)
+
+
+def _ping() -> int:
+    """空任务，用于在下载期间提前启动全部提取进程"""
+    return os.getpid()
+
+
+def extract_body(body: bytes, charset, formats: List[str], include_links: bool,
+                 include_images: bool):
+    """
+    解码并提取正文，在提取进程中执行（参数和返回值都可以 pickle）
+
+    Args:
+        body: 原始响应体
+        charset: 下载时探测到的字符集，为 None 时从响应体探测，仍探测不到时由 trafilatura 猜测
+    """
+    html = decode_html(body, charset or sniff_charset(body))
+    return extract_page(html, formats, include_links, include_images)
+
+
+def make_executor(workers: int, threads: int = DEFAULT_CONCURRENCY):
+    """
+    创建提取用的执行器
+
+    Args:
+        workers: 提取进程数，0 表示在本进程中用 threads 个线程提取（受 GIL 限制，适合不便使用多进程的环境）
+    """
+    if workers <= 0:
+        return ThreadPoolExecutor(max_workers=threads, thread_name_prefix="extract")
+    # 事件循环所在进程已有多个线程，fork 不安全
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker)
+
+
+def _write_line(out, record: dict):
+    """输出一行 NDJSON 并立即刷新，便于下游流式消费"""
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+async def abatch_fetch(lines: Iterable[str], output_format: str = "markdown",
+                       include_links: bool = False, include_images: bool = False,
+                       formats: List[str] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                       per_host: int = DEFAULT_PER_HOST, host_delay: float = DEFAULT_HOST_DELAY,
+                       timeout: float = DEFAULT_TIMEOUT, cache: bool = True, out=None,
+                       downloader: Downloader = None, max_bytes: int = None,
+                       workers: int = DEFAULT_WORKERS) -> int:
+    """
+    批量抓取，每完成一个 URL 立即输出一行 NDJSON（按完成顺序，包含输入序号 index）
+
+    Args:
+        lines: 可迭代的 URL 文本行，空行和 # 开头的行会被跳过
+        output_format: 输出格式
+        include_links: 是否保留链接
+        include_images: 是否保留图片
+        formats: 同时输出的多种格式
+        concurrency: 全局并发数
+        per_host: 单主机并发数
+        host_delay: 同一主机相邻请求开始的最小间隔（秒）
+        timeout: 单个 URL 的时限（秒），从开始下载时计时，不含排队时间
+        cache: 是否使用网页缓存（见 page_cache）
+        max_bytes: 单个页面的最大字节数，为 None 时读取 WEB_FETCH_MAX_BYTES（见 download）
+        workers: 提取进程数，0 表示在本进程的线程池中提取
+        out: 输出流，默认为 stdout
+        downloader: 自定义下载器
+
+    Returns:
+        处理的 URL 数
+    """
+    out = out or sys.stdout
+    formats = list(dict.fromkeys([output_format, *(formats or [])]))
+    downloader = downloader or Downloader(concurrency, per_host, host_delay, timeout, max_bytes=max_bytes)
+    loop = asyncio.get_running_loop()
+    # 正文提取是 CPU 密集型操作，放到进程池中，不受 GIL 限制，也不阻塞下载
+    executor = make_executor(workers, downloader.concurrency)
+    if workers > 0:
+        # 提取进程启动和预热（导入 trafilatura）与最早的下载同时进行
+        warmup = [loop.run_in_executor(executor, _ping) for _ in range(workers)]
+    else:
+        warmup = []
+    store = None
+    if cache:
+        try:
+            store = page_cache.get_cache()
+        except (sqlite3.Error, OSError):
+            pass
+    key = page_cache.extraction_key(include_links, include_images)
+    window = downloader.concurrency * WINDOW_FACTOR
+    # 有界队列：内存中最多只有 2 * window 个待处理 URL
+    queue = asyncio.Queue(maxsize=window * 2)
+    # 有界结果队列：输出跟不上时（如下游管道读取缓慢）反压下载和提取
+    results = asyncio.Queue(maxsize=window)
+    iterator = iter(lines)
+    count = 0
+
+    async def produce():
+        nonlocal count
+        while True:
+            # 逐行读取可能阻塞（如 stdin），放到线程中执行
+            line = await asyncio.to_thread(next, iterator, None)
+            if line is None:
+                break
+            url = line.strip()
+            if not url or url.startswith("#"):
+                continue
+            await queue.put((count, url))
+            count += 1
+        for _ in range(window):
+            await queue.put(None)
+
+    # URL -> 处理中的任务，重复的 URL 共用同一次下载和提取
+    inflight: Dict[str, asyncio.Future] = {}
+
+    async def process(url: str) -> dict:
+        entry, meta = None, {"status": "bypass" if store is None else "miss"}
+
+        def failure(message: str) -> dict:
+            # 出错的记录与成功的记录一样带 cache 字段
+            return {"error": message, "url": url, "content": "", "cache": meta}
+
+        if not url.startswith(("http://", "https://")):
+            return failure("URL 需以 http:// 或 https:// 开头")
+        # 缓存的读写、压缩、哈希和解压都在线程中执行，大页面也不会阻塞其他 URL 的下载
+        if store is not None:
+            try:
+                entry = await asyncio.to_thread(store.get, url)
+            except (sqlite3.Error, OSError) as e:
+                meta = {"status": "error", "error": str(e)}
+
+        if entry is not None and entry.fresh:
+            # 沿用提取结果时无需解压页面
+            body, charset, meta = None, None, {"status": "hit"}
+        else:
+            try:
+                response = await downloader.download(url, entry.conditional_headers() if entry else None)
+            except asyncio.TimeoutError:
+                return failure(f"下载超时 ({downloader.timeout:g}s)")
+            except DownloadError as e:
+                return failure(str(e))
+            except Exception as e:
+                return failure(f"无法下载网页: {e}")
+            status = response.status
+            if status not in (200, 304) or (status == 304 and entry is None):
+                return failure(f"无法下载网页: HTTP {status}")
+            body, charset = response.body, response.charset
+            if store is not None:
+                try:
+                    body, entry, state = await asyncio.to_thread(
+                        page_cache.revalidate, store, url, entry, status, response.headers, response.body
+                    )
+                    meta = {"status": state}
+                    if body is not response.body:
+                        # 304：沿用缓存的页面，重新探测字符集
+                        charset = None
+                except (sqlite3.Error, OSError) as e:
+                    entry, meta = None, {"status": "error", "error": str(e)}
+        if entry is not None:
+            meta["age"] = round(entry.age, 1)
+
+        # 内容未变时沿用上次的提取结果
+        page = entry.extraction(key, formats) if entry is not None else None
+        if page is not None:
+            meta["extraction"] = "reused"
+        else:
+            try:
+                if body is None:
+                    body = await asyncio.to_thread(getattr, entry, "body")
+                page = await loop.run_in_executor(
+                    executor, extract_body, body, charset, formats, include_links, include_images
+                )
+            except Exception as e:
+                return failure(str(e))
+            meta["extraction"] = "extracted"
+            if page is not None and store is not None:
+                try:
+                    await asyncio.to_thread(store.save_extraction, url, key, page)
+                except (sqlite3.Error, OSError):
+                    pass
+        return {**page_record(url, page, output_format, formats), "cache": meta}
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, url = item
+            started = time.perf_counter()
+            shared = inflight.get(url)
+            if shared is None:
+                shared = inflight[url] = asyncio.ensure_future(process(url))
+                shared.add_done_callback(lambda _, url=url: inflight.pop(url, None))
+            record = await shared
+            fetch_ms = round((time.perf_counter() - started) * 1000, 1)
+            await results.put({"index": index, **record, "fetch_ms": fetch_ms})
+
+    async def write():
+        while True:
+            record = await results.get()
+            if record is None:
+                return
+            # 写输出可能阻塞（管道已满），放到线程中执行
+            await asyncio.to_thread(_write_line, out, record)
+
+    writer = asyncio.create_task(write())
+    workers = asyncio.gather(produce(), *(work() for _ in range(window)))
+    try:
+        # 输出出错（如下游管道已关闭）时写出协程提前结束，此时结果队列不再被消费，
+        # 不能继续等待下载协程（它们会阻塞在已满的结果队列上）
+        done, _ = await asyncio.wait({workers, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if writer in done:
+            writer.result()
+            raise RuntimeError("输出协程意外结束")
+        await workers
+        await results.put(None)
+        await writer
+    finally:
+        writer.cancel()
+        workers.cancel()
+        await asyncio.gather(workers, writer, return_exceptions=True)
+        await downloader.aclose()
+        await asyncio.gather(*warmup, return_exceptions=True)
+        executor.shutdown(wait=False, cancel_futures=True)
+    return count
+
+
+def batch_fetch(source: str, **options) -> int:
+    """
+    批量抓取的同步入口
+
+    Args:
+        source: URL 文件路径，"-" 表示从 stdin 读取
+        **options: abatch_fetch 的参数
+
+    Returns:
+        处理的 URL 数
+    """
+    if source == "-":
+        return asyncio.run(abatch_fetch(sys.stdin, **options))
+    with open(source, encoding="utf-8") as f:
+        return asyncio.run(abatch_fetch(f, **options))
@@ -0,0 +1,364 @@
+"""
+流式下载
+边下载边检查，不会把误链的 PDF、视频等大文件整个读入内存:
+
+    响应头      Content-Type 不是 HTML，或 Content-Length 超过上限时立即中止，不读响应体
+    首个数据块  没有可用的 Content-Type 时按文件头识别 PDF、图片、压缩包、音视频等二进制内容
+    读取过程    累计字节数（解压后）超过上限时立即中止
+
+同时在前 PRESCAN_BYTES 字节内增量探测字符集（BOM、Content-Type 的 charset、<meta charset>），
+探测到后整页一次解码，不再交给 trafilatura 对全文做编码猜测
+
+环境变量:
+    WEB_FETCH_MAX_BYTES   单个页面的最大字节数 (默认: 20000000，与 trafilatura 的 MAX_FILE_SIZE 一致)
+"""
+import codecs
+import os
+import re
+import time
+from typing import AsyncIterator, Iterable, Mapping, Optional, Union
+
+
+# 单个页面的默认最大字节数
+DEFAULT_MAX_BYTES = 20_000_000
+
+# 在前多少字节内查找 <meta charset>
+PRESCAN_BYTES = 4096
+
+# 可以提取正文的 Content-Type
+HTML_TYPES = {"text/html", "application/xhtml+xml"}
+
+# 不足以判断内容类型的 Content-Type，需要再看文件头
+GENERIC_TYPES = {"", "application/octet-stream", "binary/octet-stream", "application/unknown"}
+
+# 常见二进制文件的文件头
+_MAGIC = (
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"\x89PNG", "image/png"),
+    (b"GIF8", "image/gif"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"RIFF", "audio/video (RIFF)"),
+    (b"OggS", "audio/ogg"),
+    (b"ID3", "audio/mpeg"),
+    (b"\x1a\x45\xdf\xa3", "video/webm"),
+)
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([a-zA-Z0-9_.:\-]+)""", re.IGNORECASE)
+
+# 按 WHATWG 编码标准，这些标签实际按其超集解码
+_CHARSET_ALIASES = {
+    "ascii": "cp1252",
+    "latin-1": "cp1252",
+    "iso8859-1": "cp1252",
+    "gb2312": "gb18030",
+    "gbk": "gb18030",
+}
+
+
+class DownloadError(Exception):
+    """下载被中止"""
+
+
+class UnsupportedContent(DownloadError):
+    """不是 HTML 页面"""
+
+
+class TooLarge(DownloadError):
+    """页面超过大小上限"""
+
+
+def default_max_bytes() -> int:
+    """环境变量 WEB_FETCH_MAX_BYTES 指定的大小上限"""
+    try:
+        return int(float(os.getenv("WEB_FETCH_MAX_BYTES", DEFAULT_MAX_BYTES)))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def _header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    return value
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """Content-Type 中的媒体类型，如 text/html"""
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def normalize_charset(name) -> Optional[str]:
+    """规范化字符集名称，Python 不支持时返回 None"""
+    if isinstance(name, bytes):
+        name = name.decode("ascii", "ignore")
+    try:
+        name = codecs.lookup(name.strip()).name
+    except (LookupError, ValueError):
+        return None
+    return _CHARSET_ALIASES.get(name, name)
+
+
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    """Content-Type 中的 charset 参数"""
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return normalize_charset(value.strip().strip('"\''))
+    return None
+
+
+def check_headers(headers: Mapping[str, str], max_bytes: int):
+    """
+    根据响应头决定是否继续读取
+
+    Raises:
+        UnsupportedContent: Content-Type 不是 HTML
+        TooLarge: Content-Length 超过上限
+    """
+    kind = media_type(_header(headers, "Content-Type"))
+    if kind not in HTML_TYPES and kind not in GENERIC_TYPES:
+        raise UnsupportedContent(f"不是 HTML 页面: {kind}")
+    length = _header(headers, "Content-Length")
+    # 压缩传输时 Content-Length 是压缩后的大小，解压后只会更大
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise TooLarge(f"页面超过大小上限: {int(length)} > {max_bytes} 字节")
+
+
+def check_magic(head: bytes):
+    """
+    按文件头识别二进制内容
+
+    Raises:
+        UnsupportedContent: 已知的二进制文件，或开头出现 NUL 字节
+    """
+    for magic, kind in _MAGIC:
+        if head.startswith(magic):
+            raise UnsupportedContent(f"不是 HTML 页面: {kind}")
+    if head[4:8] == b"ftyp":
+        raise UnsupportedContent("不是 HTML 页面: video/mp4")
+    if not head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)) and b"\x00" in head[:1024]:
+        raise UnsupportedContent("不是 HTML 页面: 二进制内容")
+
+
+class CharsetSniffer:
+    """
+    增量探测字符集，优先级: BOM > Content-Type 的 charset > 前 PRESCAN_BYTES 字节内的 <meta charset>
+
+    每收到一个数据块调用 feed()，探测有结果或已看完前 PRESCAN_BYTES 字节后不再缓存数据
+    """
+
+    def __init__(self, content_type: Optional[str] = None):
+        self.charset: Optional[str] = None
+        self.done = False
+        self._declared = header_charset(content_type)
+        self._prefix = b""
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        if self.done:
+            return self.charset
+        self._prefix += chunk[:PRESCAN_BYTES - len(self._prefix)]
+        if len(self._prefix) < 3 and len(self._prefix) < PRESCAN_BYTES and chunk:
+            # 还不足以判断 BOM
+            return None
+
+        for bom, charset in _BOMS:
+            if self._prefix.startswith(bom):
+                return self._decide(charset)
+        if self._declared:
+            return self._decide(self._declared)
+        match = _META_CHARSET_RE.search(self._prefix)
+        if match and normalize_charset(match.group(1)):
+            return self._decide(normalize_charset(match.group(1)))
+        if len(self._prefix) >= PRESCAN_BYTES:
+            return self._decide(None)
+        return None
+
+    def close(self) -> Optional[str]:
+        """数据读完，给出最终结果"""
+        if not self.done:
+            self.feed(b"")
+            self._decide(self.charset)
+        return self.charset
+
+    def _decide(self, charset: Optional[str]) -> Optional[str]:
+        self.charset = charset
+        self.done = True
+        self._prefix = b""
+        return charset
+
+
+def sniff_charset(body: bytes, content_type: Optional[str] = None) -> Optional[str]:
+    """探测完整响应体的字符集"""
+    sniffer = CharsetSniffer(content_type)
+    sniffer.feed(body[:PRESCAN_BYTES])
+    return sniffer.close()
+
+
+def decode_html(body: bytes, charset: Optional[str]) -> Union[str, bytes]:
+    """
+    按探测到的字符集解码；没有探测结果时原样返回字节，由 trafilatura 猜测编码
+    """
+    if not charset:
+        return body
+    return body.decode(charset, errors="replace")
+
+
+class Download:
+    """下载结果"""
+
+    def __init__(self, status: int, headers: Mapping[str, str], body: bytes, charset: Optional[str]):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.charset = charset
+
+    @property
+    def html(self) -> Union[str, bytes]:
+        """交给提取器的 HTML"""
+        return decode_html(self.body, self.charset)
+
+
+class BodyReader:
+    """逐块读取响应体并执行检查，同步和异步下载共用"""
+
+    def __init__(self, status: int, headers: Mapping[str, str], max_bytes: int = None):
+        self.status = status
+        self.headers = headers
+        self.max_bytes = max_bytes or default_max_bytes()
+        self.content_type = _header(headers, "Content-Type")
+        self.sniffer = CharsetSniffer(self.content_type)
+        self._buffer = bytearray()
+        if status == 200:
+            check_headers(headers, self.max_bytes)
+
+    @property
+    def wanted(self) -> bool:
+        """是否需要读取响应体（只有 200 的响应体会被提取）"""
+        return self.status == 200
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        if not self._buffer and media_type(self.content_type) in GENERIC_TYPES:
+            check_magic(chunk)
+        if len(self._buffer) + len(chunk) > self.max_bytes:
+            raise TooLarge(f"页面超过大小上限: {self.max_bytes} 字节")
+        self._buffer += chunk
+        self.sniffer.feed(chunk)
+
+    def finish(self) -> Download:
+        body = bytes(self._buffer)
+        self._buffer = bytearray()
+        return Download(self.status, self.headers, body, self.sniffer.close())
+
+
+_pool = None
+
+# 同步下载使用的请求头
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Encoding": "gzip,deflate",
+}
+
+# 连接失败时的重试次数（已发出的请求不重试）、退避基数秒数和最多跟随的重定向次数
+CONNECT_RETRIES = 2
+RETRY_BACKOFF = 0.5
+MAX_REDIRECTS = 5
+
+
+def _open(url: str, headers: Mapping[str, str], timeout: float, deadline: float):
+    """
+    发出请求并返回未读取响应体的响应，连接失败时在 deadline 前按退避重试
+
+    由这里而不是 urllib3 重试连接错误：urllib3 的每次重试都重新计算超时，总耗时可能是 timeout 的数倍
+    """
+    import urllib3
+    from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError
+
+    global _pool
+    if _pool is None:
+        _pool = urllib3.PoolManager()
+    # total=None 时各项计数分别生效（设置 total 会覆盖 redirect 等更大的次数）
+    retries = urllib3.Retry(total=None, connect=0, read=0, status=0, other=0, redirect=MAX_REDIRECTS)
+    attempt = 0
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise DownloadError(f"下载超时 ({timeout:g}s)")
+        try:
+            return _pool.request(
+                "GET", url,
+                headers=headers,
+                timeout=urllib3.Timeout(total=left),
+                retries=retries,
+                preload_content=False,
+            )
+        except MaxRetryError as e:
+            if attempt >= CONNECT_RETRIES or not isinstance(e.reason, (NewConnectionError, ConnectTimeoutError)):
+                raise
+        delay = RETRY_BACKOFF * 2 ** attempt
+        if time.monotonic() + delay >= deadline:
+            raise DownloadError(f"下载超时 ({timeout:g}s)")
+        attempt += 1
+        time.sleep(delay)
+
+
+def download(url: str, headers: Mapping[str, str] = None, timeout: float = 30.0,
+             max_bytes: int = None) -> Download:
+    """
+    同步流式下载（urllib3，进程内复用连接池）
+
+    Args:
+        headers: 额外的请求头，如条件请求头
+        timeout: 整个下载（含连接重试、重定向和读取响应体）的时限（秒）
+        max_bytes: 最大字节数，默认读取 WEB_FETCH_MAX_BYTES
+
+    Raises:
+        DownloadError: 内容不是 HTML、超过大小上限或超时，连接已关闭
+        urllib3 的网络异常
+    """
+    deadline = time.monotonic() + timeout
+    response = _open(url, {**REQUEST_HEADERS, **(headers or {})}, timeout, deadline)
+    try:
+        reader = BodyReader(response.status, response.headers, max_bytes)
+        if reader.wanted:
+            for chunk in response.stream(2 ** 16):
+                reader.feed(chunk)
+                if time.monotonic() > deadline:
+                    raise DownloadError(f"下载超时 ({timeout:g}s)")
+        return reader.finish()
+    except DownloadError:
+        # 不读完剩余数据，直接关闭连接
+        response.close()
+        raise
+    finally:
+        response.release_conn()
+
+
+async def aread(status: int, headers: Mapping[str, str], chunks: AsyncIterator[bytes],
+                max_bytes: int = None) -> Download:
+    """从异步数据块迭代器（如 httpx 的 aiter_bytes()）流式读取响应体"""
+    reader = BodyReader(status, headers, max_bytes)
+    if reader.wanted:
+        async for chunk in chunks:
+            reader.feed(chunk)
+    return reader.finish()
+
+
+def read(status: int, headers: Mapping[str, str], chunks: Iterable[bytes],
+         max_bytes: int = None) -> Download:
+    """aread 的同步版本"""
+    reader = BodyReader(status, headers, max_bytes)
+    if reader.wanted:
+        for chunk in chunks:
+            reader.feed(chunk)
+    return reader.finish()
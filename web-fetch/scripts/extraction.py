@@ -0,0 +1,148 @@
+"""
+单次解析的正文提取
+下载的 HTML 只解析一次为 lxml 树，正文提取和标题提取共用这棵树；
+提取选项相同的多种输出格式（markdown / text / html）共用一次正文提取，只分别渲染
+
+旧版对同一页面解析三次：按映射格式 extract() 一次（结果丢弃）、extract_metadata() 一次、
+按所需格式再 extract() 一次；其中 extract_metadata() 还会运行日期、作者等识别，而输出只用到标题
+"""
+from typing import Dict, Iterable, List, Optional
+
+# 支持的输出格式
+FORMATS = ("markdown", "text", "html")
+
+# 输出格式 -> trafilatura 的渲染格式（markdown 沿用纯文本输出，与旧版一致）
+_RENDER_FORMATS = {
+    "markdown": "txt",
+    "text": "txt",
+    "html": "html",
+}
+
+
+def parse_html(html):
+    """
+    将下载的 HTML（str / bytes）解析为 lxml 树，已是树时原样返回
+
+    Returns:
+        lxml 树，无法解析时返回 None
+    """
+    from trafilatura.settings import DEFAULT_CONFIG
+    from trafilatura.utils import load_html
+    return load_html(html, DEFAULT_CONFIG.getint("DEFAULT", "MAX_FILE_SIZE"))
+
+
+def extract_title(tree) -> str:
+    """
+    提取页面标题，与 trafilatura.metadata.extract_metadata(tree).title 相同，
+    但跳过日期、作者、站点名等其他字段的识别
+    """
+    try:
+        from trafilatura.metadata import examine_meta, extract_meta_json
+        from trafilatura.metadata import extract_title as title_from_tree
+    except ImportError:
+        # 内部接口变动时退回完整的元数据提取
+        from trafilatura.metadata import extract_metadata
+        metadata = extract_metadata(tree)
+        return (metadata.title if metadata else "") or ""
+
+    metadata = examine_meta(tree)
+    try:
+        metadata = extract_meta_json(tree, metadata)
+    except Exception:
+        pass
+    if not metadata.title:
+        metadata.title = title_from_tree(tree)
+    metadata.clean_and_trim()
+    return metadata.title or ""
+
+
+def _extract_options(output_format: str, include_links: bool, include_images: bool) -> tuple:
+    """提取选项：text 格式不保留链接和图片"""
+    if output_format == "text":
+        return False, False
+    return include_links, include_images
+
+
+def extract_contents(tree, formats: Iterable[str], include_links: bool = False,
+                     include_images: bool = False) -> Dict[str, str]:
+    """
+    在同一棵树上提取正文并渲染为多种格式
+
+    提取选项相同的格式共用一次正文提取（trafilatura 在树的副本上提取，原树不受影响）
+
+    Args:
+        tree: parse_html() 返回的 lxml 树
+        formats: 输出格式列表
+        include_links: 是否保留链接
+        include_images: 是否保留图片
+
+    Returns:
+        {格式: 正文}，提取不到正文时为空字符串
+    """
+    from trafilatura.core import bare_extraction, determine_returnstring
+    from trafilatura.settings import Extractor
+
+    groups: Dict[tuple, list] = {}
+    for output_format in dict.fromkeys(formats):
+        if output_format not in _RENDER_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}")
+        groups.setdefault(_extract_options(output_format, include_links, include_images), []).append(output_format)
+
+    contents = {}
+    for (links, images), group in groups.items():
+        # html 渲染会原地改写正文树，放在同组最后
+        group.sort(key=lambda f: _RENDER_FORMATS[f] == "html")
+        options = [
+            Extractor(output_format=_RENDER_FORMATS[f], links=links, images=images, tables=True)
+            for f in group
+        ]
+        document = bare_extraction(tree, options=options[0])
+        for output_format, render in zip(group, options):
+            contents[output_format] = (determine_returnstring(document, render) or "") if document else ""
+    return contents
+
+
+def extract_page(html, formats: Iterable[str] = ("markdown",), include_links: bool = False,
+                 include_images: bool = False) -> Optional[dict]:
+    """
+    解析一次页面，提取标题和各格式的正文
+
+    Args:
+        html: 下载的 HTML（str / bytes）或已解析的 lxml 树
+
+    Returns:
+        {"title": 标题, "contents": {格式: 正文}}，页面无法解析时返回 None
+    """
+    tree = parse_html(html)
+    if tree is None:
+        return None
+    contents = extract_contents(tree, formats, include_links, include_images)
+    return {
+        "title": extract_title(tree),
+        "contents": contents,
+    }
+
+
+def page_record(url: str, page: Optional[dict], output_format: str, formats: List[str]) -> dict:
+    """
+    由 extract_page() 的结果构造抓取结果字典（fetch() 和批量模式共用）
+
+    Args:
+        page: extract_page() 的返回值，页面无法解析时为 None
+        output_format: 作为 content 的格式
+        formats: 全部输出格式，多于一种时以 contents 给出各格式的正文
+    """
+    title = page["title"] if page else ""
+    contents = page["contents"] if page else {}
+    content = contents.get(output_format, "")
+
+    record = {
+        "url": url,
+        "title": title or "",
+        "content": content or "",
+        "format": output_format,
+        "length": len(content) if content else 0
+    }
+    if len(formats) > 1:
+        record["contents"] = {fmt: contents.get(fmt, "") for fmt in formats}
+    return record
@@ -8,11 +8,16 @@ Web Fetch - 网页内容抓取脚本
     python fetch.py "https://example.com"
     python fetch.py "https://example.com" --format text
     python fetch.py "https://example.com" --include-links
+    python fetch.py "https://example.com" --format markdown,text
+    python fetch.py --batch urls.txt --concurrency 32 --per-host 2
 """
 import argparse
 import json
+import os
+import sqlite3
 import sys
 import io
+from typing import List
 
 # 修复 Windows 编码问题
 if sys.platform == "win32":
@@ -20,8 +25,85 @@ if sys.platform == "win32":
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 
+# 默认下载超时（秒），与 trafilatura 一致
+DEFAULT_TIMEOUT = 30.0
+
+# 下载失败（网络错误、非 200 响应）时的提示
+DOWNLOAD_FAILED = "无法下载网页，请检查 URL 是否正确"
+
+
+def _fetch_page(url: str, formats: List[str], include_links: bool, include_images: bool,
+                timeout: float = None, max_bytes: int = None, cache: bool = True):
+    """
+    流式下载并提取；使用网页缓存时新鲜期内不发请求，过期后条件请求，内容未变时沿用上次的提取结果
+
+    Returns:
+        (extract_page() 形式的提取结果或 None, 缓存元数据)
+
+    Raises:
+        DownloadError: 下载失败，或内容不是 HTML、超过大小上限
+    """
+    import page_cache
+    from download import DownloadError, decode_html, download, sniff_charset
+    from extraction import extract_page
+
+    store, entry = None, None
+    meta = {"status": "bypass"}
+    if cache:
+        meta = {"status": "miss"}
+        try:
+            store = page_cache.get_cache()
+            entry = store.get(url)
+        except (sqlite3.Error, OSError) as e:
+            meta = {"status": "error", "error": str(e)}
+
+    if entry is not None and entry.fresh:
+        html, meta = decode_html(entry.body, sniff_charset(entry.body)), {"status": "hit"}
+    else:
+        try:
+            response = download(url, entry.conditional_headers() if entry else None,
+                                timeout or DEFAULT_TIMEOUT, max_bytes)
+        except DownloadError:
+            raise
+        except Exception as e:
+            raise DownloadError(f"{DOWNLOAD_FAILED} ({type(e).__name__}: {e})") from e
+        if response.status not in (200, 304) or (response.status == 304 and entry is None):
+            raise DownloadError(f"{DOWNLOAD_FAILED} (HTTP {response.status})")
+        html = response.html
+        if store is not None:
+            try:
+                body, entry, state = page_cache.revalidate(
+                    store, url, entry, response.status, response.headers, response.body
+                )
+                meta = {"status": state}
+                if body is not response.body:
+                    # 304：沿用缓存的页面
+                    html = decode_html(body, sniff_charset(body))
+            except (sqlite3.Error, OSError) as e:
+                store, entry = None, None
+                meta = {"status": "error", "error": str(e)}
+    if entry is not None:
+        meta["age"] = round(entry.age, 1)
+
+    key = page_cache.extraction_key(include_links, include_images)
+    page = entry.extraction(key, formats) if entry is not None else None
+    if page is not None:
+        meta["extraction"] = "reused"
+        return page, meta
+
+    page = extract_page(html, formats, include_links, include_images)
+    meta["extraction"] = "extracted"
+    if page is not None and store is not None:
+        try:
+            store.save_extraction(url, key, page)
+        except (sqlite3.Error, OSError):
+            pass
+    return page, meta
+
+
 def fetch(url: str, output_format: str = "markdown", include_links: bool = False,
-          include_images: bool = False) -> dict:
+          include_images: bool = False, timeout: float = None, formats: List[str] = None,
+          cache: bool = True, max_bytes: int = None) -> dict:
     """
     抓取网页内容
 
@@ -30,9 +112,14 @@ def fetch(url: str, output_format: str = "markdown", include_links: bool = False
         output_format: 输出格式 (markdown, text, html)
         include_links: 是否保留链接
         include_images: 是否保留图片
+        timeout: 下载超时（秒），为 None 时为 30 秒
+        formats: 同时输出的多种格式（含 output_format），在同一次解析中生成，结果中以 contents 给出
+        cache: 是否使用网页缓存（条件请求重新验证，内容未变时沿用上次的提取结果）
+        max_bytes: 页面最大字节数，为 None 时读取环境变量 WEB_FETCH_MAX_BYTES（默认 20000000）；
+            流式下载，不是 HTML 或超过上限时立即中止
 
     Returns:
-        抓取结果字典
+        抓取结果字典，cache 字段给出缓存状态
     """
     try:
         import trafilatura
@@ -43,76 +130,15 @@ def fetch(url: str, output_format: str = "markdown", include_links: bool = False
             "content": ""
         }
 
-    # 下载网页
-    downloaded = trafilatura.fetch_url(url)
-    if not downloaded:
-        return {
-            "error": "无法下载网页，请检查 URL 是否正确",
-            "url": url,
-            "content": ""
-        }
+    formats = list(dict.fromkeys([output_format, *(formats or [])]))
 
-    # 提取内容
     try:
-        # trafilatura 内部使用 xmljson 参数控制输出格式
-        # json=True 返回字典，False 返回文本
-        # 我们需要用 extract 函数的参数来控制
-        output_format_map = {
-            "markdown": "xml",  # 默认输出格式，可转换
-            "text": "txt",
-            "html": "html",
-        }
-        fmt = output_format_map.get(output_format, "xml")
-
-        # 使用 extract 函数提取内容
-        # 参考文档: https://trafilatura.readthedocs.io/
-        content = trafilatura.extract(
-            downloaded,
-            output_format=fmt,
-            include_links=include_links,
-            include_images=include_images,
-            include_tables=True,
-        )
-
-        # 获取元数据
-        metadata = trafilatura.metadata.extract_metadata(downloaded)
-        title = metadata.title if metadata else ""
-
-        # 如果是 markdown 格式，需要简单转换
-        # trafilatura 默认输出的是 XML 格式，我们用 text 格式更简单
-        if output_format == "markdown":
-            # 使用 txt 格式，然后用简单规则转换
-            content = trafilatura.extract(
-                downloaded,
-                output_format="txt",
-                include_links=include_links,
-                include_images=include_images,
-                include_tables=True,
-            )
-        elif output_format == "text":
-            content = trafilatura.extract(
-                downloaded,
-                output_format="txt",
-                include_links=False,
-                include_images=False,
-                include_tables=True,
-            )
-        elif output_format == "html":
-            content = trafilatura.extract(
-                downloaded,
-                output_format="html",
-                include_links=include_links,
-                include_images=include_images,
-                include_tables=True,
-            )
+        from extraction import page_record
 
-        return {
-            "url": url,
-            "title": title or "",
-            "content": content or "",
-            "format": output_format,
-            "length": len(content) if content else 0
-        }
+        # 下载被中止时 DownloadError 的消息即为错误提示
+        page, cache_meta = _fetch_page(url, formats, include_links, include_images,
+                                       timeout, max_bytes, cache)
+        return {**page_record(url, page, output_format, formats), "cache": cache_meta}
 
     except Exception as e:
         return {
@@ -131,24 +157,75 @@ def main():
   markdown   Markdown 格式（默认，推荐）
   text       纯文本格式
   html       HTML 格式
+  多个格式用逗号分隔，如 markdown,text，页面只解析一次，结果中的 contents 给出各格式的正文
 
 示例:
   python fetch.py "https://www.example.com"
   python fetch.py "https://www.example.com" --format text
   python fetch.py "https://www.example.com" --include-links --include-images
+  python fetch.py --batch urls.txt --concurrency 32 --per-host 2 --host-delay 0.5
+  python fetch.py --batch urls.txt --workers 8
+  python fetch.py "https://www.example.com" --no-cache
+  python fetch.py "https://www.example.com" --max-bytes 5000000
+  cat urls.txt | python fetch.py --batch - --format text
         """
     )
 
     parser.add_argument(
         "url",
+        nargs="?",
         help="网页 URL"
     )
 
+    parser.add_argument(
+        "-b", "--batch",
+        metavar="FILE",
+        help="批量模式：逐行读取 URL（- 表示 stdin），并发抓取，每完成一个输出一行 NDJSON"
+    )
+
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=16,
+        help="批量模式下同时下载的 URL 数 (默认: 16)"
+    )
+
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=2,
+        help="批量模式下同一主机同时下载的 URL 数 (默认: 2)"
+    )
+
+    parser.add_argument(
+        "--host-delay",
+        type=float,
+        default=0.0,
+        help="批量模式下同一主机相邻请求开始的最小间隔秒数 (默认: 0)"
+    )
+
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        help="批量模式下提取正文的进程数，0 表示在本进程中用线程提取 (默认: CPU 核数)"
+    )
+
+    parser.add_argument(
+        "-t", "--timeout",
+        type=float,
+        help="单个 URL 的下载超时秒数 (默认: 30)"
+    )
+
+    parser.add_argument(
+        "--max-bytes",
+        type=int,
+        help="单个页面的最大字节数，不是 HTML 或超过上限时立即中止 (默认: 20000000，可用环境变量 WEB_FETCH_MAX_BYTES 设置)"
+    )
+
     parser.add_argument(
         "-f", "--format",
-        choices=["markdown", "text", "html"],
         default="markdown",
-        help="输出格式 (默认: markdown)"
+        help="输出格式，多个用逗号分隔，第一个作为 content (默认: markdown)"
     )
 
     parser.add_argument(
@@ -163,6 +240,12 @@ def main():
         help="保留图片"
     )
 
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不使用网页缓存，每次重新下载和提取"
+    )
+
     parser.add_argument(
         "-j", "--json",
         action="store_true",
@@ -171,7 +254,45 @@ def main():
 
     args = parser.parse_args()
 
-    result = fetch(args.url, args.format, args.include_links, args.include_images)
+    from extraction import FORMATS
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    for fmt in formats:
+        if fmt not in FORMATS:
+            parser.error(f"不支持的输出格式: {fmt}（可选: {', '.join(FORMATS)}）")
+    if not formats:
+        parser.error("请指定输出格式")
+    if not args.url and not args.batch:
+        parser.error("需要提供网页 URL 或 --batch")
+
+    if args.batch:
+        from batch_fetch import DEFAULT_TIMEOUT, DEFAULT_WORKERS, batch_fetch
+        try:
+            batch_fetch(
+                args.batch,
+                output_format=formats[0],
+                include_links=args.include_links,
+                include_images=args.include_images,
+                formats=formats,
+                concurrency=args.concurrency,
+                per_host=args.per_host,
+                host_delay=args.host_delay,
+                timeout=args.timeout or DEFAULT_TIMEOUT,
+                cache=not args.no_cache,
+                max_bytes=args.max_bytes,
+                workers=DEFAULT_WORKERS if args.workers is None else args.workers,
+            )
+        except BrokenPipeError:
+            # 下游已关闭输出（如 | head），静默退出，避免退出时刷新 stdout 再次报错
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+        except Exception as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False))
+            sys.exit(1)
+        return
+
+    result = fetch(args.url, formats[0], args.include_links, args.include_images,
+                   timeout=args.timeout, formats=formats, cache=not args.no_cache,
+                   max_bytes=args.max_bytes)
     print(json.dumps(result, ensure_ascii=False, indent=2))
 
 
@@ -0,0 +1,363 @@
+"""
+网页缓存
+基于 SQLite 的持久化缓存，按 URL 保存压缩后的原始 HTML、HTTP 校验信息（ETag、Last-Modified、
+Cache-Control）以及已提取的正文：
+
+    新鲜期内（Cache-Control max-age / Expires）   直接使用缓存，不发请求
+    过期后                                         带 If-None-Match / If-Modified-Since 发条件请求，
+                                                   304 或响应体哈希不变时沿用上次的提取结果
+    Cache-Control: no-store                        不缓存
+
+按总大小进行 LRU 淘汰；原始 HTML 安装了 zstandard 时用 zstd 压缩，否则用 gzip
+
+环境变量:
+    WEB_FETCH_CACHE_DIR       缓存目录 (默认: ~/.cache/web-fetch)
+    WEB_FETCH_CACHE_MAX_MB    缓存总大小上限 MB (默认: 256)
+    WEB_FETCH_CACHE_TTL       响应没有给出新鲜期时的默认新鲜秒数 (默认: 0，即每次都条件请求)
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def default_cache_dir() -> str:
+    """缓存目录"""
+    return os.getenv(
+        "WEB_FETCH_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "web-fetch")
+    )
+
+
+def compress(data: bytes):
+    """
+    压缩原始 HTML
+
+    Returns:
+        (压缩算法, 压缩后的数据)
+    """
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=6)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("缓存条目使用 zstd 压缩，请安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+def body_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _header(headers: Mapping[str, str], name: str) -> Optional[str]:
+    """不区分大小写读取响应头"""
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    return value
+
+
+def cache_directives(headers: Mapping[str, str]) -> Dict[str, Optional[str]]:
+    """解析 Cache-Control，如 {"max-age": "600", "no-cache": None}"""
+    directives = {}
+    for part in (_header(headers, "Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def freshness(headers: Mapping[str, str], default_ttl: float = 0.0) -> float:
+    """响应的新鲜秒数：no-cache 为 0，否则取 max-age，其次 Expires，最后为默认值"""
+    directives = cache_directives(headers)
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except (TypeError, ValueError):
+            return 0.0
+    expires = _header(headers, "Expires")
+    if expires:
+        try:
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return default_ttl
+
+
+def cacheable(headers: Mapping[str, str]) -> bool:
+    """响应是否允许缓存"""
+    return "no-store" not in cache_directives(headers)
+
+
+def extraction_key(include_links: bool, include_images: bool) -> str:
+    """提取结果按提取选项分别保存"""
+    return f"links={int(bool(include_links))},images={int(bool(include_images))}"
+
+
+class CachedPage:
+    """缓存中的页面"""
+
+    def __init__(self, url: str, codec: str, body: bytes, digest: str, etag: Optional[str],
+                 last_modified: Optional[str], fetched_at: float, expires_at: float,
+                 extractions: Dict[str, dict]):
+        self.url = url
+        self.codec = codec
+        self._body = body
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.extractions = extractions
+
+    @property
+    def body(self) -> bytes:
+        """解压后的原始 HTML"""
+        return decompress(self.codec, self._body)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """条件请求头"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def extraction(self, key: str, formats: List[str]) -> Optional[dict]:
+        """
+        已保存的提取结果
+
+        Returns:
+            {"title", "contents"}，所需格式不全时返回 None
+        """
+        saved = self.extractions.get(key)
+        if not saved or any(fmt not in saved["contents"] for fmt in formats):
+            return None
+        return {
+            "title": saved["title"],
+            "contents": {fmt: saved["contents"][fmt] for fmt in formats},
+        }
+
+
+class PageCache:
+    """SQLite 网页缓存"""
+
+    def __init__(self, path: str = None, max_bytes: int = None, default_ttl: float = None):
+        self.path = path or os.path.join(default_cache_dir(), "pages.sqlite3")
+        self.max_bytes = (max_bytes if max_bytes is not None
+                          else int(float(os.getenv("WEB_FETCH_CACHE_MAX_MB", 256)) * 1024 * 1024))
+        self.default_ttl = (default_ttl if default_ttl is not None
+                            else float(os.getenv("WEB_FETCH_CACHE_TTL", 0)))
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # 多进程共享同一数据库文件，由 SQLite 负责加锁
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                codec TEXT NOT NULL,
+                body BLOB NOT NULL,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                extractions TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """读取缓存（不论是否过期），并更新访问时间"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT codec, body, digest, etag, last_modified, fetched_at, expires_at, extractions "
+                "FROM pages WHERE url=?",
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at=? WHERE url=?", (time.time(), url))
+            self._conn.commit()
+
+        codec, body, digest, etag, last_modified, fetched_at, expires_at, extractions = row
+        return CachedPage(url, codec, body, digest, etag, last_modified,
+                          fetched_at, expires_at, json.loads(extractions))
+
+    def store(self, url: str, body: bytes, headers: Mapping[str, str],
+              extractions: Dict[str, dict] = None, digest: str = None):
+        """写入下载的页面，并按 LRU 淘汰超出容量的条目；不允许缓存的响应会删除旧条目"""
+        if not cacheable(headers):
+            self.delete(url)
+            return
+        now = time.time()
+        codec, blob = compress(body)
+        payload = json.dumps(extractions or {}, ensure_ascii=False, separators=(",", ":"))
+        size = len(blob) + len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, codec, blob, digest or body_hash(body), _header(headers, "ETag"),
+                 _header(headers, "Last-Modified"), payload, size,
+                 now, now + freshness(headers, self.default_ttl), now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, entry: CachedPage, headers: Mapping[str, str]):
+        """
+        重新验证通过（304 或响应体未变）：更新校验信息和新鲜期
+
+        304 响应可能不带校验头，此时保留原有的 ETag / Last-Modified
+        """
+        if not cacheable(headers):
+            self.delete(entry.url)
+            return
+        now = time.time()
+        entry.etag = _header(headers, "ETag") or entry.etag
+        entry.last_modified = _header(headers, "Last-Modified") or entry.last_modified
+        entry.fetched_at = now
+        entry.expires_at = now + freshness(headers, self.default_ttl)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET etag=?, last_modified=?, fetched_at=?, expires_at=?, accessed_at=? "
+                "WHERE url=?",
+                (entry.etag, entry.last_modified, now, entry.expires_at, now, entry.url)
+            )
+            self._conn.commit()
+
+    def save_extraction(self, url: str, key: str, page: dict):
+        """合并保存一次提取结果（标题和各格式的正文）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT extractions, size FROM pages WHERE url=?", (url,)
+            ).fetchone()
+            if row is None:
+                return
+            extractions = json.loads(row[0])
+            saved = extractions.setdefault(key, {"title": page["title"], "contents": {}})
+            saved["title"] = page["title"]
+            saved["contents"].update(page["contents"])
+            payload = json.dumps(extractions, ensure_ascii=False, separators=(",", ":"))
+            size = row[1] - len(row[0].encode("utf-8")) + len(payload.encode("utf-8"))
+            self._conn.execute(
+                "UPDATE pages SET extractions=?, size=? WHERE url=?", (payload, size, url)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """总大小超出上限时，按最近访问时间淘汰最旧的条目"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        overflow = total - self.max_bytes
+        if overflow <= 0:
+            return
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+            victims.append((url,))
+            overflow -= size
+            if overflow <= 0:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE url=?", victims)
+
+    def delete(self, url: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE url=?", (url,))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """条目数和总大小"""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def revalidate(cache: PageCache, url: str, entry: Optional[CachedPage], status: int,
+               headers: Mapping[str, str], body: bytes):
+    """
+    处理（条件）请求的响应并更新缓存
+
+    Args:
+        entry: 请求前的缓存条目，没有时为 None
+        status: 响应状态码，200 或 304
+        body: 响应体（304 时为空）
+
+    Returns:
+        (原始 HTML, 可沿用其提取结果的缓存条目或 None, 缓存状态)
+        缓存状态: revalidated（304）、unchanged（响应体哈希与缓存相同）、miss（新内容）
+    """
+    if status == 304 and entry is not None:
+        cache.refresh(entry, headers)
+        return entry.body, entry, "revalidated"
+
+    digest = body_hash(body)
+    if entry is not None and entry.digest == digest:
+        cache.refresh(entry, headers)
+        return body, entry, "unchanged"
+
+    cache.store(url, body, headers, digest=digest)
+    return body, None, "miss"
+
+
+_cache: Optional[PageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(**kwargs) -> PageCache:
+    """进程内共享的缓存实例"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PageCache(**kwargs)
+    return _cache
@@ -0,0 +1,19 @@
+"""测试配置：让测试直接导入 scripts 下的模块，网页缓存写到临时目录"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import pytest
+
+import page_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """每个测试使用独立的缓存目录和默认配置"""
+    monkeypatch.setenv("WEB_FETCH_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("WEB_FETCH_CACHE_MAX_MB", "WEB_FETCH_CACHE_TTL", "WEB_FETCH_MAX_BYTES"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(page_cache, "_cache", None)
+    yield
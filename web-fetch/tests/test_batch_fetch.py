@@ -0,0 +1,238 @@
+import asyncio
+import io
+import json
+import threading
+
+import pytest
+
+from batch_fetch import HostLimiter, abatch_fetch, extract_body, make_executor
+from download import Download, UnsupportedContent
+
+
+def article(name: str) -> bytes:
+    paragraphs = "".join(f"<p>{name} paragraph {i} with enough words to count as body text.</p>"
+                         for i in range(8))
+    return (f"<html><head><title>{name}</title></head><body><article><h1>{name}</h1>"
+            f"{paragraphs}</article></body></html>").encode("utf-8")
+
+
+class Downloader:
+    """按 URL 返回预设页面或抛出预设异常，可为每个 URL 设置延迟"""
+
+    concurrency = 4
+    timeout = 5.0
+
+    def __init__(self, pages: dict, delays: dict = None, headers: dict = None):
+        self.pages = pages
+        self.delays = delays or {}
+        self.headers = headers or {}
+        self.requests = []
+
+    async def download(self, url, headers=None):
+        self.requests.append(url)
+        await asyncio.sleep(self.delays.get(url, 0))
+        page = self.pages[url]
+        if isinstance(page, BaseException):
+            raise page
+        return Download(200, {"Content-Type": "text/html; charset=utf-8", **self.headers}, page, "utf-8")
+
+    async def aclose(self):
+        pass
+
+
+def run(lines, downloader, **options) -> tuple:
+    out = io.StringIO()
+    options.setdefault("cache", False)
+    count = asyncio.run(abatch_fetch(lines, out=out, downloader=downloader, workers=0, **options))
+    return count, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_outputs_in_completion_order_with_input_index():
+    urls = ["https://a.example/", "https://b.example/", "https://c.example/"]
+    out = io.StringIO()
+
+    class Ordered(Downloader):
+        # a 在输出两行后、c 在输出一行后才完成下载
+        async def download(self, url, headers=None):
+            wait = {urls[0]: 2, urls[2]: 1}.get(url, 0)
+            for _ in range(1000):
+                if out.getvalue().count("\n") >= wait:
+                    break
+                await asyncio.sleep(0.01)
+            return await super().download(url, headers)
+
+    count = asyncio.run(abatch_fetch(
+        ["# comment", urls[0], "", urls[1], urls[2]], out=out,
+        downloader=Ordered({url: article(url[8]) for url in urls}), workers=0, cache=False,
+    ))
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+
+    assert count == 3
+    assert [r["url"] for r in records] == [urls[1], urls[2], urls[0]]
+    assert {r["url"]: r["index"] for r in records} == {urls[0]: 0, urls[1]: 1, urls[2]: 2}
+    assert all(r["title"] == r["url"][8] and r["fetch_ms"] >= 0 for r in records)
+
+
+def test_duplicate_urls_share_one_download():
+    a, b = "https://a.example/", "https://b.example/"
+    downloader = Downloader({a: article("a"), b: article("b")}, delays={a: 0.5})
+    count, records = run([a, a, b, a], downloader)
+
+    assert count == 4
+    assert sorted(downloader.requests) == [a, b]
+    assert sorted(r["index"] for r in records) == [0, 1, 2, 3]
+    same = [r for r in records if r["url"] == a]
+    assert len(same) == 3
+    assert len({r["content"] for r in same}) == 1 and same[0]["content"]
+
+
+def test_error_records_have_same_shape_as_successes():
+    ok, bad, slow = "https://ok.example/", "https://pdf.example/", "https://slow.example/"
+    downloader = Downloader({
+        ok: article("ok"),
+        bad: UnsupportedContent("不是 HTML 页面: application/pdf"),
+        slow: asyncio.TimeoutError(),
+    })
+    _, records = run([ok, bad, slow, "ftp://files.example/"], downloader, cache=True)
+    by_url = {r["url"]: r for r in records}
+
+    assert "error" not in by_url[ok] and by_url[ok]["cache"]["status"] == "miss"
+    assert by_url[bad]["error"] == "不是 HTML 页面: application/pdf"
+    assert by_url[slow]["error"].startswith("下载超时")
+    for url in (bad, slow, "ftp://files.example/"):
+        assert set(by_url[url]) == {"index", "url", "error", "content", "cache", "fetch_ms"}
+        assert by_url[url]["cache"] == {"status": "miss"}
+
+
+def test_error_records_report_bypass_without_cache():
+    _, records = run(["ftp://files.example/"], Downloader({}))
+    assert records[0]["cache"] == {"status": "bypass"}
+
+
+def test_cache_work_runs_off_the_event_loop(monkeypatch):
+    import page_cache
+    threads = []
+    revalidate = page_cache.revalidate
+
+    def traced(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return revalidate(*args, **kwargs)
+
+    monkeypatch.setattr(page_cache, "revalidate", traced)
+    url = "https://cached.example/"
+    downloader = Downloader({url: article("cached")}, headers={"Cache-Control": "max-age=600"})
+
+    _, first = run([url], downloader, cache=True)
+    _, second = run([url], downloader, cache=True)
+
+    assert first[0]["cache"]["status"] == "miss"
+    assert second[0]["cache"] == {"status": "hit", "age": second[0]["cache"]["age"], "extraction": "reused"}
+    assert second[0]["content"] == first[0]["content"]
+    assert downloader.requests == [url]
+    # 压缩和哈希在线程中执行，不阻塞事件循环
+    assert threads and threading.get_ident() not in threads
+
+
+def test_output_failure_stops_the_batch():
+    class BrokenOutput:
+        """第二次写入时下游已关闭"""
+
+        def __init__(self):
+            self.writes = 0
+
+        def write(self, text):
+            self.writes += 1
+            if self.writes >= 2:
+                raise BrokenPipeError(32, "Broken pipe")
+
+        def flush(self):
+            pass
+
+    urls = [f"https://host{i % 20}.example/{i}" for i in range(400)]
+    downloader = Downloader({url: article("page") for url in urls})
+    out = BrokenOutput()
+
+    async def main():
+        return await asyncio.wait_for(
+            abatch_fetch(urls, out=out, downloader=downloader, workers=0, cache=False), 20
+        )
+
+    with pytest.raises(BrokenPipeError):
+        asyncio.run(main())
+    assert out.writes == 2
+    # 输出失败后不再继续下载
+    assert len(downloader.requests) < len(urls)
+
+
+async def _hold(limiter, host, seconds, log, name):
+    async with limiter.slot(host):
+        log.append((name, asyncio.get_running_loop().time()))
+        limiter.active[host] = limiter.active.get(host, 0) + 1
+        limiter.peak[host] = max(limiter.peak.get(host, 0), limiter.active[host])
+        await asyncio.sleep(seconds)
+        limiter.active[host] -= 1
+
+
+def test_host_limiter_caps_per_host_concurrency():
+    async def main():
+        limiter = HostLimiter(per_host=2)
+        limiter.active, limiter.peak = {}, {}
+        log = []
+        await asyncio.gather(
+            *(_hold(limiter, "a.example", 0.05, log, f"a{i}") for i in range(5)),
+            *(_hold(limiter, "b.example", 0.05, log, f"b{i}") for i in range(2)),
+        )
+        return limiter, log
+
+    limiter, log = asyncio.run(main())
+    assert limiter.peak == {"a.example": 2, "b.example": 2}
+    # 其他主机不受 a.example 排队的影响
+    assert [name for name, _ in log[:4]] == ["a0", "a1", "b0", "b1"]
+    assert len(limiter) == 0
+
+
+def test_host_limiter_spaces_request_starts():
+    async def main():
+        limiter = HostLimiter(per_host=1, delay=0.1)
+        limiter.active, limiter.peak = {}, {}
+        log = []
+        # 请求本身很快，名额在开始 0.1 秒后才归还
+        await asyncio.gather(*(_hold(limiter, "a.example", 0, log, i) for i in range(3)))
+        await asyncio.sleep(0.15)
+        return limiter, log
+
+    limiter, log = asyncio.run(main())
+    starts = [t for _, t in log]
+    assert all(later - earlier >= 0.09 for earlier, later in zip(starts, starts[1:]))
+    # 延迟归还后释放主机状态
+    assert len(limiter) == 0
+
+
+def test_process_pool_extraction_matches_thread_pool():
+    body = article("pool")
+    results = []
+    for workers in (1, 0):
+        executor = make_executor(workers)
+        try:
+            results.append(executor.submit(
+                extract_body, body, None, ["markdown", "text"], False, False
+            ).result(timeout=60))
+        finally:
+            executor.shutdown()
+    assert results[0] == results[1]
+    assert results[0]["title"] == "pool"
+    assert "pool paragraph 0" in results[0]["contents"]["text"]
+
+
+def test_batch_output_same_with_process_workers():
+    urls = [f"https://{name}.example/" for name in "abc"]
+    outputs = []
+    for workers in (1, 0):
+        out = io.StringIO()
+        asyncio.run(abatch_fetch(urls, out=out, downloader=Downloader({u: article(u[8]) for u in urls}),
+                                 workers=workers, cache=False))
+        records = sorted((json.loads(line) for line in out.getvalue().splitlines()),
+                         key=lambda r: r["index"])
+        outputs.append([(r["url"], r["title"], r["content"]) for r in records])
+    assert outputs[0] == outputs[1]
+    assert [title for _, title, _ in outputs[0]] == ["a", "b", "c"]
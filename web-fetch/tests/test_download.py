@@ -0,0 +1,187 @@
+import asyncio
+import codecs
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from download import (
+    MAX_REDIRECTS, PRESCAN_BYTES, BodyReader, CharsetSniffer, DownloadError, TooLarge,
+    UnsupportedContent, aread, check_headers, default_max_bytes, download, read, sniff_charset,
+)
+
+HTML = {"Content-Type": "text/html; charset=utf-8"}
+
+
+class Chunks:
+    """记录被读取的数据块数"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.read = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+
+def test_reads_html_body():
+    page = read(200, HTML, [b"<html>", b"<body>hi</body></html>"])
+    assert page.body == b"<html><body>hi</body></html>"
+    assert page.charset == "utf-8"
+    assert page.html == "<html><body>hi</body></html>"
+
+
+@pytest.mark.parametrize("content_type", ["application/pdf", "image/png", "video/mp4"])
+def test_rejects_non_html_before_reading_body(content_type):
+    chunks = Chunks([b"data"])
+    with pytest.raises(UnsupportedContent, match=content_type):
+        read(200, {"Content-Type": content_type}, chunks)
+    assert chunks.read == 0
+
+
+def test_accepts_xhtml_and_missing_content_type():
+    assert read(200, {"Content-Type": "application/xhtml+xml"}, [b"<html/>"]).body == b"<html/>"
+    assert read(200, {}, [b"<!doctype html><html/>"]).body == b"<!doctype html><html/>"
+
+
+@pytest.mark.parametrize("head, kind", [
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\x00\x00\x00\x18ftypmp42", "video/mp4"),
+    (b"MZ\x90\x00\x03\x00", "二进制内容"),
+])
+def test_sniffs_binary_content_without_usable_content_type(head, kind):
+    with pytest.raises(UnsupportedContent, match=kind):
+        read(200, {"Content-Type": "application/octet-stream"}, [head + b"rest"])
+
+
+def test_declared_html_is_not_sniffed():
+    assert read(200, HTML, [b"%PDF-like text"]).body == b"%PDF-like text"
+
+
+def test_content_length_over_limit_aborts_before_body():
+    chunks = Chunks([b"x" * 10])
+    with pytest.raises(TooLarge):
+        read(200, {**HTML, "Content-Length": "101"}, chunks, max_bytes=100)
+    assert chunks.read == 0
+    check_headers({**HTML, "Content-Length": "100"}, 100)
+
+
+def test_stops_reading_once_body_exceeds_max_bytes():
+    chunks = Chunks([b"x" * 40] * 10)
+    with pytest.raises(TooLarge, match="100"):
+        read(200, HTML, chunks, max_bytes=100)
+    assert chunks.read == 3
+
+
+def test_async_read_stops_once_body_exceeds_max_bytes():
+    chunks = Chunks([b"x" * 40] * 10)
+    with pytest.raises(TooLarge):
+        asyncio.run(aread(200, HTML, chunks.__aiter__(), max_bytes=100))
+    assert chunks.read == 3
+
+
+def test_body_of_non_200_response_is_not_read():
+    chunks = Chunks([b"not modified"])
+    page = read(304, {"Content-Type": "application/pdf"}, chunks)
+    assert page.status == 304 and page.body == b""
+    assert chunks.read == 0
+
+
+def test_max_bytes_env(monkeypatch):
+    monkeypatch.setenv("WEB_FETCH_MAX_BYTES", "5e6")
+    assert default_max_bytes() == 5_000_000
+    monkeypatch.setenv("WEB_FETCH_MAX_BYTES", "big")
+    assert default_max_bytes() == 20_000_000
+    assert BodyReader(200, HTML).max_bytes == 20_000_000
+
+
+def test_charset_priority_bom_over_header_over_meta():
+    body = codecs.BOM_UTF8 + b'<meta charset="gbk">'
+    assert sniff_charset(body, "text/html; charset=iso-8859-2") == "utf-8-sig"
+    assert sniff_charset(b'<meta charset="gbk">', "text/html; charset=iso-8859-2") == "iso8859-2"
+    assert sniff_charset(b'<meta charset="gbk">', "text/html") == "gb18030"
+    assert sniff_charset(b"<html></html>", "text/html") is None
+
+
+def test_meta_charset_split_across_chunks():
+    sniffer = CharsetSniffer("text/html")
+    assert sniffer.feed(b"<html><head><meta char") is None
+    assert sniffer.feed(b'set="windows-1251"></head>') == "cp1251"
+    assert sniffer.done
+
+
+def test_meta_charset_after_prescan_window_is_ignored():
+    sniffer = CharsetSniffer("text/html")
+    sniffer.feed(b" " * PRESCAN_BYTES)
+    assert sniffer.done and sniffer.charset is None
+    assert sniffer.feed(b'<meta charset="utf-8">') is None
+    assert sniffer.close() is None
+
+
+def test_decodes_gbk_page():
+    text = "中文网页"
+    page = read(200, {"Content-Type": "text/html; charset=GBK"}, [text.encode("gbk")])
+    assert page.html == text
+
+
+class Redirects(BaseHTTPRequestHandler):
+    """/hop/N 重定向到 /hop/N-1，/hop/0 返回页面"""
+
+    def do_GET(self):
+        hops = int(self.path.rsplit("/", 1)[1])
+        if hops:
+            self.send_response(302)
+            self.send_header("Location", f"/hop/{hops - 1}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"<html>done</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Redirects)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_follows_up_to_max_redirects(server):
+    assert download(f"{server}/hop/{MAX_REDIRECTS}", timeout=5).body == b"<html>done</html>"
+    with pytest.raises(Exception, match="redirect"):
+        download(f"{server}/hop/{MAX_REDIRECTS + 1}", timeout=5)
+
+
+def test_fetch_error_keeps_cause(server):
+    from fetch import _fetch_page
+    with pytest.raises(DownloadError, match="MaxRetryError.*redirect"):
+        _fetch_page(f"{server}/hop/{MAX_REDIRECTS + 1}", ["text"], False, False, timeout=5, cache=False)
+
+
+def test_connect_retries_stay_within_timeout():
+    # 取一个空闲端口后关闭，连接会被拒绝
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    start = time.monotonic()
+    with pytest.raises(DownloadError, match="下载超时"):
+        download(f"http://127.0.0.1:{port}/", timeout=0.8)
+    assert time.monotonic() - start < 0.8
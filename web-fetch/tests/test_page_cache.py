@@ -0,0 +1,137 @@
+import os
+import time
+
+import pytest
+
+from page_cache import PageCache, freshness, revalidate
+
+URL = "https://example.com/article"
+PAGE = {"title": "Article", "contents": {"markdown": "# Article"}}
+KEY = "links=0,images=0"
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def cached(store, body=b"<html>v1</html>", headers=None):
+    """首次下载并保存提取结果，返回缓存条目"""
+    headers = {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT", **(headers or {})}
+    _, entry, state = revalidate(store, URL, None, 200, headers, body)
+    assert entry is None and state == "miss"
+    store.save_extraction(URL, KEY, PAGE)
+    return store.get(URL)
+
+
+def test_fresh_within_max_age(store, clock):
+    entry = cached(store, headers={"Cache-Control": "max-age=60"})
+    assert entry.fresh
+    clock.now += 61
+    assert not store.get(URL).fresh
+
+
+def test_conditional_headers_from_validators(store):
+    entry = cached(store)
+    assert entry.conditional_headers() == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+def test_304_reuses_cached_body_and_extraction(store, clock):
+    entry = cached(store)
+    clock.now += 100
+    # 304 没有校验头时保留原有的 ETag
+    body, reused, state = revalidate(store, URL, entry, 304, {"Cache-Control": "max-age=30"}, b"")
+    assert state == "revalidated"
+    assert body == b"<html>v1</html>"
+    assert reused.extraction(KEY, ["markdown"]) == PAGE
+
+    refreshed = store.get(URL)
+    assert refreshed.etag == '"v1"'
+    assert refreshed.age == 0 and refreshed.fresh
+
+
+def test_200_with_same_body_is_unchanged(store):
+    entry = cached(store)
+    body, reused, state = revalidate(store, URL, entry, 200, {"ETag": '"v1b"'}, b"<html>v1</html>")
+    assert state == "unchanged"
+    assert reused is entry
+    assert store.get(URL).etag == '"v1b"'
+    assert store.get(URL).extraction(KEY, ["markdown"]) == PAGE
+
+
+def test_200_with_new_body_drops_old_extraction(store):
+    entry = cached(store)
+    body, reused, state = revalidate(store, URL, entry, 200, {"ETag": '"v2"'}, b"<html>v2</html>")
+    assert state == "miss" and reused is None
+    saved = store.get(URL)
+    assert saved.body == b"<html>v2</html>"
+    assert saved.extraction(KEY, ["markdown"]) is None
+
+
+def test_extraction_needs_all_requested_formats(store):
+    entry = cached(store)
+    assert entry.extraction(KEY, ["markdown", "text"]) is None
+    assert entry.extraction("links=1,images=0", ["markdown"]) is None
+
+
+def test_no_store_is_not_cached(store):
+    revalidate(store, URL, None, 200, {"Cache-Control": "no-store"}, b"<html>secret</html>")
+    assert store.get(URL) is None
+
+
+def test_no_store_on_revalidation_removes_entry(store):
+    entry = cached(store)
+    _, _, state = revalidate(store, URL, entry, 304, {"Cache-Control": "private, no-store"}, b"")
+    assert state == "revalidated"
+    assert store.get(URL) is None
+
+
+def test_evicts_least_recently_accessed_when_over_size(tmp_path, clock):
+    # 随机字节不可压缩，每个条目约 1000 字节
+    store = PageCache(str(tmp_path / "pages.sqlite3"), max_bytes=3500)
+    for name in "abc":
+        clock.now += 1
+        store.store(f"https://example.com/{name}", os.urandom(1000), {})
+    clock.now += 1
+    assert store.get("https://example.com/a") is not None
+
+    clock.now += 1
+    store.store("https://example.com/d", os.urandom(1000), {})
+    assert store.get("https://example.com/b") is None
+    assert all(store.get(f"https://example.com/{name}") is not None for name in "acd")
+    assert store.stats()["bytes"] <= 3500
+    store.close()
+
+
+def test_oversized_page_is_not_cached(tmp_path):
+    store = PageCache(str(tmp_path / "pages.sqlite3"), max_bytes=500)
+    store.store(URL, os.urandom(1000), {})
+    assert store.get(URL) is None
+    store.close()
+
+
+def test_freshness_directives(clock):
+    assert freshness({"Cache-Control": "max-age=120"}) == 120
+    assert freshness({"Cache-Control": "no-cache, max-age=120"}) == 0
+    assert freshness({"Expires": "Thu, 01 Jan 1970 00:00:00 GMT"}) == 0
+    assert freshness({}, default_ttl=30) == 30
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索引擎端到端基准测试
+将各引擎指向本地桩服务（回放录制的 SERP 响应），统计吞吐、延迟分位数
+以及网络 / 解析 / 序列化各阶段耗时，不访问线上搜索引擎
+
+使用方法:
+    python bench_engines.py
+    python bench_engines.py --requests 200 --concurrency 8 --latency 80 --jitter 20
+    python bench_engines.py --engines bing,baidu
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, bench_dir)
+sys.path.insert(0, os.path.join(os.path.dirname(bench_dir), "scripts"))
+
+from stub_server import StubServer, HOST_PREFIXES
+from engines import BingEngine, BaiduEngine, GoogleEngine, DuckDuckGoEngine
+
+
+class StageTimer:
+    """线程安全的分阶段计时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {}
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.totals[stage] = self.totals.get(stage, 0.0) + seconds
+
+    def wrap(self, obj, attr: str, stage: str):
+        """替换 obj.attr 为计时版本"""
+        func = getattr(obj, attr)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+
+        setattr(obj, attr, timed)
+
+
+def percentile(values: list, pct: float) -> float:
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def make_engine(name: str, stub_url: str, timer: StageTimer):
+    """创建指向桩服务的引擎，并在解析函数上挂计时"""
+    if name == "bing":
+        engine = BingEngine()
+        engine.base_url = f"{stub_url}/bing/search"
+        timer.wrap(engine, "_parse", "parse")
+    elif name == "baidu":
+        engine = BaiduEngine()
+        engine.base_url = f"{stub_url}/baidu/s"
+        timer.wrap(engine, "_parse", "parse")
+    elif name == "google":
+        engine = GoogleEngine(api_key="bench", cx="bench")
+        engine.base_url = f"{stub_url}/google/customsearch/v1"
+        timer.wrap(engine, "_parse_page", "parse")
+    elif name == "duckduckgo":
+        engine = DuckDuckGoEngine()
+    else:
+        raise ValueError(f"不支持的搜索引擎: {name}")
+    return engine
+
+
+def patch_duckduckgo(stub_url: str, timer: StageTimer):
+    """
+    DDGS 在库内部拼接请求地址并解析页面，
+    这里改写其请求地址指向桩服务，并对其 HTML 解析计时
+    """
+    from duckduckgo_search import duckduckgo_search as ddgs_module
+
+    original_get_url = ddgs_module.DDGS._get_url
+
+    def get_url(self, method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        prefix = HOST_PREFIXES.get(parts.hostname)
+        if prefix:
+            url = f"{stub_url}{prefix}{parts.path}"
+        return original_get_url(self, method, url, *args, **kwargs)
+
+    ddgs_module.DDGS._get_url = get_url
+    # 去掉 DDGS 内置的请求间隔，只测量引擎本身
+    ddgs_module.DDGS._sleep = lambda self, sleeptime=0.75: None
+    timer.wrap(ddgs_module, "document_fromstring", "parse")
+
+
+def bench_engine(name: str, stub_url: str, requests: int, concurrency: int) -> dict:
+    timer = StageTimer()
+    if name == "duckduckgo":
+        patch_duckduckgo(stub_url, timer)
+    engine = make_engine(name, stub_url, timer)
+
+    latencies = []
+    counts = []
+
+    def run_one(i: int):
+        query = f"python asyncio {i}"
+        start = time.perf_counter()
+        results = engine.search(query, 10)
+        mid = time.perf_counter()
+        # 与 search.py 的输出方式一致
+        json.dumps({
+            "query": query,
+            "engine": engine.name,
+            "count": len(results),
+            "results": [r.to_dict() for r in results]
+        }, ensure_ascii=False, indent=2)
+        end = time.perf_counter()
+
+        timer.add("engine", mid - start)
+        timer.add("serialize", end - mid)
+        latencies.append(end - start)
+        counts.append(len(results))
+
+    # 预热：建立连接、加载模块
+    run_one(-1)
+    latencies.clear()
+    counts.clear()
+    timer.totals.clear()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run_one, range(requests)))
+    wall = time.perf_counter() - start
+
+    totals = timer.totals
+    parse = totals.get("parse", 0.0)
+    return {
+        "engine": name,
+        "requests": requests,
+        "results_per_query": round(sum(counts) / len(counts), 1) if counts else 0,
+        "qps": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "stage_ms": {
+            "network": round((totals.get("engine", 0.0) - parse) / requests * 1000, 2),
+            "parse": round(parse / requests * 1000, 2),
+            "serialize": round(totals.get("serialize", 0.0) / requests * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索引擎端到端基准测试（本地桩服务）")
+    parser.add_argument(
+        "--engines",
+        default="bing,baidu,google,duckduckgo",
+        help="逗号分隔的引擎列表 (默认: 全部)"
+    )
+    parser.add_argument("-n", "--requests", type=int, default=50, help="每个引擎的查询次数 (默认: 50)")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="并发查询数 (默认: 1)")
+    parser.add_argument("--latency", type=float, default=50.0, help="桩服务平均延迟毫秒 (默认: 50)")
+    parser.add_argument("--jitter", type=float, default=10.0, help="桩服务延迟抖动毫秒 (默认: 10)")
+    parser.add_argument("--url", help="使用已启动的桩服务地址，而不是在进程内启动")
+    args = parser.parse_args()
+
+    server = None
+    stub_url = args.url
+    if not stub_url:
+        server = StubServer(latency=args.latency, jitter=args.jitter).start()
+        stub_url = server.url
+
+    report = []
+    try:
+        for name in args.engines.split(","):
+            name = name.strip()
+            if not name:
+                continue
+            try:
+                report.append(bench_engine(name, stub_url, args.requests, args.concurrency))
+            except ImportError as e:
+                report.append({"engine": name, "error": str(e)})
+    finally:
+        if server:
+            server.stop()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
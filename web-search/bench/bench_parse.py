@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果页解析基准测试
+对比 BeautifulSoup 完整解析与 lxml 快速路径在保存的 SERP 页面上的单页耗时，
+并校验两条路径的解析结果完全一致
+
+使用方法:
+    python bench_parse.py
+    python bench_parse.py --repeat 200
+    python bench_parse.py --fixtures /path/to/recorded/serps
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(bench_dir), "scripts"))
+
+from engines.parsers import BING, BAIDU, parse_bs4, parse_lxml
+
+
+SPECS = {
+    "bing": BING,
+    "baidu": BAIDU,
+}
+
+
+def measure(func, html: str, spec, repeat: int) -> float:
+    """返回单页平均耗时（毫秒）"""
+    func(html, spec, 50)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html, spec, 50)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果页解析基准测试")
+    parser.add_argument(
+        "--fixtures",
+        default=os.path.join(bench_dir, "fixtures"),
+        help="SERP 页面目录，文件名为 <引擎>.html (默认: bench/fixtures)"
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        type=int,
+        default=50,
+        help="每个页面重复解析次数 (默认: 50)"
+    )
+    args = parser.parse_args()
+
+    report = []
+    for engine, spec in SPECS.items():
+        path = os.path.join(args.fixtures, f"{engine}.html")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        expected = parse_bs4(html, spec, 50)
+        actual = parse_lxml(html, spec, 50)
+
+        bs4_ms = measure(parse_bs4, html, spec, args.repeat)
+        lxml_ms = measure(parse_lxml, html, spec, args.repeat)
+        report.append({
+            "engine": engine,
+            "page_kb": round(len(html.encode("utf-8")) / 1024, 1),
+            "results": len(expected),
+            "identical": expected == actual,
+            "bs4_ms": round(bs4_ms, 2),
+            "lxml_ms": round(lxml_ms, 2),
+            "speedup": round(bs4_ms / lxml_ms, 1) if lxml_ms else None,
+        })
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if not all(item["identical"] for item in report):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果表示与序列化基准测试
+对比结果容器的内存占用（旧版带 __dict__ 的类 / 带 __slots__ 的 SearchResult / 字典 / 列式 ResultSet），
+以及批量输出时各序列化方式的吞吐（旧版缩进 JSON / 紧凑 NDJSON / orjson / msgpack / 字段投影）
+
+使用方法:
+    python bench_results.py
+    python bench_results.py --results 500000 --per-query 10
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(bench_dir), "scripts"))
+
+import serializers
+from engines import SearchResult
+from resultset import ResultSet
+
+
+class LegacyResult:
+    """旧版 SearchResult：普通类，每个实例带 __dict__"""
+
+    def __init__(self, title: str, url: str, snippet: str):
+        self.title = title
+        self.url = url
+        self.snippet = snippet
+
+    def to_dict(self):
+        return {"title": self.title, "url": self.url, "snippet": self.snippet}
+
+
+def make_rows(count: int) -> list:
+    """生成互不相同的结果字段（字符串在计量前创建，只统计容器本身的开销）"""
+    return [
+        (
+            f"Python asyncio 教程 第 {i} 篇 - 并发编程实践",
+            f"https://www.example{i % 997}.com/articles/{i}/python-asyncio?ref=search",
+            f"本文介绍 asyncio 的事件循环、任务与协程，第 {i} 个示例演示如何并发请求多个接口并汇总结果。",
+        )
+        for i in range(count)
+    ]
+
+
+def measure_memory(build) -> float:
+    """构建容器时新分配的内存（MB）"""
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+    return current / 1024 / 1024
+
+
+def bench_memory(rows: list) -> list:
+    builders = {
+        "legacy_objects": lambda: [LegacyResult(*row) for row in rows],
+        "slotted_objects": lambda: [SearchResult(*row) for row in rows],
+        "dicts": lambda: [{"title": t, "url": u, "snippet": s} for t, u, s in rows],
+        "resultset": lambda: ResultSet({
+            "title": [row[0] for row in rows],
+            "url": [row[1] for row in rows],
+            "snippet": [row[2] for row in rows],
+        }),
+    }
+    report = []
+    for name, build in builders.items():
+        mb = measure_memory(build)
+        report.append({
+            "container": name,
+            "mb": round(mb, 2),
+            "bytes_per_result": round(mb * 1024 * 1024 / len(rows), 1),
+        })
+    return report
+
+
+def bench_serialize(rows: list, per_query: int) -> list:
+    """按查询分组序列化，模拟批量模式下每个查询输出一条记录"""
+    legacy = [LegacyResult(*row) for row in rows]
+    slotted = [SearchResult(*row) for row in rows]
+    groups = [(i, i + per_query) for i in range(0, len(rows), per_query)]
+
+    def record(results):
+        return {"query": "python asyncio", "engine": "bing", "count": len(results), "results": results}
+
+    cases = {
+        # 旧版: to_dict 后缩进 2 的 json.dumps
+        "json_indent_legacy": lambda: [
+            json.dumps(record([r.to_dict() for r in legacy[a:b]]), ensure_ascii=False, indent=2)
+            .encode("utf-8")
+            for a, b in groups
+        ],
+        "ndjson_stdlib": lambda: [
+            (json.dumps(record([r.to_dict() for r in slotted[a:b]]), ensure_ascii=False,
+                        separators=(",", ":")) + "\n").encode("utf-8")
+            for a, b in groups
+        ],
+        "ndjson": lambda: [
+            serializers.dumps(record([r.to_dict() for r in slotted[a:b]]), "ndjson")
+            for a, b in groups
+        ],
+        "ndjson_fields_title_url": lambda: [
+            serializers.dumps(record(ResultSet.from_results(slotted[a:b]).to_dicts(["title", "url"])),
+                              "ndjson")
+            for a, b in groups
+        ],
+        "msgpack": lambda: [
+            serializers.dumps(record([r.to_dict() for r in slotted[a:b]]), "msgpack")
+            for a, b in groups
+        ],
+    }
+
+    report = []
+    for name, run in cases.items():
+        try:
+            start = time.perf_counter()
+            chunks = run()
+            elapsed = time.perf_counter() - start
+        except (ImportError, ValueError) as e:
+            report.append({"serializer": name, "error": str(e)})
+            continue
+        size = sum(len(chunk) for chunk in chunks)
+        report.append({
+            "serializer": name,
+            "results_per_sec": round(len(rows) / elapsed),
+            "mb_per_sec": round(size / 1024 / 1024 / elapsed, 1),
+            "bytes_per_result": round(size / len(rows), 1),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果表示与序列化基准测试")
+    parser.add_argument("-n", "--results", type=int, default=200000, help="结果条数 (默认: 200000)")
+    parser.add_argument("--per-query", type=int, default=10, help="每个查询的结果数 (默认: 10)")
+    args = parser.parse_args()
+
+    rows = make_rows(args.results)
+    print(json.dumps({
+        "results": args.results,
+        "orjson": serializers._orjson() is not None,
+        "memory": bench_memory(rows),
+        "serialize": bench_serialize(rows, args.per_query),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准测试
+用 python -X importtime 在子进程中统计各场景的导入耗时和进程总耗时，
+对比引擎按需导入与旧版一次性导入全部引擎（及 httpx、BeautifulSoup）的差异
+
+使用方法:
+    python bench_startup.py
+    python bench_startup.py --runs 20
+    python bench_startup.py --scenarios startup,bing
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+scripts_dir = os.path.join(os.path.dirname(bench_dir), "scripts")
+
+_PRELUDE = f"import sys; sys.path.insert(0, {scripts_dir!r}); import search; "
+
+# 旧版行为: 启动时导入全部引擎模块、httpx 和 BeautifulSoup
+_LOAD_ALL = "import http_client, bs4; [search.ENGINES[n] for n in search.BUILTIN_ENGINES]; "
+
+# 场景名 -> 加载 CLI 之后执行的代码（选用该引擎时实际需要导入的模块）
+SCENARIOS = {
+    # 只加载 CLI，如 --cache-only 命中缓存时不需要任何引擎
+    "startup": "",
+    "duckduckgo": "search.create_engine('duckduckgo'); import duckduckgo_search",
+    "bing": "search.create_engine('bing').client; import lxml.html",
+    "baidu": "search.create_engine('baidu').client; import lxml.html",
+    "google": "search.ENGINES['google'](api_key='bench', cx='bench').client",
+}
+
+
+def parse_importtime(stderr: str) -> dict:
+    """
+    解析 -X importtime 的输出
+
+    Returns:
+        {"import_ms": 顶层导入的累计耗时, "modules": 导入的模块数}
+    """
+    total_us = 0
+    modules = 0
+    for line in stderr.splitlines():
+        # 格式: "import time:  自身耗时 | 累计耗时 | 模块名"
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative_us, name = line.split("|")
+        if not cumulative_us.strip().isdigit():
+            continue  # 表头
+        modules += 1
+        # 模块名前的缩进表示嵌套层级，只累加顶层导入避免重复计算
+        if len(name) - len(name.lstrip()) <= 1:
+            total_us += int(cumulative_us)
+    return {"import_ms": total_us / 1000, "modules": modules}
+
+
+def _run_once(code: str) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return {**parse_importtime(proc.stderr), "wall_ms": wall_ms}
+
+
+def run_codes(codes: dict, runs: int) -> dict:
+    """
+    在子进程中交替运行各段代码 runs 次，取中位数（交替运行使机器负载波动对各方影响相同）
+
+    Args:
+        codes: 名称 -> 代码
+
+    Returns:
+        名称 -> {"import_ms", "wall_ms", "modules"}
+    """
+    samples = {name: [] for name in codes}
+    for _ in range(runs):
+        for name, code in codes.items():
+            samples[name].append(_run_once(code))
+
+    return {
+        name: {
+            "import_ms": round(statistics.median(s["import_ms"] for s in items), 1),
+            "wall_ms": round(statistics.median(s["wall_ms"] for s in items), 1),
+            "modules": items[-1]["modules"],
+        }
+        for name, items in samples.items()
+    }
+
+
+def bench_scenario(name: str, runs: int) -> dict:
+    """同一场景分别以按需导入和一次性导入全部引擎运行"""
+    try:
+        result = run_codes({
+            "lazy": _PRELUDE + SCENARIOS[name],
+            "eager": _PRELUDE + _LOAD_ALL + SCENARIOS[name],
+        }, runs)
+    except RuntimeError as e:
+        return {"scenario": name, "error": str(e)}
+
+    lazy, eager = result["lazy"], result["eager"]
+    return {
+        "scenario": name,
+        "lazy": lazy,
+        "eager": eager,
+        "saved_import_ms": round(eager["import_ms"] - lazy["import_ms"], 1),
+        "saved_wall_ms": round(eager["wall_ms"] - lazy["wall_ms"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search.py 启动耗时基准测试 (-X importtime)")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"逗号分隔的场景列表 (默认: 全部，可选: {', '.join(SCENARIOS)})"
+    )
+    parser.add_argument("-n", "--runs", type=int, default=10, help="每个场景运行次数，取中位数 (默认: 10)")
+    args = parser.parse_args()
+
+    # 解释器本身的启动开销，作为参照
+    report = [{"scenario": "interpreter", **run_codes({"pass": "pass"}, args.runs)["pass"]}]
+    for name in args.scenarios.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in SCENARIOS:
+            parser.error(f"未知场景: {name}")
+        report.append(bench_scenario(name, args.runs))
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
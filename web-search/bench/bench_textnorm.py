@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本清洗基准测试
+用保存的 SERP 页面中的真实摘要和结果片段，对比旧版 utils.clean_snippet / clean_html
+与 textnorm 的单条、批量实现的吞吐，并校验输出逐字一致
+
+使用方法:
+    python bench_textnorm.py
+    python bench_textnorm.py --repeat 200
+    python bench_textnorm.py --fixtures /path/to/recorded/serps
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(bench_dir), "scripts"))
+
+import textnorm
+from engines.parsers import BING, BAIDU, parse_bs4
+
+
+SPECS = {
+    "bing": BING,
+    "baidu": BAIDU,
+}
+
+
+def legacy_clean_snippet(snippet: str) -> str:
+    """旧版 utils.clean_snippet"""
+    if not snippet:
+        return ""
+    snippet = re.sub(r'\s+', ' ', snippet)
+    snippet = snippet.replace('...', '')
+    snippet = snippet.replace('…', '')
+    return snippet.strip()
+
+
+def legacy_clean_html(html: str) -> str:
+    """旧版 utils.clean_html"""
+    if not html:
+        return ""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def load_samples(fixtures: str):
+    """
+    从 SERP 页面中取出原始摘要（清洗前）和每条结果容器的 HTML 片段
+
+    Returns:
+        (每页的摘要列表的列表, HTML 片段列表)
+    """
+    from lxml import etree, html as lxml_html
+    pages = []
+    fragments = []
+    for engine, spec in SPECS.items():
+        path = os.path.join(fixtures, f"{engine}.html")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        pages.append([snippet for _, _, snippet in parse_bs4(html, spec, 50)])
+        root = lxml_html.fromstring(html)
+        fragments.extend(
+            etree.tostring(item, encoding="unicode") for item in root.xpath(spec.container[1])
+        )
+    return pages, fragments
+
+
+def throughput(func, items: list, repeat: int) -> float:
+    """每秒处理条数"""
+    func(items)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(items)
+    return len(items) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本清洗基准测试")
+    parser.add_argument(
+        "--fixtures",
+        default=os.path.join(bench_dir, "fixtures"),
+        help="SERP 页面目录，文件名为 <引擎>.html (默认: bench/fixtures)"
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        type=int,
+        default=2000,
+        help="摘要重复清洗次数，HTML 片段为其 1/20 (默认: 2000)"
+    )
+    args = parser.parse_args()
+
+    pages, fragments = load_samples(args.fixtures)
+    snippets = [snippet for page in pages for snippet in page]
+    if not snippets:
+        parser.error(f"{args.fixtures} 中没有可用的 SERP 页面")
+
+    snippet_cases = {
+        "legacy": lambda items: [legacy_clean_snippet(s) for s in items],
+        "clean_snippet": lambda items: [textnorm.clean_snippet(s) for s in items],
+        "clean_snippets": textnorm.clean_snippets,
+    }
+    html_cases = {
+        "legacy": lambda items: [legacy_clean_html(s) for s in items],
+        "clean_html": textnorm.clean_html_batch,
+    }
+
+    expected = snippet_cases["legacy"](snippets)
+    snippet_report = {}
+    for name, func in snippet_cases.items():
+        snippet_report[name] = {
+            "per_sec": round(throughput(func, snippets, args.repeat)),
+            "identical": func(snippets) == expected,
+        }
+
+    expected = html_cases["legacy"](fragments)
+    html_repeat = max(1, args.repeat // 20)
+    html_report = {}
+    for name, func in html_cases.items():
+        html_report[name] = {
+            "per_sec": round(throughput(func, fragments, html_repeat)),
+            "identical": func(fragments) == expected,
+        }
+
+    for report in (snippet_report, html_report):
+        legacy = report["legacy"]["per_sec"]
+        for item in report.values():
+            item["speedup"] = round(item["per_sec"] / legacy, 1) if legacy else None
+
+    print(json.dumps({
+        "snippets": len(snippets),
+        "fragments": len(fragments),
+        "clean_snippet": snippet_report,
+        "clean_html": html_report,
+    }, ensure_ascii=False, indent=2))
+    if not all(item["identical"] for report in (snippet_report, html_report) for item in report.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地搜索引擎桩服务
+回放 fixtures 目录中录制的 SERP 响应，可配置延迟和抖动，用于离线基准测试
+
+路由:
+    /bing/search              -> bing.html
+    /baidu/s                  -> baidu.html
+    /google/customsearch/v1   -> google.json
+    /duckduckgo/html          -> duckduckgo.html
+
+使用方法:
+    python stub_server.py --port 18765 --latency 80 --jitter 20
+"""
+import argparse
+import os
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ROUTES = {
+    "/bing/search": ("bing.html", "text/html; charset=utf-8"),
+    "/baidu/s": ("baidu.html", "text/html; charset=utf-8"),
+    "/google/customsearch/v1": ("google.json", "application/json; charset=utf-8"),
+    "/duckduckgo/html": ("duckduckgo.html", "text/html; charset=utf-8"),
+}
+
+# 真实域名 -> 桩服务路径前缀，供无法修改请求地址的引擎（如 DDGS）改写 URL
+HOST_PREFIXES = {
+    "www.bing.com": "/bing",
+    "www.baidu.com": "/baidu",
+    "www.googleapis.com": "/google",
+    "html.duckduckgo.com": "/duckduckgo",
+}
+
+
+class StubServer:
+    """在后台线程中运行的桩服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, fixtures_dir: str = FIXTURES_DIR):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0 表示随机端口
+            latency: 每个请求的平均延迟（毫秒）
+            jitter: 延迟抖动幅度（毫秒），实际延迟在 latency ± jitter 内均匀分布
+            fixtures_dir: 录制响应所在目录
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self._bodies = {}
+        for path, (filename, content_type) in ROUTES.items():
+            file_path = os.path.join(fixtures_dir, filename)
+            if os.path.exists(file_path):
+                with open(file_path, "rb") as f:
+                    self._bodies[path] = (f.read(), content_type)
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self) -> float:
+        """本次请求的延迟（秒）"""
+        ms = self.latency + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, ms) / 1000
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # 响应头和响应体分两次写出，关闭 Nagle 避免与延迟 ACK 叠加出 40ms 的假延迟
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+
+                time.sleep(stub.delay())
+
+                entry = stub._bodies.get(urlsplit(self.path).path.rstrip("/"))
+                if entry is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                body, content_type = entry
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = _reply
+            do_POST = _reply
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地搜索引擎桩服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("-p", "--port", type=int, default=18765, help="监听端口 (默认: 18765)")
+    parser.add_argument("--latency", type=float, default=0.0, help="平均延迟毫秒 (默认: 0)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟抖动毫秒 (默认: 0)")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="录制响应目录")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.latency, args.jitter, args.fixtures)
+    print(f"Stub server listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
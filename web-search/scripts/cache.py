@@ -0,0 +1,223 @@
+"""
+搜索结果缓存
+基于 SQLite 的持久化缓存，按 (引擎, 归一化查询, 结果数量) 索引，
+支持按引擎设置 TTL、按容量进行 LRU 淘汰，以及可选的 stale-while-revalidate
+
+环境变量:
+    WEB_SEARCH_CACHE_DIR            缓存目录 (默认: ~/.cache/web-search)
+    WEB_SEARCH_CACHE_TTL            默认 TTL 秒数
+    WEB_SEARCH_CACHE_TTL_<ENGINE>   指定引擎的 TTL 秒数，如 WEB_SEARCH_CACHE_TTL_GOOGLE
+    WEB_SEARCH_CACHE_MAX_ENTRIES    最大缓存条目数 (默认: 10000)
+    WEB_SEARCH_CACHE_STALE          过期后仍可返回旧结果的秒数 (默认: 0，即关闭)
+    WEB_SEARCH_REDIRECT_TTL         跳转链接解析结果的保留秒数 (默认: 7 天)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+
+# 各引擎默认 TTL（秒）。Google 有配额限制，缓存更久
+DEFAULT_TTL = {
+    "google": 24 * 3600,
+    "duckduckgo": 6 * 3600,
+    "bing": 6 * 3600,
+    "baidu": 6 * 3600,
+}
+FALLBACK_TTL = 6 * 3600
+REDIRECT_TTL = 7 * 24 * 3600
+
+
+def default_cache_dir() -> str:
+    """缓存目录"""
+    return os.getenv(
+        "WEB_SEARCH_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "web-search")
+    )
+
+
+def normalize_query(query: str) -> str:
+    """归一化查询：全半角统一、小写、合并空白"""
+    query = unicodedata.normalize("NFKC", query or "")
+    return " ".join(query.lower().split())
+
+
+class CacheEntry:
+    """缓存命中的条目"""
+
+    def __init__(self, results: List[dict], created_at: float, ttl: float):
+        self.results = results
+        self.created_at = created_at
+        self.ttl = ttl
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    @property
+    def fresh(self) -> bool:
+        return self.age <= self.ttl
+
+
+class SearchCache:
+    """SQLite 搜索结果缓存"""
+
+    def __init__(self, path: str = None, max_entries: int = None, stale_ttl: float = None):
+        self.path = path or os.path.join(default_cache_dir(), "results.sqlite3")
+        self.max_entries = (max_entries if max_entries is not None
+                            else int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", 10000)))
+        self.stale_ttl = (stale_ttl if stale_ttl is not None
+                          else float(os.getenv("WEB_SEARCH_CACHE_STALE", 0)))
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # 多进程共享同一数据库文件，由 SQLite 负责加锁
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                engine TEXT NOT NULL,
+                query TEXT NOT NULL,
+                num INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (engine, query, num)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS redirects (
+                source TEXT PRIMARY KEY,
+                target TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def ttl(self, engine: str) -> float:
+        """引擎的 TTL 秒数"""
+        value = os.getenv(f"WEB_SEARCH_CACHE_TTL_{engine.upper()}") or os.getenv("WEB_SEARCH_CACHE_TTL")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        return DEFAULT_TTL.get(engine, FALLBACK_TTL)
+
+    def get(self, engine: str, query: str, num_results: int) -> Optional[CacheEntry]:
+        """
+        读取缓存
+
+        Returns:
+            未过期或仍在 stale 窗口内的条目，否则返回 None
+        """
+        key = (engine, normalize_query(query), num_results)
+        ttl = self.ttl(engine)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM results WHERE engine=? AND query=? AND num=?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+
+            payload, created_at = row
+            if time.time() - created_at > ttl + self.stale_ttl:
+                return None
+
+            self._conn.execute(
+                "UPDATE results SET accessed_at=? WHERE engine=? AND query=? AND num=?",
+                (time.time(),) + key
+            )
+            self._conn.commit()
+
+        return CacheEntry(json.loads(payload), created_at, ttl)
+
+    def set(self, engine: str, query: str, num_results: int, results: List[dict]):
+        """写入缓存，并按 LRU 淘汰超出容量的条目"""
+        now = time.time()
+        payload = json.dumps(results, ensure_ascii=False, separators=(",", ":"))
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (engine, normalize_query(query), num_results, payload, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰最旧的条目"""
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE rowid IN "
+                "(SELECT rowid FROM results ORDER BY accessed_at LIMIT ?)",
+                (overflow,)
+            )
+
+    def get_redirects(self, urls: List[str]) -> Dict[str, str]:
+        """
+        批量读取跳转链接的解析结果
+
+        Returns:
+            跳转链接 -> 目标 URL（只包含未过期的条目）
+        """
+        if not urls:
+            return {}
+        ttl = float(os.getenv("WEB_SEARCH_REDIRECT_TTL", REDIRECT_TTL))
+        placeholders = ",".join("?" * len(urls))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT source, target FROM redirects WHERE created_at >= ? AND source IN ({placeholders})",
+                [time.time() - ttl] + list(urls)
+            ).fetchall()
+        return dict(rows)
+
+    def set_redirects(self, mapping: Dict[str, str]):
+        """批量写入跳转链接的解析结果"""
+        if not mapping:
+            return
+        now = time.time()
+        ttl = float(os.getenv("WEB_SEARCH_REDIRECT_TTL", REDIRECT_TTL))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)",
+                [(source, target, now) for source, target in mapping.items()]
+            )
+            self._conn.execute("DELETE FROM redirects WHERE created_at < ?", (now - ttl,))
+            self._conn.commit()
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.execute("DELETE FROM redirects")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(**kwargs) -> SearchCache:
+    """进程内共享的缓存实例"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchCache(**kwargs)
+    return _cache
@@ -1,12 +1,20 @@
 """
 搜索引擎模块初始化
+各引擎通过 registry 按名称按需导入
 """
-from typing import Protocol, List, Dict, Any
+import asyncio
+import importlib
+from collections.abc import Mapping
+from typing import Protocol, List, Dict, Any, AsyncIterator, Iterator, Type
 from abc import ABC, abstractmethod
 
 
 class SearchResult:
     """搜索结果"""
+
+    # 不为每个实例创建 __dict__，大批量结果时显著节省内存
+    __slots__ = ("title", "url", "snippet")
+
     def __init__(self, title: str, url: str, snippet: str):
         self.title = title
         self.url = url
@@ -23,6 +31,43 @@ class SearchResult:
 class SearchEngine(ABC):
     """搜索引擎基类"""
 
+    # 通过构造参数注入的 HTTP 客户端，未注入时使用进程共享的连接池
+    _client = None
+    _async_client = None
+
+    # 最近一次搜索中被吞掉的异常；search() 出错时返回空列表，调用方可据此区分"无结果"和"失败"
+    last_error = None
+
+    # 最近一次搜索因出错或总时限到期只返回了部分结果时的说明（见 retry.truncation），否则为 None
+    truncated = None
+
+    # 通过构造参数注入的重试策略，未注入时使用进程共享的策略
+    _retry_policy = None
+
+    @property
+    def client(self):
+        """同步 HTTP 客户端"""
+        if self._client is None:
+            from http_client import get_client
+            return get_client()
+        return self._client
+
+    @property
+    def async_client(self):
+        """异步 HTTP 客户端，需在事件循环中访问"""
+        if self._async_client is None:
+            from http_client import get_async_client
+            return get_async_client()
+        return self._async_client
+
+    @property
+    def retry_policy(self):
+        """瞬时错误的重试策略"""
+        if self._retry_policy is None:
+            from retry import get_policy
+            return get_policy()
+        return self._retry_policy
+
     @abstractmethod
     def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
         """
@@ -37,6 +82,48 @@ class SearchEngine(ABC):
         """
         pass
 
+    async def asearch(self, query: str, num_results: int = 10) -> List[SearchResult]:
+        """
+        异步执行搜索
+
+        默认在线程池中运行同步的 search()，不阻塞事件循环；
+        子类可覆盖为原生异步实现。
+
+        Args:
+            query: 搜索关键词
+            num_results: 返回结果数量
+
+        Returns:
+            搜索结果列表
+        """
+        return await asyncio.to_thread(self.search, query, num_results)
+
+    def iter_search(self, query: str, num_results: int = 10) -> Iterator[SearchResult]:
+        """
+        逐条产出搜索结果
+
+        默认在 search() 完成后逐条产出（出错时不产出结果，异常记录在 last_error）；
+        分页请求的引擎可覆盖为每解析完一页就产出，调用方可以在后续分页仍在请求时处理前面的结果，
+        此时出错会在已产出的结果之后抛出异常。提前停止迭代会取消未完成的请求。
+
+        Args:
+            query: 搜索关键词
+            num_results: 返回结果数量
+
+        Yields:
+            SearchResult
+        """
+        yield from self.search(query, num_results)
+
+    async def aiter_search(self, query: str, num_results: int = 10) -> AsyncIterator[SearchResult]:
+        """
+        iter_search 的异步版本
+
+        提前停止迭代时应调用 aclose()，以便及时取消未完成的请求。
+        """
+        for result in await self.asearch(query, num_results):
+            yield result
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -44,15 +131,113 @@ class SearchEngine(ABC):
         pass
 
 
-# 导入各个搜索引擎
-from .duckduckgo import DuckDuckGoEngine
-from .bing import BingEngine
-from .baidu import BaiduEngine
-from .google import GoogleEngine
+class EngineRegistry(Mapping):
+    """
+    引擎名 -> 引擎类的注册表
+
+    引擎模块在第一次取用该引擎时才导入，未选用的引擎不会拖慢启动；
+    除内置引擎外，还会按需发现以 entry point 注册的第三方引擎，如:
+
+        [project.entry-points."web_search.engines"]
+        myengine = "my_package.engine:MyEngine"
+    """
+
+    def __init__(self, builtins: Dict[str, str], group: str):
+        """
+        Args:
+            builtins: 内置引擎，引擎名 -> "模块:类名"
+            group: entry point 分组名
+        """
+        self._targets: Dict[str, Any] = dict(builtins)
+        self._group = group
+        self._discovered = False
+
+    def register(self, name: str, target):
+        """
+        注册引擎
+
+        Args:
+            name: 引擎名
+            target: 引擎类，或 "模块:类名" 字符串（取用时才导入）
+        """
+        self._targets[name.lower()] = target
+
+    def _discover(self):
+        """加载 entry point 声明的引擎（不覆盖已注册的同名引擎）"""
+        if self._discovered:
+            return
+        self._discovered = True
+        from importlib.metadata import entry_points
+        try:
+            found = entry_points(group=self._group)
+        except TypeError:  # Python < 3.10
+            found = entry_points().get(self._group, [])
+        for entry_point in found:
+            self._targets.setdefault(entry_point.name.lower(), entry_point)
+
+    def __getitem__(self, name: str) -> Type[SearchEngine]:
+        if name not in self._targets:
+            self._discover()
+        target = self._targets[name]
+        if isinstance(target, type):
+            return target
+
+        if isinstance(target, str):
+            module_name, _, attr = target.partition(":")
+            engine_class = getattr(importlib.import_module(module_name), attr)
+        else:
+            engine_class = target.load()
+        self._targets[name] = engine_class
+        return engine_class
+
+    def __contains__(self, name) -> bool:
+        if name not in self._targets:
+            self._discover()
+        return name in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        self._discover()
+        return iter(list(self._targets))
+
+    def __len__(self) -> int:
+        self._discover()
+        return len(self._targets)
+
+
+# 内置引擎，顺序即 "all" 时的调用顺序
+BUILTIN_ENGINES = {
+    "duckduckgo": f"{__name__}.duckduckgo:DuckDuckGoEngine",
+    "bing": f"{__name__}.bing:BingEngine",
+    "baidu": f"{__name__}.baidu:BaiduEngine",
+    "google": f"{__name__}.google:GoogleEngine",
+}
+
+ENTRY_POINT_GROUP = "web_search.engines"
+
+registry = EngineRegistry(BUILTIN_ENGINES, ENTRY_POINT_GROUP)
+register_engine = registry.register
+
+# 兼容 from engines import BingEngine 的写法，访问时才导入对应模块
+_LAZY_CLASSES = {
+    "DuckDuckGoEngine": "duckduckgo",
+    "BingEngine": "bing",
+    "BaiduEngine": "baidu",
+    "GoogleEngine": "google",
+}
+
+
+def __getattr__(attr: str):
+    if attr in _LAZY_CLASSES:
+        return registry[_LAZY_CLASSES[attr]]
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
 
 __all__ = [
     "SearchEngine",
     "SearchResult",
+    "EngineRegistry",
+    "registry",
+    "register_engine",
     "DuckDuckGoEngine",
     "BingEngine",
     "BaiduEngine",
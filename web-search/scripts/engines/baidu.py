@@ -1,28 +1,65 @@
 """
 百度搜索引擎
 通过 HTML 解析实现，无需 API Key
+
+按 pn= 偏移量并发请求多页（百度每页最多返回约 10 条）；
+可选地并发解析百度跳转链接 (baidu.com/link?url=...) 的真实地址（各分页共享 redirect_concurrency 个并发名额），
+解析结果写入持久化缓存，重复查询时直接命中
 """
-import httpx
-from bs4 import BeautifulSoup
-from typing import List
-from urllib.parse import unquote
-import sys
+import asyncio
+import contextvars
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urljoin
 import os
+from textnorm import clean_snippets
+from timings import measure
+from retry import bounded
+from utils import env_float, env_int
+from . import SearchResult
+from .paging import PagedEngine
+from .parsers import BAIDU, parse_results
+
+
+# 跳转页中以 meta refresh 或脚本给出目标地址
+_REDIRECT_TARGET_RE = re.compile(
+    r"""URL='([^']+)'|location\.replace\("([^"]+)"\)""",
+    re.IGNORECASE
+)
 
-# 添加父目录到路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import clean_snippet
-from engines import SearchEngine, SearchResult
 
+def _is_redirect(url: str) -> bool:
+    """是否为百度跳转链接"""
+    return "baidu.com/link?" in url
 
-class BaiduEngine(SearchEngine):
+
+class BaiduEngine(PagedEngine):
     """百度搜索引擎"""
 
-    def __init__(self):
+    def __init__(self, client=None, async_client=None, parser: str = None,
+                 resolve_redirects: bool = None, redirect_timeout: float = None,
+                 page_concurrency: int = None, redirect_concurrency: int = None):
         self.base_url = "https://www.baidu.com/s"
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
+        self._client = client
+        self._async_client = async_client
+        # 结果页解析器: auto / lxml / bs4，默认读取 WEB_SEARCH_PARSER
+        self.parser = parser
+        # 是否解析跳转链接的真实地址，以及整批解析的时限（秒）
+        if resolve_redirects is None:
+            resolve_redirects = os.getenv("BAIDU_RESOLVE_REDIRECTS", "0") == "1"
+        self.resolve_redirects = resolve_redirects
+        self.redirect_timeout = redirect_timeout or env_float("BAIDU_REDIRECT_TIMEOUT", 3.0)
+        # 跳转链接解析的并发上限，由同一次搜索的所有分页共享，避免对 baidu.com 突发大量请求
+        self.redirect_concurrency = max(1, redirect_concurrency or env_int("BAIDU_REDIRECT_CONCURRENCY", 4))
+        self._redirect_slots = threading.BoundedSemaphore(self.redirect_concurrency)
+        self._aredirect_slots = None
+        # 分页并发上限
+        self.page_concurrency = page_concurrency or env_int("BAIDU_PAGE_CONCURRENCY", 8)
 
     def _clean_url(self, url: str) -> str:
         """清理百度跳转链接"""
@@ -38,73 +75,190 @@ class BaiduEngine(SearchEngine):
                     if end == -1:
                         end = len(url)
                     real_url = unquote(url[start:end])
-                    return real_url
+                    # 多数情况下 url= 后是不透明的令牌而不是真实地址，保留跳转链接
+                    if real_url.startswith(("http://", "https://")):
+                        return real_url
             except Exception:
                 pass
         return url
 
-    def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
-        """执行搜索"""
-        results = []
-        max_results = min(num_results, 50)
+    @staticmethod
+    def _redirect_target(url: str, response) -> Optional[str]:
+        """从跳转响应中取出目标地址"""
+        location = response.headers.get("location")
+        if location:
+            return urljoin(url, location)
+        if response.status_code == 200:
+            match = _REDIRECT_TARGET_RE.search(response.text[:4096])
+            if match:
+                return urljoin(url, match.group(1) or match.group(2))
+        return None
+
+    def _resolve_one(self, url: str, stop: threading.Event = None) -> Optional[str]:
+        """
+        解析单个跳转链接：先发 HEAD，拿不到 Location 时再 GET 跳转页
+
+        占用一个并发名额；stop 置位（整批已超时）后不再发出请求
+        """
+        with self._redirect_slots:
+            if stop is not None and stop.is_set():
+                return None
+            response = self.client.head(url, headers=self.headers, follow_redirects=False)
+            target = self._redirect_target(url, response)
+            if target is None and not (stop is not None and stop.is_set()):
+                response = self.client.get(url, headers=self.headers, follow_redirects=False)
+                target = self._redirect_target(url, response)
+            return target
+
+    async def _aresolve_one(self, url: str) -> Optional[str]:
+        """异步解析单个跳转链接，占用一个并发名额"""
+        if self._aredirect_slots is None:
+            self._aredirect_slots = asyncio.Semaphore(self.redirect_concurrency)
+        async with self._aredirect_slots:
+            response = await self.async_client.head(url, headers=self.headers, follow_redirects=False)
+            target = self._redirect_target(url, response)
+            if target is None:
+                response = await self.async_client.get(url, headers=self.headers, follow_redirects=False)
+                target = self._redirect_target(url, response)
+            return target
+
+    def _pending_redirects(self, results: List[SearchResult]):
+        """
+        查持久化缓存，替换已知的跳转链接
+
+        Returns:
+            (缓存对象或 None, 仍需联网解析的跳转链接列表)
+        """
+        urls = list(dict.fromkeys(r.url for r in results if _is_redirect(r.url)))
+        if not urls:
+            return None, []
 
+        store = None
+        known = {}
         try:
-            params = {
-                "wd": query,
-                "rn": str(max_results),
-                "ie": "utf-8"
+            from cache import get_cache
+            store = get_cache()
+            known = store.get_redirects(urls)
+        except Exception:
+            pass
+
+        self._apply_redirects(results, known)
+        return store, [url for url in urls if url not in known]
+
+    @staticmethod
+    def _apply_redirects(results: List[SearchResult], mapping: Dict[str, str]):
+        for result in results:
+            target = mapping.get(result.url)
+            if target:
+                result.url = target
+
+    @staticmethod
+    def _save_redirects(store, mapping: Dict[str, str]):
+        if store is not None and mapping:
+            try:
+                store.set_redirects(mapping)
+            except Exception:
+                pass
+
+    def resolve_redirect_urls(self, results: List[SearchResult]) -> List[SearchResult]:
+        """
+        并发解析结果中的跳转链接，超过 redirect_timeout（或总时限）仍未解析的保留原链接
+
+        Args:
+            results: 搜索结果列表（原地修改）
+
+        Returns:
+            同一个结果列表
+        """
+        store, urls = self._pending_redirects(results)
+        if not urls:
+            return results
+
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=min(len(urls), self.redirect_concurrency))
+        try:
+            # 在各自的上下文副本中执行，使计时等上下文变量对工作线程可见
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._resolve_one, url, stop): url
+                for url in urls
             }
+            done, _ = wait(futures, timeout=bounded(self.redirect_timeout))
+        finally:
+            # 超时后排队中的链接不再发出请求
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        resolved = {}
+        for future in done:
+            if future.exception() is None and future.result():
+                resolved[futures[future]] = future.result()
+
+        self._apply_redirects(results, resolved)
+        self._save_redirects(store, resolved)
+        return results
+
+    async def aresolve_redirect_urls(self, results: List[SearchResult]) -> List[SearchResult]:
+        """resolve_redirect_urls 的异步版本"""
+        store, urls = self._pending_redirects(results)
+        if not urls:
+            return results
 
-            response = httpx.get(
-                self.base_url,
-                params=params,
-                headers=self.headers,
-                timeout=15.0,
-                follow_redirects=True
-            )
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "lxml")
-
-            # 百度搜索结果在 .result 类中
-            for item in soup.select(".result")[:max_results]:
-                try:
-                    # 提取标题和链接
-                    title_elem = item.select_one("h3 a")
-                    if not title_elem:
-                        title_elem = item.select_one("a")
-
-                    if not title_elem:
-                        continue
-
-                    title = title_elem.get_text(strip=True)
-                    raw_url = title_elem.get("href", "")
-                    url = self._clean_url(raw_url)
-
-                    # 提取摘要
-                    snippet_elem = item.select_one(".c-abstract")
-                    if not snippet_elem:
-                        snippet_elem = item.select_one(".abstract")
-                        if not snippet_elem:
-                            snippet_elem = item.select_one("div")
-
-                    snippet = ""
-                    if snippet_elem:
-                        snippet = clean_snippet(snippet_elem.get_text(strip=True))
-
-                    if title and url:
-                        results.append(SearchResult(
-                            title=title,
-                            url=url,
-                            snippet=snippet
-                        ))
-
-                except Exception:
-                    continue
-
-        except Exception as e:
-            return []
+        tasks = {asyncio.ensure_future(self._aresolve_one(url)): url for url in urls}
+        done, pending = await asyncio.wait(tasks, timeout=bounded(self.redirect_timeout))
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        resolved = {}
+        for task in done:
+            if task.exception() is None and task.result():
+                resolved[tasks[task]] = task.result()
+
+        self._apply_redirects(results, resolved)
+        self._save_redirects(store, resolved)
+        return results
+
+    def _build_params(self, query: str, offset: int, count: int) -> dict:
+        """构造单页请求参数，pn 为从 0 开始的结果偏移量"""
+        return {
+            "wd": query,
+            "rn": str(count),
+            "pn": str(offset),
+            "ie": "utf-8"
+        }
+
+    def _parse(self, html: str, max_results: int) -> List[SearchResult]:
+        """解析搜索结果页面"""
+        results = []
+
+        with measure("parse"):
+            items = parse_results(html, BAIDU, max_results, self.parser)
+
+        with measure("clean"):
+            snippets = clean_snippets([snippet for _, _, snippet in items])
+            for (title, raw_url, _), snippet in zip(items, snippets):
+                url = self._clean_url(raw_url)
+
+                if title and url:
+                    results.append(SearchResult(
+                        title=title,
+                        url=url,
+                        snippet=snippet
+                    ))
+
+        return results
+
+    def _finish_page(self, results: List[SearchResult]) -> List[SearchResult]:
+        """按需解析本页的跳转链接（去重前完成，真实地址相同的结果才能被去重）"""
+        if self.resolve_redirects:
+            self.resolve_redirect_urls(results)
+        return results
 
+    async def _afinish_page(self, results: List[SearchResult]) -> List[SearchResult]:
+        """_finish_page 的异步版本"""
+        if self.resolve_redirects:
+            await self.aresolve_redirect_urls(results)
         return results
 
     @property
@@ -1,82 +1,59 @@
 """
 Bing 搜索引擎
 通过 HTML 解析实现，无需 API Key
+
+Bing 往往无视 count 参数每页只返回约 10 条，因此按 first= 偏移量并发请求多页
 """
-import httpx
-from bs4 import BeautifulSoup
 from typing import List
-import sys
-import os
-
-# 添加父目录到路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import clean_snippet
-from engines import SearchEngine, SearchResult
+from textnorm import clean_snippets
+from timings import measure
+from utils import env_int
+from . import SearchResult
+from .paging import PagedEngine
+from .parsers import BING, parse_results
 
 
-class BingEngine(SearchEngine):
+class BingEngine(PagedEngine):
     """Bing 搜索引擎"""
 
-    def __init__(self):
+    def __init__(self, client=None, async_client=None, parser: str = None,
+                 page_concurrency: int = None):
         self.base_url = "https://www.bing.com/search"
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
+        self._client = client
+        self._async_client = async_client
+        # 结果页解析器: auto / lxml / bs4，默认读取 WEB_SEARCH_PARSER
+        self.parser = parser
+        # 分页并发上限
+        self.page_concurrency = page_concurrency or env_int("BING_PAGE_CONCURRENCY", 8)
+
+    def _build_params(self, query: str, offset: int, count: int) -> dict:
+        """构造单页请求参数，first 为从 1 开始的结果序号"""
+        return {
+            "q": query,
+            "count": str(count),
+            "first": str(offset + 1),
+            "setlang": "en"
+        }
 
-    def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
-        """执行搜索"""
+    def _parse(self, html: str, max_results: int) -> List[SearchResult]:
+        """解析搜索结果页面"""
         results = []
-        max_results = min(num_results, 50)
-
-        try:
-            params = {
-                "q": query,
-                "count": str(max_results),
-                "setlang": "en"
-            }
-
-            response = httpx.get(
-                self.base_url,
-                params=params,
-                headers=self.headers,
-                timeout=15.0,
-                follow_redirects=True
-            )
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "lxml")
-
-            # Bing 搜索结果在 .b_algo 类中
-            for item in soup.select(".b_algo")[:max_results]:
-                try:
-                    # 提取标题和链接
-                    title_elem = item.select_one("h2 a")
-                    if not title_elem:
-                        continue
-
-                    title = title_elem.get_text(strip=True)
-                    url = title_elem.get("href", "")
-
-                    # 提取摘要
-                    snippet_elem = item.select_one(".b_caption p")
-                    if not snippet_elem:
-                        snippet_elem = item.select_one("p")
-                    snippet = ""
-                    if snippet_elem:
-                        snippet = clean_snippet(snippet_elem.get_text(strip=True))
-
-                    if title and url:
-                        results.append(SearchResult(
-                            title=title,
-                            url=url,
-                            snippet=snippet
-                        ))
-
-                except Exception:
-                    continue
 
-        except Exception as e:
-            return []
+        with measure("parse"):
+            items = parse_results(html, BING, max_results, self.parser)
+
+        with measure("clean"):
+            snippets = clean_snippets([snippet for _, _, snippet in items])
+            for (title, url, _), snippet in zip(items, snippets):
+                if title and url:
+                    results.append(SearchResult(
+                        title=title,
+                        url=url,
+                        snippet=snippet
+                    ))
 
         return results
 
@@ -1,35 +1,295 @@
 """
 DuckDuckGo 搜索引擎
 使用 ddgs 库，完全免费无需 API
+
+DDGS 会话在进程内复用（批量模式和守护进程中不再每次新建会话），
+通过公开的 DDGS.text(backend=...) 请求各后端（html / lite / auto，以所装版本的 text() 实际支持为准），
+领先后端迟迟不返回、出错或无结果时才启动下一个（对冲请求），取第一个非空结果；
+竞速结束后不再启动新的后端，落败后端也不再发出后续请求（如翻页）；
+按后端统计延迟和失败率，下次优先尝试表现最好的后端
+
+请求量: 第一个后端使用调用方获取的限速令牌，之后启动的每个后端各取一个令牌；
+瞬时错误只重试出错的单个后端，不重新竞速
+
+环境变量:
+    DDG_BACKENDS      参与竞速的后端，逗号分隔，所装版本没有的后端会被跳过 (默认: html,lite)
+    DDG_HEDGE_DELAY   启动下一个后端前等待的秒数，0 表示同时启动全部后端
+                      (默认: 领先后端的延迟中位数，尚无统计时为 DEFAULT_HEDGE_DELAY)
 """
-from typing import List
-import sys
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Dict, List, Optional
+import ratelimit
+from policy import EngineStats
+from retry import DeadlineExceeded, bounded, remaining
+from utils import env_float
+from . import SearchEngine, SearchResult
+
+
+DEFAULT_BACKENDS = ("html", "lite")
+
+# 尚无延迟统计时（如每次新起进程的命令行调用）启动下一个后端前等待的秒数
+DEFAULT_HEDGE_DELAY = 2.0
+
+# 单个后端的默认请求超时（秒），与 DDGS 的默认值一致
+DEFAULT_TIMEOUT = 10
+
+
+class RaceFinished(Exception):
+    """竞速已结束，落败后端放弃后续请求"""
+
+
+class StoppableClient:
+    """
+    包装 DDGS 会话的 HTTP 客户端：stop 置位后不再发出请求
+
+    后端内部会连续请求多页，竞速结束后落败后端在下一次请求前停止
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self.stop: Optional[threading.Event] = None
+
+    def request(self, *args, **kwargs):
+        if self.stop is not None and self.stop.is_set():
+            raise RaceFinished()
+        return self._client.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class SessionPool:
+    """
+    按后端缓存的 DDGS 会话池
+
+    会话在进程内复用（保留 cookie 和连接）；各后端会修改会话的请求头，因此按后端分开缓存，
+    并发调用时各自取用不同的会话
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self.created = 0
+        self._idle: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, backend: str):
+        with self._lock:
+            idle = self._idle.get(backend)
+            if idle:
+                return idle.pop()
+            self.created += 1
+        from duckduckgo_search import DDGS
+        session = DDGS(timeout=DEFAULT_TIMEOUT)
+        session.client = StoppableClient(session.client)
+        return session
+
+    def release(self, backend: str, session):
+        with self._lock:
+            idle = self._idle.setdefault(backend, [])
+            if len(idle) < self.max_idle:
+                idle.append(session)
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
+
+
+_pool = SessionPool()
+_stats: Dict[str, EngineStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _backend_stats(backend: str) -> EngineStats:
+    with _stats_lock:
+        stats = _stats.get(backend)
+        if stats is None:
+            stats = _stats[backend] = EngineStats(window=50, min_samples=1)
+        return stats
+
+
+def backend_stats() -> Dict[str, dict]:
+    """各后端的延迟和失败率统计（非空结果计为成功）"""
+    with _stats_lock:
+        items = list(_stats.items())
+    report = {}
+    for backend, stats in items:
+        median = stats.percentile(0.5)
+        report[backend] = {
+            **stats.to_dict(),
+            "p50_ms": round(median * 1000, 1) if median is not None else None,
+        }
+    return report
+
 
-# 添加父目录到路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from engines import SearchEngine, SearchResult
+def _score(backend: str) -> float:
+    """排序用的得分，越小越优先：延迟中位数按失败率加权，尚无成功样本的后端排在最前以便试探"""
+    stats = _backend_stats(backend)
+    median = stats.percentile(0.5)
+    if median is None:
+        return 0.0 if not stats.samples else float("inf")
+    return median * (1 + 4 * stats.error_rate)
+
+
+def _submit(func, *args) -> Future:
+    """
+    在守护线程中执行 func
+
+    落败后端的请求无法中断，放弃其结果即可；守护线程不会阻塞进程退出
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    # 在上下文副本中执行，使总时限等上下文变量对工作线程可见
+    threading.Thread(
+        target=contextvars.copy_context().run, args=(run,), daemon=True, name="ddg-backend"
+    ).start()
+    return future
 
 
 class DuckDuckGoEngine(SearchEngine):
     """DuckDuckGo 搜索引擎"""
 
+    def __init__(self, backends: List[str] = None, hedge_delay: float = None):
+        if backends is None:
+            backends = [b.strip() for b in os.getenv("DDG_BACKENDS", ",".join(DEFAULT_BACKENDS)).split(",")]
+        self.backends = [b for b in backends if b]
+        if hedge_delay is None and os.getenv("DDG_HEDGE_DELAY"):
+            # 格式错误时按未设置处理
+            hedge_delay = env_float("DDG_HEDGE_DELAY", None)
+        self.hedge_delay = hedge_delay
+        # 最近一次返回结果的后端
+        self.backend = None
+
+    def available_backends(self) -> List[str]:
+        """
+        所装 duckduckgo_search 版本支持的后端，按统计得分排序
+
+        auto 表示交给 DDGS.text 自行选择；指定的后端都不可用时只用 auto
+        """
+        from duckduckgo_search import DDGS
+        backends = [b for b in self.backends if b == "auto" or hasattr(DDGS, f"_text_{b}")]
+        return sorted(backends or ["auto"], key=_score)
+
+    def _stagger(self, leader: str) -> float:
+        """启动下一个后端前等待的秒数"""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        median = _backend_stats(leader).percentile(0.5)
+        return median if median is not None else DEFAULT_HEDGE_DELAY
+
+    @staticmethod
+    def _call_backend(session, backend: str, query: str, max_results: int) -> list:
+        return session.text(keywords=query, max_results=max_results, backend=backend) or []
+
+    def _attempt(self, backend: str, query: str, max_results: int,
+                 stop: threading.Event = None, hedged: bool = False) -> list:
+        """
+        用复用的会话请求单个后端，瞬时错误时只重试该后端，并记录延迟统计
+
+        Args:
+            stop: 竞速结束时置位，此后该后端不再发出请求
+            hedged: 是否为对冲启动的后端，是则先取一个限速令牌
+        """
+        if hedged:
+            bucket = ratelimit.get_bucket(self.name)
+            if bucket is not None:
+                bucket.acquire()
+        if stop is not None and stop.is_set():
+            return []
+        session = _pool.acquire(backend)
+        # 超时不超过总时限的剩余时间
+        session.timeout = max(1, int(bounded(DEFAULT_TIMEOUT)))
+        if isinstance(session.client, StoppableClient):
+            session.client.stop = stop
+        started = time.perf_counter()
+        try:
+            items = self.retry_policy.call(self._call_backend, session, backend, query, max_results)
+        except Exception:
+            if stop is not None and stop.is_set():
+                # 因竞速结束而放弃，会话仍可复用，不计入统计
+                _pool.release(backend, session)
+                return []
+            # 出错的会话（如被限流）不再复用
+            _backend_stats(backend).record(time.perf_counter() - started, False)
+            raise
+        _backend_stats(backend).record(time.perf_counter() - started, bool(items))
+        _pool.release(backend, session)
+        return items
+
+    def _race(self, query: str, max_results: int) -> list:
+        """
+        各后端错开启动竞速，返回第一个非空结果
+
+        按得分从高到低启动；领先后端超过等待时间仍未返回、出错或结果为空时启动下一个。
+        返回后不再启动新的后端，进行中的后端在其下一次请求前停止，结果丢弃
+        """
+        queue = self.available_backends()
+        stagger = self._stagger(queue[0])
+        pending: Dict[Future, str] = {}
+        error: Optional[Exception] = None
+        finished = threading.Event()
+
+        def launch(hedged: bool = True):
+            backend = queue.pop(0)
+            pending[_submit(self._attempt, backend, query, max_results, finished, hedged)] = backend
+
+        launch(hedged=False)
+        try:
+            while pending:
+                timeout = stagger if queue else None
+                left = remaining()
+                if left is not None:
+                    timeout = max(0.0, left) if timeout is None else min(timeout, max(0.0, left))
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded()
+                    launch()
+                    continue
+
+                for future in done:
+                    backend = pending.pop(future)
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    if items:
+                        self.backend = backend
+                        return items
+
+                # 出错或结果为空，立即启动下一个后端
+                if queue:
+                    launch()
+
+            if error is not None:
+                raise error
+            return []
+
+        finally:
+            finished.set()
+            for future in pending:
+                future.cancel()
+
     def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
         """执行搜索"""
         results = []
         max_results = min(num_results, 50)
 
         try:
-            from duckduckgo_search import DDGS
-
-            ddgs = DDGS()
-
-            # 使用 html 后端（更稳定）
-            ddg_results = ddgs.text(
-                keywords=query,
-                max_results=max_results,
-                backend="html"
-            )
+            ddg_results = self._race(query, max_results)
 
             if ddg_results:
                 for item in ddg_results:
@@ -52,6 +312,7 @@ class DuckDuckGoEngine(SearchEngine):
             )
         except Exception as e:
             # 出错时返回空列表
+            self.last_error = e
             import logging
             logging.warning(f"DuckDuckGo search error: {e}")
             return []
@@ -2,20 +2,24 @@
 Google Custom Search API 搜索引擎
 使用 Google Custom Search JSON API，需要 API Key 和 CX ID
 """
-import httpx
-from typing import List
-import sys
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List
 import os
-
-# 添加父目录到路径
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from engines import SearchEngine, SearchResult
+from timings import measure
+from utils import env_int
+from retry import DeadlineExceeded, await_within, remaining, request_timeout, truncation
+from . import SearchEngine, SearchResult
 
 
 class GoogleEngine(SearchEngine):
     """Google Custom Search API 搜索引擎"""
 
-    def __init__(self, api_key: str = None, cx: str = None):
+    def __init__(self, api_key: str = None, cx: str = None, client=None, async_client=None,
+                 page_concurrency: int = None):
         self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
         self.cx = cx or os.getenv("GOOGLE_CX_ID")
 
@@ -29,63 +33,231 @@ class GoogleEngine(SearchEngine):
             )
 
         self.base_url = "https://www.googleapis.com/customsearch/v1"
+        self._client = client
+        self._async_client = async_client
+        # 分页并发上限
+        self.page_concurrency = page_concurrency or env_int("GOOGLE_PAGE_CONCURRENCY", 4)
 
-    def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
-        """执行搜索"""
+    def _build_params(self, query: str, start_index: int, per_page: int) -> dict:
+        """构造单页请求参数"""
+        return {
+            "key": self.api_key,
+            "cx": self.cx,
+            "q": query,
+            "num": per_page,
+            "start": start_index
+        }
+
+    def _pages(self, max_results: int) -> List[tuple]:
+        """计算每页的 (start, num)，每次最多10条"""
+        pages = []
+        for start in range(0, max_results, 10):
+            pages.append((start + 1, min(10, max_results - start)))
+        return pages
+
+    def _parse_page(self, data: dict) -> List[SearchResult]:
+        """解析单页 API 响应"""
         results = []
+        for item in data.get("items", []):
+            title = item.get("title", "")
+            url = item.get("link", "")
+            snippet = item.get("snippet", "")
+
+            if title and url:
+                results.append(SearchResult(
+                    title=title,
+                    url=url,
+                    snippet=snippet
+                ))
+        return results
+
+    @staticmethod
+    def _has_next_page(data: dict) -> bool:
+        """检查是否还有更多结果"""
+        return "queries" in data and "nextPage" in data["queries"]
+
+    def _remaining_pages(self, data: dict, max_results: int) -> List[tuple]:
+        """
+        第一页之后还需要请求的分页：只请求第一页给出的结果总数以内的分页，
+        避免为不存在的分页消耗 API 配额
+        """
+        if not self._has_next_page(data):
+            return []
+        try:
+            total = int(data.get("searchInformation", {}).get("totalResults", max_results))
+        except (TypeError, ValueError):
+            total = max_results
+        return self._pages(min(max_results, total))[1:]
+
+    def _fetch_page(self, query: str, start_index: int, per_page: int,
+                    stop: threading.Event = None) -> dict:
+        """同步请求单页，瞬时错误时重试；stop 置位后不再发出请求（含重试）"""
+        def request():
+            if stop is not None and stop.is_set():
+                raise concurrent.futures.CancelledError()
+            response = self.client.get(
+                self.base_url,
+                params=self._build_params(query, start_index, per_page),
+                **request_timeout()
+            )
+            response.raise_for_status()
+            return response
+
+        response = self.retry_policy.call(request)
+        with measure("parse"):
+            return response.json()
+
+    async def _afetch_page(self, query: str, start_index: int, per_page: int,
+                           semaphore: asyncio.Semaphore) -> dict:
+        """异步请求单页，受并发上限约束（重试前的退避等待不占用并发名额）"""
+        async def request():
+            async with semaphore:
+                response = await self.async_client.get(
+                    self.base_url,
+                    params=self._build_params(query, start_index, per_page),
+                    **request_timeout()
+                )
+            response.raise_for_status()
+            return response
+
+        response = await self.retry_policy.acall(request)
+        with measure("parse"):
+            return response.json()
+
+    def iter_search(self, query: str, num_results: int = 10) -> Iterator[SearchResult]:
+        """
+        逐页产出结果：先请求第一页并立即产出，再按其结果总数并发请求后续分页
+
+        出错或总时限到期时抛出异常；此前已产出部分分页时在 truncated 中记录截断情况
+        """
         # Google API 每次最多返回 10 条，需要多次请求
         max_results = min(num_results, 100)
+        self.truncated = None
+        if max_results <= 0:
+            return
+        pages = self._pages(max_results)
+        completed = 0
+        stop = threading.Event()
+        executor = None
 
         try:
-            # 计算需要请求的次数（每次最多10条）
-            num_requests = (max_results + 9) // 10
-
-            for i in range(num_requests):
-                start_index = i * 10 + 1
-                remaining = max_results - i * 10
-                per_page = min(10, remaining)
-
-                params = {
-                    "key": self.api_key,
-                    "cx": self.cx,
-                    "q": query,
-                    "num": per_page,
-                    "start": start_index
-                }
-
-                response = httpx.get(
-                    self.base_url,
-                    params=params,
-                    timeout=15.0
+            data = self._fetch_page(query, *pages[0])
+            yield from self._parse_page(data)
+            completed += 1
+            rest = self._remaining_pages(data, max_results)
+            pages = pages[:1] + rest
+            if not rest:
+                return
+
+            executor = ThreadPoolExecutor(max_workers=max(1, min(self.page_concurrency, len(rest))))
+            futures = [
+                # 在上下文副本中执行，使计时等上下文变量对工作线程可见
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._fetch_page, query, start_index, per_page, stop
                 )
-                response.raise_for_status()
-
-                data = response.json()
-
-                # 解析结果
-                if "items" in data:
-                    for item in data["items"]:
-                        title = item.get("title", "")
-                        url = item.get("link", "")
-                        snippet = item.get("snippet", "")
-
-                        if title and url:
-                            results.append(SearchResult(
-                                title=title,
-                                url=url,
-                                snippet=snippet
-                            ))
-
-                # 检查是否还有更多结果
-                if "queries" not in data or "nextPage" not in data["queries"]:
+                for start_index, per_page in rest
+            ]
+
+            for future in futures:
+                left = remaining()
+                try:
+                    data = future.result(timeout=None if left is None else max(0.0, left))
+                except concurrent.futures.TimeoutError:
+                    raise DeadlineExceeded() from None
+                yield from self._parse_page(data)
+                completed += 1
+
+                # 没有下一页时丢弃后续分页
+                if not self._has_next_page(data):
                     break
 
         except Exception as e:
+            if completed:
+                self.truncated = truncation(e, pages=len(pages), completed_pages=completed)
+            raise
+
+        finally:
+            # 进行中的请求无法撤回，但不再发出新请求或重试（调用方提前停止迭代时同样生效）
+            stop.set()
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
+        """执行搜索，后续分页出错或超出总时限时返回已完成分页的结果"""
+        results = []
+        try:
+            for result in self.iter_search(query, num_results):
+                results.append(result)
+            return results
+
+        except Exception as e:
+            self.last_error = e
             import logging
             logging.warning(f"Google API search error: {e}")
-            return []
+            return results
 
-        return results
+    async def aiter_search(self, query: str, num_results: int = 10) -> AsyncIterator[SearchResult]:
+        """iter_search 的异步版本"""
+        max_results = min(num_results, 100)
+        self.truncated = None
+        if max_results <= 0:
+            return
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+        pages = self._pages(max_results)
+        completed = 0
+        tasks = []
+
+        try:
+            data = await await_within(self._afetch_page(query, *pages[0], semaphore))
+            for result in self._parse_page(data):
+                yield result
+            completed += 1
+            rest = self._remaining_pages(data, max_results)
+            pages = pages[:1] + rest
+
+            tasks = [
+                asyncio.ensure_future(self._afetch_page(query, start_index, per_page, semaphore))
+                for start_index, per_page in rest
+            ]
+            for task in tasks:
+                data = await await_within(task)
+                for result in self._parse_page(data):
+                    yield result
+                completed += 1
+
+                if not self._has_next_page(data):
+                    break
+
+        except Exception as e:
+            if completed:
+                self.truncated = truncation(e, pages=len(pages), completed_pages=completed)
+            raise
+
+        finally:
+            # 取消仍在进行中的后续分页请求
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def asearch(self, query: str, num_results: int = 10) -> List[SearchResult]:
+        """异步执行搜索，后续分页出错或超出总时限时返回已完成分页的结果"""
+        results = []
+        pages = self.aiter_search(query, num_results)
+        try:
+            async for result in pages:
+                results.append(result)
+            return results
+
+        except Exception as e:
+            self.last_error = e
+            import logging
+            logging.warning(f"Google API search error: {e}")
+            return results
+
+        finally:
+            await pages.aclose()
 
     @property
     def name(self) -> str:
@@ -0,0 +1,236 @@
+"""
+按偏移量分页的 HTML 搜索引擎
+各页的偏移量可以预先算出，在并发上限内同时请求，按页序产出并按 URL 去重；
+某一页没有新结果（已到末页或引擎重复返回最后一页）时丢弃后续分页
+
+第一页的限速令牌由调用方在搜索前获取，后续每页请求前各取一个令牌，翻页不会绕过限速
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List
+import ratelimit
+from utils import normalize_url
+from retry import DeadlineExceeded, await_within, remaining, request_timeout, truncation
+from . import SearchEngine, SearchResult
+
+
+class PagedEngine(SearchEngine):
+    """
+    分页搜索引擎基类
+
+    子类提供 base_url、headers、_build_params(query, offset, count) 和 _parse(html, max_results)，
+    可覆盖 _finish_page / _afinish_page 对每页结果做后处理
+    """
+
+    # 每页请求的结果数
+    per_page = 10
+
+    # 单次搜索最多返回的结果数
+    max_results = 200
+
+    # 分页并发上限
+    page_concurrency = 8
+
+    @abstractmethod
+    def _build_params(self, query: str, offset: int, count: int) -> dict:
+        """构造单页请求参数，offset 为从 0 开始的结果偏移量"""
+
+    @abstractmethod
+    def _parse(self, html: str, max_results: int) -> List[SearchResult]:
+        """解析单页结果"""
+
+    def _pages(self, num_results: int) -> List[int]:
+        """各页的结果偏移量"""
+        return list(range(0, min(num_results, self.max_results), self.per_page))
+
+    def _fetch(self, query: str, offset: int) -> str:
+        """请求单页（单次尝试，超时不超过总时限的剩余时间）"""
+        response = self.client.get(
+            self.base_url,
+            params=self._build_params(query, offset, self.per_page),
+            headers=self.headers,
+            follow_redirects=True,
+            **request_timeout()
+        )
+        response.raise_for_status()
+        return response.text
+
+    async def _afetch(self, query: str, offset: int) -> str:
+        """异步请求单页"""
+        response = await self.async_client.get(
+            self.base_url,
+            params=self._build_params(query, offset, self.per_page),
+            headers=self.headers,
+            follow_redirects=True,
+            **request_timeout()
+        )
+        response.raise_for_status()
+        return response.text
+
+    def _fetch_page(self, query: str, offset: int,
+                    stop: threading.Event = None) -> List[SearchResult]:
+        """
+        请求、解析并后处理单页，瞬时错误时重试
+
+        后续分页先取限速令牌；stop 置位后（已到末页或调用方停止迭代）不再发出请求
+        """
+        if offset > 0:
+            bucket = ratelimit.get_bucket(self.name)
+            if bucket is not None:
+                bucket.acquire()
+        if stop is not None and stop.is_set():
+            raise concurrent.futures.CancelledError()
+        html = self.retry_policy.call(self._fetch, query, offset)
+        return self._finish_page(self._parse(html, self.per_page))
+
+    async def _afetch_page(self, query: str, offset: int,
+                           semaphore: asyncio.Semaphore) -> List[SearchResult]:
+        """
+        异步请求并解析单页，受并发上限约束（重试前的退避等待不占用并发名额）
+
+        后续分页先取限速令牌，排队等待令牌时不占用并发名额
+        """
+        if offset > 0:
+            bucket = ratelimit.get_bucket(self.name)
+            if bucket is not None:
+                await bucket.aacquire()
+
+        async def request():
+            async with semaphore:
+                return await self._afetch(query, offset)
+
+        html = await self.retry_policy.acall(request)
+        return await self._afinish_page(self._parse(html, self.per_page))
+
+    def _finish_page(self, results: List[SearchResult]) -> List[SearchResult]:
+        """单页结果的后处理（如解析跳转链接），与其他分页的请求并发执行，在去重前完成"""
+        return results
+
+    async def _afinish_page(self, results: List[SearchResult]) -> List[SearchResult]:
+        """_finish_page 的异步版本"""
+        return results
+
+    @staticmethod
+    def _dedupe(results: List[SearchResult], seen: set) -> List[SearchResult]:
+        """去掉此前分页中已出现的 URL"""
+        unique = []
+        for result in results:
+            key = normalize_url(result.url)
+            if key not in seen:
+                seen.add(key)
+                unique.append(result)
+        return unique
+
+    def iter_search(self, query: str, num_results: int = 10) -> Iterator[SearchResult]:
+        """
+        逐页产出结果：各页并发请求，第一页返回后立即产出，不等待后续分页
+
+        出错或总时限到期时抛出异常；此前已产出部分分页时在 truncated 中记录截断情况
+        """
+        limit = min(num_results, self.max_results)
+        pages = self._pages(limit)
+        self.truncated = None
+        completed = 0
+        count = 0
+        seen = set()
+        stop = threading.Event()
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.page_concurrency, len(pages))))
+        try:
+            futures = [
+                # 在上下文副本中执行，使计时、总时限等上下文变量对工作线程可见
+                executor.submit(contextvars.copy_context().run, self._fetch_page, query, offset, stop)
+                for offset in pages
+            ]
+
+            for future in futures:
+                left = remaining()
+                try:
+                    page = future.result(timeout=None if left is None else max(0.0, left))
+                except concurrent.futures.TimeoutError:
+                    raise DeadlineExceeded() from None
+                page = self._dedupe(page, seen)
+                completed += 1
+                for result in page[:limit - count]:
+                    yield result
+                count += len(page)
+
+                # 没有新结果说明已到末页
+                if not page or count >= limit:
+                    break
+
+        except Exception as e:
+            if completed:
+                self.truncated = truncation(e, pages=len(pages), completed_pages=completed)
+            raise
+
+        finally:
+            # 取消尚未开始的请求，不等待进行中的请求（调用方提前停止迭代时同样生效）；
+            # 正在等待限速令牌的分页取到令牌后也不再发出请求
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def search(self, query: str, num_results: int = 10) -> List[SearchResult]:
+        """执行搜索，后续分页出错或超出总时限时返回已完成分页的结果"""
+        results = []
+        try:
+            for result in self.iter_search(query, num_results):
+                results.append(result)
+        except Exception as e:
+            self.last_error = e
+        return results
+
+    async def aiter_search(self, query: str, num_results: int = 10) -> AsyncIterator[SearchResult]:
+        """iter_search 的异步版本"""
+        limit = min(num_results, self.max_results)
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+        self.truncated = None
+        completed = 0
+        count = 0
+        seen = set()
+
+        tasks = [
+            asyncio.ensure_future(self._afetch_page(query, offset, semaphore))
+            for offset in self._pages(limit)
+        ]
+
+        try:
+            for task in tasks:
+                page = await await_within(task)
+                page = self._dedupe(page, seen)
+                completed += 1
+                for result in page[:limit - count]:
+                    yield result
+                count += len(page)
+
+                if not page or count >= limit:
+                    break
+
+        except Exception as e:
+            if completed:
+                self.truncated = truncation(e, pages=len(tasks), completed_pages=completed)
+            raise
+
+        finally:
+            # 取消仍在进行中的后续分页请求
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def asearch(self, query: str, num_results: int = 10) -> List[SearchResult]:
+        """异步执行搜索，后续分页出错或超出总时限时返回已完成分页的结果"""
+        results = []
+        pages = self.aiter_search(query, num_results)
+        try:
+            async for result in pages:
+                results.append(result)
+        except Exception as e:
+            self.last_error = e
+        finally:
+            await pages.aclose()
+        return results
@@ -0,0 +1,177 @@
+"""
+搜索结果页解析器
+快速路径: 只截取结果容器所在的 HTML 片段，直接用 lxml XPath 解析；
+出错时回退到 BeautifulSoup 完整解析（与原实现一致）
+
+通过环境变量 WEB_SEARCH_PARSER 选择解析器: auto (默认) / lxml / bs4
+"""
+import os
+from typing import List, Optional, Tuple
+
+
+def _has_class(name: str) -> str:
+    """XPath 中等价于 CSS 类选择器 .name 的条件"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# BeautifulSoup get_text() 不包含 script/style/template 中的文本，保持一致
+_TEXT_XPATH = ".//text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+
+
+class ParserSpec:
+    """
+    结果页结构描述，每个选择器同时给出 CSS（BeautifulSoup）和 XPath（lxml）写法
+
+    Args:
+        container: 单条结果容器
+        title: 标题链接候选选择器，按顺序取第一个命中的
+        snippet: 摘要候选选择器，按顺序取第一个命中的
+        region: (起始标记, 结束标记)，快速路径只解析两者之间的 HTML
+    """
+
+    def __init__(self, container: Tuple[str, str], title: List[Tuple[str, str]],
+                 snippet: List[Tuple[str, str]], region: Tuple[str, Optional[str]] = None):
+        self.container = container
+        self.title = title
+        self.snippet = snippet
+        self.region = region
+
+
+BING = ParserSpec(
+    container=(".b_algo", f"//*[{_has_class('b_algo')}]"),
+    title=[("h2 a", ".//h2//a")],
+    snippet=[
+        (".b_caption p", f".//*[{_has_class('b_caption')}]//p"),
+        ("p", ".//p"),
+    ],
+    region=('id="b_results"', 'id="b_context"'),
+)
+
+BAIDU = ParserSpec(
+    container=(".result", f"//*[{_has_class('result')}]"),
+    title=[("h3 a", ".//h3//a"), ("a", ".//a")],
+    snippet=[
+        (".c-abstract", f".//*[{_has_class('c-abstract')}]"),
+        (".abstract", f".//*[{_has_class('abstract')}]"),
+        ("div", ".//div"),
+    ],
+    region=('id="content_left"', 'id="content_right"'),
+)
+
+
+# 解析结果: (标题, 链接, 摘要原文)
+RawResult = Tuple[str, str, str]
+
+
+def _slice_region(html: str, region: Tuple[str, Optional[str]]) -> Optional[str]:
+    """截取结果区域，跳过页头的大段内联脚本和样式以及侧边栏"""
+    start_marker, end_marker = region
+    start = html.find(start_marker)
+    if start == -1:
+        return None
+    start = html.rfind("<", 0, start)
+    if start == -1:
+        return None
+
+    end = html.find(end_marker, start) if end_marker else -1
+    if end != -1:
+        end = html.rfind("<", start, end)
+    # lxml 会自动补全未闭合的标签
+    return html[start:end] if end > start else html[start:]
+
+
+def _lxml_text(elem) -> str:
+    """等价于 BeautifulSoup 的 get_text(strip=True)"""
+    return "".join(text.strip() for text in elem.xpath(_TEXT_XPATH))
+
+
+def _lxml_first(item, selectors: List[Tuple[str, str]]):
+    for _, xpath in selectors:
+        found = item.xpath(xpath)
+        if found:
+            return found[0]
+    return None
+
+
+def parse_lxml(html: str, spec: ParserSpec, max_results: int) -> List[RawResult]:
+    """快速路径: lxml 解析结果区域"""
+    import lxml.html
+
+    fragment = _slice_region(html, spec.region) if spec.region else None
+    root = lxml.html.fromstring(fragment or html)
+
+    results = []
+    for item in root.xpath(spec.container[1])[:max_results]:
+        try:
+            title_elem = _lxml_first(item, spec.title)
+            if title_elem is None:
+                continue
+
+            snippet_elem = _lxml_first(item, spec.snippet)
+            results.append((
+                _lxml_text(title_elem),
+                title_elem.get("href") or "",
+                _lxml_text(snippet_elem) if snippet_elem is not None else "",
+            ))
+        except Exception:
+            continue
+    return results
+
+
+def parse_bs4(html: str, spec: ParserSpec, max_results: int) -> List[RawResult]:
+    """回退路径: BeautifulSoup 完整解析"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "lxml")
+
+    results = []
+    for item in soup.select(spec.container[0])[:max_results]:
+        try:
+            title_elem = None
+            for css, _ in spec.title:
+                title_elem = item.select_one(css)
+                if title_elem:
+                    break
+            if not title_elem:
+                continue
+
+            snippet_elem = None
+            for css, _ in spec.snippet:
+                snippet_elem = item.select_one(css)
+                if snippet_elem:
+                    break
+
+            results.append((
+                title_elem.get_text(strip=True),
+                title_elem.get("href", ""),
+                snippet_elem.get_text(strip=True) if snippet_elem else "",
+            ))
+        except Exception:
+            continue
+    return results
+
+
+def parse_results(html: str, spec: ParserSpec, max_results: int,
+                  backend: str = None) -> List[RawResult]:
+    """
+    解析结果页
+
+    Args:
+        html: 页面 HTML
+        spec: 页面结构描述
+        max_results: 最多解析的结果数
+        backend: auto / lxml / bs4，默认读取 WEB_SEARCH_PARSER
+
+    Returns:
+        (标题, 链接, 摘要原文) 列表
+    """
+    backend = (backend or os.getenv("WEB_SEARCH_PARSER", "auto")).lower()
+    if backend == "bs4":
+        return parse_bs4(html, spec, max_results)
+    if backend == "lxml":
+        return parse_lxml(html, spec, max_results)
+
+    try:
+        return parse_lxml(html, spec, max_results)
+    except Exception:
+        return parse_bs4(html, spec, max_results)
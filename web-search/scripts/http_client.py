@@ -0,0 +1,175 @@
+"""
+共享 HTTP 客户端
+每个进程复用同一个 httpx 连接池，避免每次请求重复 DNS 解析、TCP 连接和 TLS 握手
+
+配置优先级: configure() 参数 > 环境变量 > 默认值
+
+环境变量:
+    WEB_SEARCH_TIMEOUT            请求超时秒数 (默认: 15)
+    WEB_SEARCH_CONNECT_TIMEOUT    连接超时秒数 (默认: 5)
+    WEB_SEARCH_MAX_CONNECTIONS    连接池最大连接数 (默认: 100)
+    WEB_SEARCH_MAX_KEEPALIVE      最大空闲保活连接数 (默认: 20)
+    WEB_SEARCH_KEEPALIVE_EXPIRY   空闲连接保活秒数 (默认: 30)
+    WEB_SEARCH_HTTP2              是否启用 HTTP/2，0 关闭 (默认: 1，需安装 h2)
+"""
+import asyncio
+import atexit
+import importlib.util
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+import timings
+from utils import env_float, env_int
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+
+def http2_available() -> bool:
+    """是否安装了 HTTP/2 依赖 h2"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class HttpConfig:
+    """连接池与超时配置"""
+
+    def __init__(self, timeout: float = None, connect_timeout: float = None,
+                 max_connections: int = None, max_keepalive: int = None,
+                 keepalive_expiry: float = None, http2: bool = None):
+        self.timeout = timeout if timeout is not None else env_float("WEB_SEARCH_TIMEOUT", 15.0)
+        self.connect_timeout = (connect_timeout if connect_timeout is not None
+                                else env_float("WEB_SEARCH_CONNECT_TIMEOUT", 5.0))
+        self.max_connections = (max_connections if max_connections is not None
+                                else env_int("WEB_SEARCH_MAX_CONNECTIONS", 100))
+        self.max_keepalive = (max_keepalive if max_keepalive is not None
+                              else env_int("WEB_SEARCH_MAX_KEEPALIVE", 20))
+        self.keepalive_expiry = (keepalive_expiry if keepalive_expiry is not None
+                                 else env_float("WEB_SEARCH_KEEPALIVE_EXPIRY", 30.0))
+        if http2 is None:
+            http2 = os.getenv("WEB_SEARCH_HTTP2", "1") != "0"
+        # 服务端不支持时 httpx 会通过 ALPN 自动回落到 HTTP/1.1
+        self.http2 = http2 and http2_available()
+
+    def client_kwargs(self) -> dict:
+        """构造 httpx 客户端参数（timeout 为 0 表示不限制读写超时）"""
+        if self.timeout > 0:
+            timeout = httpx.Timeout(self.timeout, connect=min(self.connect_timeout, self.timeout))
+        else:
+            timeout = httpx.Timeout(None, connect=self.connect_timeout)
+        return {
+            "timeout": timeout,
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "http2": self.http2,
+            "headers": DEFAULT_HEADERS,
+        }
+
+
+_lock = threading.Lock()
+_config = HttpConfig()
+_client: Optional[httpx.Client] = None
+# 异步客户端绑定事件循环，按循环分别缓存
+_async_clients: Dict[int, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def configure(**kwargs) -> HttpConfig:
+    """
+    修改共享客户端配置，已创建的客户端会被关闭并在下次使用时按新配置重建
+
+    Args:
+        **kwargs: HttpConfig 的参数
+
+    Returns:
+        新的配置
+    """
+    global _config, _client
+    with _lock:
+        _config = HttpConfig(**kwargs)
+        if _client is not None:
+            _client.close()
+            _client = None
+        async_clients = list(_async_clients.values())
+        _async_clients.clear()
+    for loop, client in async_clients:
+        _close_async_client(loop, client)
+    return _config
+
+
+def _close_async_client(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+    """在客户端所属的事件循环上关闭它，释放连接池"""
+    if loop.is_closed():
+        # 事件循环关闭时其上的连接已随之失效
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        loop.create_task(client.aclose())
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        loop.run_until_complete(client.aclose())
+
+
+def get_config() -> HttpConfig:
+    """当前配置"""
+    return _config
+
+
+def get_client() -> httpx.Client:
+    """进程内共享的同步客户端（线程安全）"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(
+                    **_config.client_kwargs(),
+                    event_hooks={"request": [timings.on_request]}
+                )
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """当前事件循环共享的异步客户端，必须在协程中调用"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        # 清理已关闭事件循环遗留的客户端
+        for key in [k for k, (l, _) in _async_clients.items() if l.is_closed()]:
+            del _async_clients[key]
+
+        entry = _async_clients.get(id(loop))
+        if entry is None or entry[0] is not loop:
+            entry = (loop, httpx.AsyncClient(
+                **_config.client_kwargs(),
+                event_hooks={"request": [timings.aon_request]}
+            ))
+            _async_clients[id(loop)] = entry
+    return entry[1]
+
+
+async def aclose_async_client():
+    """关闭当前事件循环的异步客户端"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.pop(id(loop), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+
+@atexit.register
+def close_client():
+    """关闭同步客户端"""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
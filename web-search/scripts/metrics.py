@@ -0,0 +1,233 @@
+"""
+Prometheus 指标
+按引擎统计请求数、结果数、耗时直方图和各阶段累计耗时，输出 Prometheus 文本格式，
+可以写入文件（供 node_exporter 的 textfile collector 采集）或通过本地 HTTP 端点暴露
+
+写文件时与已有内容累加合并，多个 search.py 进程可以写同一个文件
+"""
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# 请求耗时直方图的桶上限（秒）
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 指标名 -> (类型, 说明)
+FAMILIES = {
+    "web_search_requests_total": (
+        "counter", "Search requests by engine and status (ok, empty, error, cache, miss)"
+    ),
+    "web_search_results_total": ("counter", "Results returned by engine"),
+    "web_search_request_duration_seconds": ("histogram", "Search request duration by engine"),
+    "web_search_stage_seconds_total": (
+        "counter", "Cumulative time spent per stage (connect, tls, ttfb, download, parse, clean)"
+    ),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$")
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+
+
+def _format_le(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _family(sample: str) -> str:
+    """样本名所属的指标名（直方图的 _bucket/_sum/_count 归入同一指标）"""
+    for suffix in ("_bucket", "_sum", "_count"):
+        if sample.endswith(suffix) and sample[:-len(suffix)] in FAMILIES:
+            return sample[:-len(suffix)]
+    return sample
+
+
+def _sort_key(key: Key):
+    name, labels = key
+    # le 按数值排序，+Inf 排在最后
+    return name, tuple(
+        (k, float(v) if k == "le" else 0.0, v if k != "le" else "") for k, v in labels
+    )
+
+
+def parse_text(text: str) -> Dict[Key, float]:
+    """解析 Prometheus 文本格式的样本"""
+    samples = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        try:
+            value = float(value)
+        except ValueError:
+            continue
+        labels = tuple(sorted(
+            (k, _unescape(v)) for k, v in _LABEL_RE.findall(labels or "")
+        ))
+        samples[(name, labels)] = samples.get((name, labels), 0.0) + value
+    return samples
+
+
+def render(samples: Dict[Key, float]) -> str:
+    """把样本渲染为 Prometheus 文本格式"""
+    lines = []
+    current = None
+    for name, labels in sorted(samples, key=_sort_key):
+        family = _family(name)
+        if family != current:
+            current = family
+            if family in FAMILIES:
+                kind, help_text = FAMILIES[family]
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} {kind}")
+        value = samples[(name, labels)]
+        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+        value_text = repr(int(value)) if value == int(value) else repr(value)
+        lines.append(f"{name}{{{label_text}}} {value_text}" if labels else f"{name} {value_text}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class MetricsRegistry:
+    """进程内的指标累加器（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[Key, float] = {}
+        # 上次写文件时的快照，写文件只累加增量
+        self._flushed: Dict[Key, float] = {}
+
+    def _inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._samples[key] = self._samples.get(key, 0.0) + value
+
+    def observe(self, engine: str, status: str, duration: float, results: int = 0,
+                stages: Dict[str, float] = None):
+        """
+        记录一次引擎调用
+
+        Args:
+            engine: 引擎名
+            status: ok 有结果, empty 无结果, error 出错, cache 命中缓存, miss 仅缓存模式未命中
+            duration: 耗时秒数
+            results: 结果数量
+            stages: 各阶段耗时秒数（来自 timings.Timings.stages）
+        """
+        histogram = "web_search_request_duration_seconds"
+        with self._lock:
+            self._inc("web_search_requests_total", engine=engine, status=status)
+            self._inc("web_search_results_total", results, engine=engine)
+            for bound in DURATION_BUCKETS + (float("inf"),):
+                # 累积直方图：每个桶统计耗时不超过上限的请求数
+                self._inc(f"{histogram}_bucket", 1.0 if duration <= bound else 0.0,
+                          engine=engine, le=_format_le(bound))
+            self._inc(f"{histogram}_sum", duration, engine=engine)
+            self._inc(f"{histogram}_count", engine=engine)
+            for stage, seconds in (stages or {}).items():
+                self._inc("web_search_stage_seconds_total", seconds, engine=engine, stage=stage)
+
+    def snapshot(self) -> Dict[Key, float]:
+        with self._lock:
+            return dict(self._samples)
+
+    def render(self) -> str:
+        """当前进程的指标文本"""
+        return render(self.snapshot())
+
+    def write_file(self, path: str):
+        """
+        把自上次写入以来的增量累加到指标文件中
+
+        文件加锁后读取、合并，再写临时文件原子替换，采集方不会读到半个文件
+        """
+        with self._lock:
+            delta = {
+                key: value - self._flushed.get(key, 0.0)
+                for key, value in self._samples.items()
+            }
+            self._flushed = dict(self._samples)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        merged = parse_text(f.read())
+                except OSError:
+                    merged = {}
+                for key, value in delta.items():
+                    merged[key] = merged.get(key, 0.0) + value
+
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(render(merged))
+                os.replace(tmp_path, path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """
+        在后台线程中通过 HTTP 暴露 /metrics
+
+        Returns:
+            HTTP 服务对象，调用其 shutdown() 停止
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """进程内共享的指标累加器"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
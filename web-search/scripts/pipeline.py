@@ -0,0 +1,160 @@
+"""
+搜索 + 抓取流水线
+搜索结果的 URL 一到达就交给抓取阶段，复用 web-fetch 的 fetch.fetch() 在线程池中并发下载并提取正文，
+总耗时约为一次搜索加一次抓取，而不是逐个 URL 串行启动 fetch.py 的耗时之和
+
+环境变量:
+    WEB_FETCH_SCRIPTS   web-fetch 的 scripts 目录 (默认: 与 web-search 同级的 web-fetch/scripts)
+"""
+import asyncio
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional
+
+
+# 默认同时抓取的页面数
+DEFAULT_CONCURRENCY = 5
+
+# 单个 URL 的默认时限（秒）
+DEFAULT_URL_TIMEOUT = 15.0
+
+# 整个流水线（搜索 + 抓取）的默认时限（秒）
+DEFAULT_DEADLINE = 30.0
+
+
+def fetch_scripts_dir() -> str:
+    """web-fetch 的 scripts 目录"""
+    path = os.getenv("WEB_FETCH_SCRIPTS")
+    if path:
+        return path
+    skills_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(skills_dir, "web-fetch", "scripts")
+
+
+def load_fetcher() -> Callable[..., dict]:
+    """
+    导入 web-fetch 的 fetch 函数
+
+    Raises:
+        ImportError: 找不到 web-fetch
+    """
+    scripts_dir = fetch_scripts_dir()
+    if not os.path.isfile(os.path.join(scripts_dir, "fetch.py")):
+        raise ImportError(f"找不到 web-fetch: {scripts_dir}（可用 WEB_FETCH_SCRIPTS 指定）")
+    # 追加到末尾，避免 web-fetch 的模块遮蔽 web-search 的同名模块
+    if scripts_dir not in sys.path:
+        sys.path.append(scripts_dir)
+    from fetch import fetch
+    return fetch
+
+
+def _merge(rank: int, item: dict, page: dict, elapsed: float) -> dict:
+    """合并搜索结果与抓取结果；页面标题另存为 page_title，不覆盖搜索结果的标题"""
+    record = {
+        "rank": rank,
+        **item,
+        "page_title": page.get("title") or "",
+        "content": page.get("content") or "",
+        "length": page.get("length", len(page.get("content") or "")),
+        "fetch_ms": round(elapsed * 1000, 1),
+    }
+    if page.get("error"):
+        record["error"] = page["error"]
+    return record
+
+
+async def afetch_results(results: AsyncIterator[dict], top: int,
+                         fetcher: Callable[..., dict] = None,
+                         concurrency: int = DEFAULT_CONCURRENCY,
+                         url_timeout: Optional[float] = DEFAULT_URL_TIMEOUT,
+                         deadline: Optional[float] = DEFAULT_DEADLINE,
+                         **fetch_options) -> AsyncIterator[dict]:
+    """
+    边搜索边抓取：前 top 个 URL 一到达就开始抓取，按完成顺序产出
+
+    Args:
+        results: 搜索结果字典的异步迭代器（如 search.aiter_search），需包含 url
+        top: 抓取的结果数
+        fetcher: 抓取函数，默认为 web-fetch 的 fetch.fetch
+        concurrency: 同时抓取的页面数
+        url_timeout: 单个 URL 的时限（秒），从开始抓取时计时，不含排队时间
+        deadline: 整个流水线的时限（秒），到期时未完成的 URL 以错误形式产出
+        **fetch_options: 传给 fetcher 的参数，如 output_format
+
+    Yields:
+        搜索结果字典，额外包含 rank（搜索结果中的顺序）、page_title、content、length、fetch_ms，
+        失败时包含 error
+    """
+    fetcher = fetcher or load_fetcher()
+    if url_timeout:
+        fetch_options.setdefault("timeout", url_timeout)
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + deadline if deadline else None
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch")
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = asyncio.Queue()
+    pending = {}  # rank -> 尚未完成的搜索结果
+    tasks = []
+    submitted = 0
+
+    async def fetch_one(rank: int, item: dict):
+        async with semaphore:
+            started = time.perf_counter()
+            call = functools.partial(fetcher, item["url"], **fetch_options)
+            try:
+                page = await asyncio.wait_for(loop.run_in_executor(executor, call), url_timeout)
+            except asyncio.TimeoutError:
+                page = {"error": f"抓取超时 ({url_timeout:g}s)"}
+            except Exception as e:
+                page = {"error": str(e)}
+        await finished.put(_merge(rank, item, page, time.perf_counter() - started))
+
+    async def produce():
+        nonlocal submitted
+        try:
+            async for item in results:
+                if not str(item.get("url", "")).startswith(("http://", "https://")):
+                    continue
+                submitted += 1
+                pending[submitted] = item
+                tasks.append(asyncio.ensure_future(fetch_one(submitted, item)))
+                if submitted >= top:
+                    break
+        finally:
+            # 不再需要更多 URL，尽早结束搜索阶段（取消其余引擎的请求）
+            await results.aclose()
+            await finished.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    searching = True
+    try:
+        while searching or pending:
+            timeout = None if expires is None else expires - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                record = await asyncio.wait_for(finished.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if record is None:
+                searching = False
+                continue
+            pending.pop(record["rank"], None)
+            yield record
+
+        # 总时限已到：未完成的 URL 以错误形式产出
+        for rank, item in sorted(pending.items()):
+            yield {"rank": rank, **item, "page_title": "", "content": "", "length": 0,
+                   "error": f"超出总时限 ({deadline:g}s)"}
+        if producer.done() and not producer.cancelled() and producer.exception():
+            raise producer.exception()
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(producer, *tasks, return_exceptions=True)
+        # 已超时的下载仍在线程中运行，不等待；它们受 fetch 的下载超时约束
+        executor.shutdown(wait=False, cancel_futures=True)
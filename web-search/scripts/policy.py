@@ -0,0 +1,311 @@
+"""
+引擎调度策略
+按引擎统计滚动延迟和错误率，主引擎超过其 p95 延迟仍未返回时向备用引擎发出对冲请求，
+连续失败的引擎触发熔断，在冷却期内直接跳过
+
+统计状态保存在 JSON 文件中，单次调用的 CLI 进程之间也能共享
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+
+# 默认的备用引擎顺序
+DEFAULT_FALLBACKS = {
+    "google": ["bing", "duckduckgo"],
+    "bing": ["duckduckgo", "baidu"],
+    "baidu": ["bing", "duckduckgo"],
+    "duckduckgo": ["bing", "baidu"],
+}
+
+
+class EngineStats:
+    """单个引擎的滚动延迟和错误统计"""
+
+    def __init__(self, window: int = 100, min_samples: int = 5):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, latency: float, ok: bool):
+        self.samples.append((latency, ok))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """成功请求延迟的 q 分位数（0 < q < 1），样本不足时返回 None"""
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    def p95(self) -> Optional[float]:
+        """成功请求的 p95 延迟，样本不足时返回 None"""
+        return self.percentile(0.95)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def to_dict(self) -> dict:
+        p95 = self.p95()
+        return {
+            "samples": len(self.samples),
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+        }
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 failure_threshold 次后打开，reset_timeout 秒后进入半开状态，只放行一个试探请求，
+    试探成功则关闭，失败则重新打开并重新计时；试探请求 reset_timeout 秒内没有结果时可以再放行一个
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        # 半开状态下试探请求的开始时间，0 表示没有进行中的试探
+        self.probe_started = 0.0
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        if time.time() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def _probing(self) -> bool:
+        return bool(self.probe_started) and time.time() - self.probe_started < self.reset_timeout
+
+    def available(self) -> bool:
+        """是否可以发出请求（只查询，不占用试探名额）"""
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self._probing())
+
+    def allow(self) -> bool:
+        """发出请求前调用：关闭时总是放行，半开时只有第一个调用方获得试探名额"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self._probing():
+            return False
+        self.probe_started = time.time()
+        return True
+
+    def release_probe(self):
+        """试探请求被取消、没有结果时归还试探名额"""
+        self.probe_started = 0.0
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            # 试探失败时重新打开，冷却期重新计时
+            self.opened_at = time.time()
+            self.probe_started = 0.0
+
+
+class EnginePolicy:
+    """对冲请求 + 自动故障转移 + 熔断"""
+
+    def __init__(self, fallbacks: Dict[str, List[str]] = None, hedge_delay: float = 3.0,
+                 failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 state_path: str = None):
+        """
+        Args:
+            fallbacks: 引擎名 -> 备用引擎列表
+            hedge_delay: 主引擎没有足够延迟样本时，发出对冲请求前等待的秒数
+            failure_threshold: 连续失败多少次后熔断
+            reset_timeout: 熔断冷却秒数
+            state_path: 统计状态文件，为 None 时只保存在内存中
+        """
+        self.fallbacks = fallbacks or DEFAULT_FALLBACKS
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state_path = state_path
+        self.stats: Dict[str, EngineStats] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        if state_path:
+            self.load()
+
+    def _stats(self, name: str) -> EngineStats:
+        if name not in self.stats:
+            self.stats[name] = EngineStats()
+        return self.stats[name]
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self.breakers[name]
+
+    def record(self, name: str, latency: float, ok: bool):
+        """记录一次请求结果"""
+        self._stats(name).record(latency, ok)
+        if ok:
+            self._breaker(name).record_success()
+        else:
+            self._breaker(name).record_failure()
+
+    def hedge_after(self, name: str) -> float:
+        """主引擎等待多久后发出对冲请求"""
+        p95 = self._stats(name).p95()
+        return p95 if p95 is not None else self.hedge_delay
+
+    def candidates(self, name: str) -> List[str]:
+        """主引擎及其备用引擎，跳过处于熔断状态的引擎"""
+        names = [name] + [n for n in self.fallbacks.get(name, []) if n != name]
+        return [n for n in names if self._breaker(n).available()]
+
+    async def run(self, name: str, call: Callable[[str], Awaitable[list]]):
+        """
+        按策略执行搜索
+
+        Args:
+            name: 主引擎名
+            call: 以引擎名为参数的协程函数，返回结果列表，失败时抛出异常
+
+        Returns:
+            (结果列表, 实际返回结果的引擎名, 策略元数据)
+        """
+        candidates = self.candidates(name)
+        meta = {
+            "attempts": [],
+            "hedged": False,
+            "skipped": [n for n in [name] + self.fallbacks.get(name, []) if n not in candidates],
+        }
+        if not candidates:
+            raise RuntimeError(f"引擎 {name} 及其备用引擎均处于熔断状态")
+
+        tasks = {}
+        fallback_result = None
+
+        def launch() -> bool:
+            """向下一个可用的候选引擎发出请求，半开引擎的试探名额已被占用时跳过它"""
+            while candidates:
+                engine = candidates.pop(0)
+                if self._breaker(engine).allow():
+                    break
+                meta["skipped"].append(engine)
+            else:
+                return False
+            meta["attempts"].append(engine)
+            started = time.monotonic()
+
+            async def attempt():
+                try:
+                    results = await call(engine)
+                except asyncio.CancelledError:
+                    self._breaker(engine).release_probe()
+                    raise
+                except Exception:
+                    self.record(engine, time.monotonic() - started, False)
+                    raise
+                self.record(engine, time.monotonic() - started, True)
+                return results
+
+            tasks[asyncio.ensure_future(attempt())] = engine
+            return True
+
+        if not launch():
+            raise RuntimeError(f"引擎 {name} 及其备用引擎均处于熔断状态")
+        try:
+            while tasks:
+                # 主引擎超过其 p95 仍未返回时，向下一个引擎发出对冲请求
+                timeout = self.hedge_after(meta["attempts"][0]) if candidates else None
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    meta["hedged"] = True
+                    launch()
+                    continue
+
+                for task in done:
+                    engine = tasks.pop(task)
+                    if task.exception() is not None:
+                        meta.setdefault("errors", {})[engine] = str(task.exception())
+                        continue
+                    results = task.result()
+                    if results:
+                        return results, engine, meta
+                    if fallback_result is None:
+                        fallback_result = (results, engine)
+
+                # 失败或无结果时立即切换到下一个引擎
+                if candidates and not tasks:
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.save()
+
+        if fallback_result is not None:
+            return fallback_result[0], fallback_result[1], meta
+        errors = meta.get("errors", {})
+        if not errors:
+            raise RuntimeError(f"引擎 {name} 及其备用引擎均处于熔断状态")
+        raise RuntimeError("; ".join(f"{n}: {e}" for n, e in errors.items()))
+
+    def summary(self) -> Dict[str, dict]:
+        """各引擎的统计和熔断状态"""
+        return {
+            name: {**self._stats(name).to_dict(), "circuit": self._breaker(name).state}
+            for name in sorted(set(self.stats) | set(self.breakers))
+        }
+
+    def load(self):
+        """从状态文件恢复统计"""
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        for name, item in state.items():
+            stats = self._stats(name)
+            for latency, ok in item.get("samples", []):
+                stats.record(latency, bool(ok))
+            breaker = self._breaker(name)
+            breaker.failures = item.get("failures", 0)
+            breaker.opened_at = item.get("opened_at", 0.0)
+            breaker.probe_started = item.get("probe_started", 0.0)
+
+    def save(self):
+        """写入状态文件（先写临时文件再替换，避免并发进程读到半个文件）"""
+        if not self.state_path:
+            return
+
+        state = {}
+        for name in set(self.stats) | set(self.breakers):
+            breaker = self._breaker(name)
+            state[name] = {
+                "samples": [[round(latency, 4), ok] for latency, ok in self._stats(name).samples],
+                "failures": breaker.failures,
+                "opened_at": breaker.opened_at,
+                "probe_started": breaker.probe_started,
+            }
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            pass
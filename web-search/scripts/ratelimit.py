@@ -0,0 +1,196 @@
+"""
+搜索引擎限速
+按引擎配置令牌桶，桶状态保存在 SQLite 中，多个 search.py 进程共享同一组令牌，
+超出速率的请求排队等待，而不是触发反爬限制
+
+环境变量:
+    WEB_SEARCH_RATE_LIMIT   覆盖默认限速，如 "bing=2:5,baidu=0.5"（每秒请求数[:突发容量]，0 表示不限速）
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+# 引擎 -> (每秒请求数, 突发容量)。Google 走 API 配额，不在此限速。
+# 多页结果的每一页各取一个令牌，Bing 和百度的突发容量足够单次取满 200 条（20 页），
+# 深翻页的单个查询仍在一两次往返内完成，持续速率仍受限（之后的查询等待令牌恢复）
+DEFAULT_RATES = {
+    "bing": (1.0, 20),
+    "baidu": (0.5, 20),
+    "duckduckgo": (1.0, 5),
+}
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """
+    解析限速配置
+
+    Args:
+        spec: 形如 "bing=2:5,baidu=0.5" 的字符串，数值为每秒请求数，冒号后为可选的突发容量
+
+    Returns:
+        引擎名 -> (每秒请求数, 突发容量)
+    """
+    limits = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"限速配置格式错误: {part}，应为 引擎=每秒请求数[:突发容量]")
+        rate, _, burst = value.partition(":")
+        rate = float(rate)
+        if rate < 0:
+            raise ValueError(f"限速不能为负数: {part}")
+        limits[name.strip().lower()] = (rate, int(burst) if burst else max(1, math.ceil(rate)))
+    return limits
+
+
+def default_state_path() -> str:
+    from cache import default_cache_dir
+    return os.path.join(default_cache_dir(), "ratelimit.sqlite3")
+
+
+class TokenBucket:
+    """
+    跨进程令牌桶
+
+    每次获取令牌时在 SQLite 写事务中预订一个令牌（令牌数可以为负，表示排队），
+    然后在事务外睡眠到轮到自己，先到先得
+    """
+
+    _conn_lock = threading.Lock()
+    _connections: Dict[str, sqlite3.Connection] = {}
+
+    def __init__(self, name: str, rate: float, burst: int = 1, path: str = None):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.path = path or default_state_path()
+
+    def _connect(self) -> sqlite3.Connection:
+        with self._conn_lock:
+            conn = self._connections.get(self.path)
+            if conn is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                       check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS buckets (
+                        engine TEXT PRIMARY KEY,
+                        tokens REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                """)
+                self._connections[self.path] = conn
+            return conn
+
+    def _reserve(self) -> Tuple[float, int]:
+        """
+        预订一个令牌
+
+        Returns:
+            (需要等待的秒数, 包括自己在内的排队请求数)
+        """
+        conn = self._connect()
+        with self._conn_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE engine=?", (self.name,)
+                ).fetchone()
+                tokens = float(self.burst)
+                if row is not None:
+                    tokens = min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+
+                tokens -= 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        if tokens >= 0:
+            return 0.0, 0
+        return -tokens / self.rate, math.ceil(-tokens)
+
+    def _try_reserve(self) -> Tuple[float, int, Optional[str]]:
+        """
+        预订一个令牌；状态文件不可用（如缓存目录不可写）时不限速，与结果缓存出错时的处理一致
+
+        Returns:
+            (需要等待的秒数, 排队请求数, 不可用时的警告)
+        """
+        try:
+            wait, depth = self._reserve()
+        except (sqlite3.Error, OSError) as e:
+            return 0.0, 0, f"限速状态不可用，本次未限速: {e}"
+        return wait, depth, None
+
+    @staticmethod
+    def _meta(wait: float, depth: int, warning: Optional[str]) -> dict:
+        meta = {"waited": round(wait, 3), "queue_depth": depth}
+        if warning:
+            meta["warning"] = warning
+        return meta
+
+    def acquire(self) -> dict:
+        """
+        获取一个令牌，必要时阻塞等待
+
+        Returns:
+            {"waited": 等待秒数, "queue_depth": 排队请求数}，未能限速时另有 warning
+        """
+        wait, depth, warning = self._try_reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return self._meta(wait, depth, warning)
+
+    async def aacquire(self) -> dict:
+        """acquire 的异步版本"""
+        wait, depth, warning = await asyncio.to_thread(self._try_reserve)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return self._meta(wait, depth, warning)
+
+
+_rates: Optional[Dict[str, Tuple[float, int]]] = None
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def configure(overrides: Dict[str, Tuple[float, int]] = None) -> Dict[str, Tuple[float, int]]:
+    """
+    设置各引擎的限速：默认值 < WEB_SEARCH_RATE_LIMIT < overrides
+
+    Returns:
+        生效的限速配置
+    """
+    global _rates
+    rates = dict(DEFAULT_RATES)
+    rates.update(parse_rate_limits(os.getenv("WEB_SEARCH_RATE_LIMIT", "")))
+    rates.update(overrides or {})
+    _rates = rates
+    _buckets.clear()
+    return rates
+
+
+def get_bucket(name: str) -> Optional[TokenBucket]:
+    """引擎对应的令牌桶，未限速时返回 None"""
+    if _rates is None:
+        configure()
+    rate, burst = _rates.get(name, (0.0, 1))
+    if rate <= 0:
+        return None
+    if name not in _buckets:
+        _buckets[name] = TokenBucket(name, rate, burst)
+    return _buckets[name]
@@ -0,0 +1,146 @@
+"""
+列式结果集
+按字段分列保存搜索结果（每个字段一个列表），大批量结果不再为每条结果各建一个对象或字典，
+并支持字段投影和按需计算的 domain 字段
+"""
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from engines import SearchResult
+from utils import extract_domain
+
+
+BASE_FIELDS = ("title", "url", "snippet")
+
+# 可投影的字段：domain 由 url 计算，engine / engines / score 只在流式或多引擎结果中存在，
+# page_title / content 只在 --fetch-top 结果中存在
+FIELDS = BASE_FIELDS + ("domain", "engine", "engines", "score", "page_title", "content")
+
+
+def parse_fields(spec: str) -> Optional[List[str]]:
+    """
+    解析字段列表
+
+    Args:
+        spec: 逗号分隔的字段名，如 "title,url,domain"
+
+    Returns:
+        字段名列表，spec 为空时返回 None（表示不投影）
+    """
+    fields = []
+    for name in (spec or "").split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in FIELDS:
+            raise ValueError(f"不支持的字段: {name}。可用字段: {', '.join(FIELDS)}")
+        if name not in fields:
+            fields.append(name)
+    return fields or None
+
+
+def project(record: dict, fields: Optional[List[str]]) -> dict:
+    """投影单条结果字典，只保留 fields 中存在的字段"""
+    if fields is None:
+        return record
+    projected = {}
+    for name in fields:
+        if name == "domain":
+            projected[name] = extract_domain(record.get("url", "")) or ""
+        elif name in record:
+            projected[name] = record[name]
+    return projected
+
+
+class ResultSet:
+    """列式结果集"""
+
+    __slots__ = ("_columns", "_length")
+
+    def __init__(self, columns: Dict[str, list] = None):
+        """
+        Args:
+            columns: 字段名 -> 该字段的值列表，各列长度必须相同
+        """
+        self._columns = {name: list(values) for name, values in (columns or {}).items()}
+        lengths = {len(values) for values in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("各列长度不一致")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_results(cls, results: Iterable[SearchResult]) -> "ResultSet":
+        """由 SearchResult 序列构建"""
+        result_set = cls({name: [] for name in BASE_FIELDS})
+        for result in results:
+            result_set.append(result)
+        return result_set
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[dict]) -> "ResultSet":
+        """由结果字典序列构建，缺失的字段填 None"""
+        columns: Dict[str, list] = {}
+        length = 0
+        for item in items:
+            for name in item:
+                if name not in columns:
+                    columns[name] = [None] * length
+            for name, values in columns.items():
+                values.append(item.get(name))
+            length += 1
+        return cls(columns)
+
+    def append(self, result: SearchResult):
+        """追加一条结果（非基础字段填 None）"""
+        for name, values in self._columns.items():
+            values.append(getattr(result, name, None))
+        self._length += 1
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> list:
+        """字段的值列表；domain 未保存时由 url 计算"""
+        if name == "domain" and name not in self._columns:
+            urls = self._columns.get("url") or [""] * self._length
+            return [extract_domain(url) or "" for url in urls]
+        return self._columns[name]
+
+    def select(self, fields: List[str]) -> "ResultSet":
+        """投影出只包含 fields 的新结果集（不存在的字段跳过）"""
+        return ResultSet({
+            name: self.column(name) for name in fields
+            if name in self._columns or name == "domain"
+        })
+
+    def to_columns(self, fields: List[str] = None) -> Dict[str, list]:
+        """列式输出: 字段名 -> 值列表"""
+        names = fields if fields is not None else self.fields
+        return {
+            name: self.column(name) for name in names
+            if name in self._columns or name == "domain"
+        }
+
+    def to_dicts(self, fields: List[str] = None) -> List[dict]:
+        """
+        按行输出结果字典
+
+        Args:
+            fields: 输出的字段，为 None 时输出全部字段
+        """
+        columns = self.to_columns(fields)
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())] if names else []
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _base_columns(self) -> List[list]:
+        return [self._columns.get(name) or [""] * self._length for name in BASE_FIELDS]
+
+    def __getitem__(self, index: int) -> SearchResult:
+        return SearchResult(*(values[index] for values in self._base_columns()))
+
+    def __iter__(self) -> Iterator[SearchResult]:
+        for row in zip(*self._base_columns()):
+            yield SearchResult(*row)
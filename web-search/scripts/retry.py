@@ -0,0 +1,241 @@
+"""
+重试与总时限
+各引擎共享的重试策略：连接重置、超时、429/5xx 等瞬时错误按指数退避（全抖动）重试，
+重试等待与单次请求的超时都受查询的总时限约束，总时限到期时返回已拿到的部分结果
+
+总时限保存在上下文变量中，随任务和 contextvars.copy_context() 传递到各引擎和工作线程
+
+配置优先级: configure() 参数 > 环境变量 > 默认值
+
+环境变量:
+    WEB_SEARCH_RETRIES       瞬时错误的最大重试次数 (默认: 2)
+    WEB_SEARCH_RETRY_BASE    退避基数秒数，第 n 次重试前随机等待 0 ~ base * 2^n 秒 (默认: 0.25)
+    WEB_SEARCH_RETRY_MAX     单次退避的最长秒数 (默认: 4)
+    WEB_SEARCH_DEADLINE      每个查询的总时限秒数 (默认: 不限)
+"""
+import asyncio
+import contextlib
+import contextvars
+import random
+import sys
+import time
+from typing import Optional
+
+from utils import env_float, env_int
+
+# 值得重试的 HTTP 状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# 总时限到期的单调时钟时刻，为 None 时不限
+_expires: contextvars.ContextVar = contextvars.ContextVar("web_search_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """查询的总时限已到"""
+
+    def __init__(self, message: str = "已超出总时限"):
+        super().__init__(message)
+
+
+def default_deadline() -> Optional[float]:
+    """环境变量 WEB_SEARCH_DEADLINE 指定的总时限"""
+    value = env_float("WEB_SEARCH_DEADLINE", 0)
+    return value if value > 0 else None
+
+
+@contextlib.contextmanager
+def use_deadline(seconds: Optional[float]):
+    """
+    在此范围内（及其中创建的任务）限定总时限；已有更早的时限时保留更早的
+
+    Args:
+        seconds: 从现在起的秒数，为 None 时不做限制
+    """
+    if seconds is None:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _expires.get()
+    if current is not None:
+        expires = min(expires, current)
+    token = _expires.set(expires)
+    try:
+        yield
+    finally:
+        _expires.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """总时限的剩余秒数（可能为负），未限定时返回 None"""
+    expires = _expires.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+def bounded(seconds: float) -> float:
+    """不超过总时限剩余时间的秒数"""
+    left = remaining()
+    return seconds if left is None else max(0.0, min(seconds, left))
+
+
+def check():
+    """总时限已到时抛出 DeadlineExceeded"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded()
+
+
+def request_timeout() -> dict:
+    """
+    单次 HTTP 请求的超时参数：限定了总时限时不超过剩余时间，否则使用客户端的默认超时
+
+    Returns:
+        传给 httpx 请求方法的关键字参数
+    """
+    left = remaining()
+    if left is None:
+        return {}
+    check()
+    import httpx
+    from http_client import get_config
+    config = get_config()
+    timeout = min(left, config.timeout) if config.timeout > 0 else left
+    return {"timeout": httpx.Timeout(timeout, connect=min(config.connect_timeout, timeout))}
+
+
+async def await_within(awaitable, grace: float = 0.0):
+    """
+    在总时限内等待，到期时取消并抛出 DeadlineExceeded
+
+    Args:
+        grace: 额外宽限的秒数，用于兜底等待自身已遵守时限的调用
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(0.0, left + grace))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded() from None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """是否为值得重试的瞬时错误"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        return status in RETRY_STATUS
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(
+            error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # duckduckgo_search 的限流和超时异常
+    if type(error).__name__ in ("RatelimitException", "TimeoutException"):
+        return True
+    # DDGS.text() 把后端抛出的异常作为参数再包装一层
+    inner = error.args[0] if error.args else None
+    return isinstance(inner, BaseException) and inner is not error and is_retryable(inner)
+
+
+def _retry_after(error: BaseException) -> float:
+    """429/503 响应的 Retry-After 秒数"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    try:
+        return float(headers.get("retry-after", 0)) if headers else 0.0
+    except ValueError:
+        return 0.0
+
+
+def truncation(error: BaseException, **detail) -> dict:
+    """
+    截断说明：出错或总时限到期时只拿到部分结果
+
+    Args:
+        **detail: 额外信息，如 pages（总页数）、completed_pages（已完成页数）
+    """
+    reason = "deadline" if isinstance(error, DeadlineExceeded) else "error"
+    return {"reason": reason, "error": str(error), **detail}
+
+
+class RetryPolicy:
+    """指数退避（全抖动）重试策略"""
+
+    def __init__(self, retries: int = None, base_delay: float = None, max_delay: float = None):
+        self.retries = retries if retries is not None else env_int("WEB_SEARCH_RETRIES", 2)
+        self.base_delay = (base_delay if base_delay is not None
+                           else env_float("WEB_SEARCH_RETRY_BASE", 0.25))
+        self.max_delay = max_delay if max_delay is not None else env_float("WEB_SEARCH_RETRY_MAX", 4.0)
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待秒数（0 ~ base * 2^attempt 之间随机，不超过 max_delay）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def next_delay(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        出错后下一次重试前的等待秒数
+
+        Returns:
+            等待秒数；不可重试、次数用尽或等待后已超出总时限时返回 None
+        """
+        if attempt >= self.retries or not is_retryable(error):
+            return None
+        delay = max(self.backoff(attempt), min(_retry_after(error), self.max_delay))
+        left = remaining()
+        if left is not None and delay >= left:
+            return None
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """调用 func，瞬时错误时按策略重试，最终仍失败则抛出最后一次的异常"""
+        attempt = 0
+        while True:
+            check()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                delay = self.next_delay(attempt, e)
+                if delay is None:
+                    raise
+            attempt += 1
+            time.sleep(delay)
+
+    async def acall(self, func, *args, **kwargs):
+        """call 的异步版本，func 为协程函数"""
+        attempt = 0
+        while True:
+            check()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                delay = self.next_delay(attempt, e)
+                if delay is None:
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+_policy: Optional[RetryPolicy] = None
+
+
+def configure(**kwargs) -> RetryPolicy:
+    """
+    修改共享的重试策略
+
+    Args:
+        **kwargs: RetryPolicy 的参数
+    """
+    global _policy
+    _policy = RetryPolicy(**kwargs)
+    return _policy
+
+
+def get_policy() -> RetryPolicy:
+    """进程内共享的重试策略"""
+    global _policy
+    if _policy is None:
+        _policy = RetryPolicy()
+    return _policy
@@ -9,12 +9,22 @@ Web Search - 联网搜索脚本
     python search.py "搜索内容" --engine bing
     python search.py "搜索内容" --num 20
     python search.py "搜索内容" --engine google --num 15
+    python search.py "搜索内容" --engine all
+    python search.py "搜索内容" --engines bing,baidu,duckduckgo
+    python search.py --batch queries.txt --concurrency 8
+    python search.py "搜索内容" --timings --metrics-file metrics.prom
+    python search.py "搜索内容" --fetch-top 5
+    python search.py --serve
 """
 import argparse
+import asyncio
 import json
 import sys
 import os
 import io
+import sqlite3
+import threading
+import time
 
 # 修复 Windows 编码问题
 if sys.platform == "win32":
@@ -25,47 +35,851 @@ if sys.platform == "win32":
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, script_dir)
 
-from engines import DuckDuckGoEngine, BingEngine, BaiduEngine, GoogleEngine
+from typing import AsyncIterator, Dict, List, Optional
+from cache import default_cache_dir, get_cache, normalize_query
+import timings
+from timings import Timings
+from metrics import MetricsRegistry, get_registry
+from server import SearchServer, request_search
+import serializers
+from resultset import ResultSet, parse_fields, project
+from policy import EnginePolicy
+import pipeline
+import ratelimit
+import retry
+from ratelimit import parse_rate_limits
+from engines import BUILTIN_ENGINES, SearchResult, registry
+from utils import normalize_url
 
 
-# 引擎映射
-ENGINES = {
-    "duckduckgo": DuckDuckGoEngine,
-    "bing": BingEngine,
-    "baidu": BaiduEngine,
-    "google": GoogleEngine,
-}
+# 引擎映射：引擎名 -> 引擎类，选用某个引擎时才导入其模块（及 httpx、lxml 等依赖）
+ENGINES = registry
 
+# 各引擎的构造参数，如 {"baidu": {"resolve_redirects": True}}
+ENGINE_OPTIONS: Dict[str, dict] = {}
 
-def search(query: str, engine: str = "google", num_results: int = 10) -> dict:
+# 对冲请求 / 故障转移策略，为 None 时直接调用所选引擎
+POLICY: Optional[EnginePolicy] = None
+
+# 是否在输出中附带分阶段耗时
+TIMINGS = False
+
+# 指标累加器，为 None 时不统计
+METRICS: Optional[MetricsRegistry] = None
+
+# 输出的结果字段，为 None 时输出 title、url、snippet（以及多引擎的 engines、score）
+FIELDS: Optional[List[str]] = None
+
+# 输出格式: json / ndjson / msgpack，批量和流式模式下 json 按 ndjson 逐行输出
+OUTPUT_FORMAT = "json"
+
+# 每个查询的总时限（秒），到期时返回已拿到的部分结果；为 None 时不限，默认读取 WEB_SEARCH_DEADLINE
+DEADLINE: Optional[float] = retry.default_deadline()
+
+# 兜底等待不遵守总时限的引擎（如在线程中运行的同步引擎）时额外宽限的秒数
+DEADLINE_GRACE = 0.1
+
+# 缓存模式: on 读写缓存, off 不使用缓存, only 只读缓存不联网
+CACHE_MODES = ("on", "off", "only")
+
+# 倒数排名融合 (Reciprocal Rank Fusion) 的平滑常数
+RRF_K = 60
+
+
+def resolve_engines(engine: str) -> List[str]:
+    """
+    解析引擎参数
+
+    Args:
+        engine: 单个引擎名、"all" 或逗号分隔的引擎列表
+
+    Returns:
+        引擎名称列表
+    """
+    if engine.strip().lower() == "all":
+        return list(ENGINES.keys())
+
+    names = []
+    for name in engine.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in ENGINES:
+            available = ", ".join(ENGINES.keys())
+            raise ValueError(f"不支持的搜索引擎: {name}。可用引擎: {available}")
+        if name not in names:
+            names.append(name)
+
+    if not names:
+        raise ValueError("至少需要指定一个搜索引擎")
+    return names
+
+
+def create_engine(name: str):
+    """按 ENGINE_OPTIONS 创建引擎实例"""
+    return ENGINES[name](**ENGINE_OPTIONS.get(name, {}))
+
+
+# 改变结果内容、也可由环境变量开启的引擎参数: 引擎 -> {参数: 环境变量}
+OPTION_ENV = {"baidu": {"resolve_redirects": "BAIDU_RESOLVE_REDIRECTS"}}
+
+
+def _cache_engine(name: str) -> str:
+    """
+    缓存键中的引擎部分，带上生效的引擎参数，不同参数下的结果分开缓存
+    （如百度解析跳转链接前后的 URL 不同）；不读取引擎模块，缓存命中时不导入引擎
+    """
+    options = {option: os.getenv(env) == "1" for option, env in OPTION_ENV.get(name, {}).items()}
+    options.update(ENGINE_OPTIONS.get(name, {}))
+    enabled = sorted(f"{option}={value}" for option, value in options.items()
+                     if value not in (None, False))
+    return f"{name}?{'&'.join(enabled)}" if enabled else name
+
+
+async def _aclose_http():
+    """关闭当前事件循环的异步 HTTP 客户端；没用到 HTTP 客户端时不为此导入 httpx"""
+    http_client = sys.modules.get("http_client")
+    if http_client is not None:
+        await http_client.aclose_async_client()
+
+
+# 后台刷新的总时限（秒），未设置 DEADLINE 时使用，避免刷新线程长期占用
+REVALIDATE_DEADLINE = 30.0
+
+# 正在后台刷新的缓存键
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def _revalidate(name: str, query: str, num_results: int) -> bool:
+    """
+    在后台守护线程中刷新过期的缓存条目，进程退出时不等待
+
+    同一缓存键同时只刷新一次（批量和守护进程模式下同一查询可能连续命中过期条目）
+
+    Returns:
+        是否启动了刷新
+    """
+    key = (_cache_engine(name), normalize_query(query), num_results)
+    with _revalidating_lock:
+        if key in _revalidating:
+            return False
+        _revalidating.add(key)
+
+    def run():
+        try:
+            # 后台刷新同样消耗上游配额：先取限速令牌，并受总时限约束（未设置时用 REVALIDATE_DEADLINE）
+            bucket = ratelimit.get_bucket(name)
+            if bucket is not None:
+                bucket.acquire()
+            with retry.use_deadline(DEADLINE if DEADLINE is not None else REVALIDATE_DEADLINE):
+                results = create_engine(name).search(query, num_results)
+            if results:
+                get_cache().set(key[0], query, num_results, [r.to_dict() for r in results])
+        except Exception:
+            pass
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    threading.Thread(target=run, name=f"revalidate-{name}", daemon=True).start()
+    return True
+
+
+def _cache_lookup(name: str, query: str, num_results: int, cache: str):
+    """
+    查询缓存
+
+    Returns:
+        (命中的 SearchResult 列表或 None, 缓存元数据)
+    """
+    if cache == "off":
+        return None, {"status": "bypass"}
+
+    try:
+        entry = get_cache().get(_cache_engine(name), query, num_results)
+    except (sqlite3.Error, OSError) as e:
+        return None, {"status": "error", "error": str(e)}
+
+    if entry is None:
+        return None, {"status": "miss"}
+
+    meta = {"status": "hit", "age": round(entry.age, 1)}
+    if not entry.fresh:
+        # stale-while-revalidate: 先返回旧结果，再在后台刷新
+        meta["status"] = "stale"
+        if cache == "on":
+            _revalidate(name, query, num_results)
+
+    return [SearchResult(**item) for item in entry.results], meta
+
+
+def _cache_store(name: str, query: str, num_results: int, results: list, cache: str):
+    """写入缓存，空结果通常意味着请求失败，不缓存"""
+    if cache != "on" or not results:
+        return
+    try:
+        get_cache().set(_cache_engine(name), query, num_results, [r.to_dict() for r in results])
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def _result_dicts(results: List[SearchResult]) -> List[dict]:
+    """结果列表转为字典列表，按 FIELDS 投影"""
+    if FIELDS is None:
+        return [r.to_dict() for r in results]
+    return ResultSet.from_results(results).to_dicts(FIELDS)
+
+
+def _project_dicts(items: List[dict]) -> List[dict]:
+    """按 FIELDS 投影结果字典列表"""
+    if FIELDS is None:
+        return items
+    return ResultSet.from_dicts(items).to_dicts(FIELDS)
+
+
+def _new_timings() -> Optional[Timings]:
+    """输出耗时或统计指标时才计时"""
+    if TIMINGS or METRICS is not None:
+        return Timings()
+    return None
+
+
+def _engine_status(results: list, search_engine) -> str:
+    """引擎调用结果的状态：ok 有结果, error 出错, empty 无结果"""
+    if results:
+        return "ok"
+    return "error" if search_engine.last_error is not None else "empty"
+
+
+def _engine_report(name: str, results: list, search_engine, meta: dict) -> bool:
+    """
+    把截断或出错情况写入 meta（truncated / errors），不再静默返回空结果
+
+    Returns:
+        结果是否完整（截断的结果不写缓存）
+    """
+    truncated = search_engine.truncated
+    left = retry.remaining()
+    if (truncated is None and search_engine.last_error is not None
+            and left is not None and left <= 0):
+        # 总时限到期导致的请求超时
+        truncated = retry.truncation(retry.DeadlineExceeded(), results=len(results))
+    if truncated is not None:
+        meta["truncated"] = truncated
+        return False
+    if not results and search_engine.last_error is not None:
+        meta["errors"] = {name: str(search_engine.last_error)}
+    return True
+
+
+def _observe(name: str, status: str, started: float, results: Optional[list],
+             timer: Optional[Timings]):
+    """记录指标"""
+    if METRICS is not None:
+        METRICS.observe(
+            name, status, time.perf_counter() - started, len(results or []),
+            timer.stages if timer is not None else None
+        )
+
+
+def fuse_results(ranked: Dict[str, list], num_results: int, k: int = RRF_K) -> List[dict]:
+    """
+    使用倒数排名融合合并多个引擎的结果，并按归一化 URL 去重
+
+    Args:
+        ranked: 引擎名 -> 该引擎按排名排列的 SearchResult 列表
+        num_results: 返回结果数量
+        k: RRF 平滑常数
+
+    Returns:
+        融合后的结果字典列表（按得分降序）
+    """
+    merged: Dict[str, dict] = {}
+    order = []
+
+    for engine_name, results in ranked.items():
+        seen = set()
+        for rank, result in enumerate(results, start=1):
+            key = normalize_url(result.url)
+            # 同一引擎内的重复链接只计一次
+            if not key or key in seen:
+                continue
+            seen.add(key)
+
+            entry = merged.get(key)
+            if entry is None:
+                entry = result.to_dict()
+                entry["engines"] = []
+                entry["score"] = 0.0
+                merged[key] = entry
+                order.append(key)
+            elif not entry["snippet"] and result.snippet:
+                entry["snippet"] = result.snippet
+
+            entry["engines"].append(engine_name)
+            entry["score"] += 1.0 / (k + rank)
+
+    # 得分相同时保持首次出现的顺序
+    fused = sorted(
+        (merged[key] for key in order),
+        key=lambda item: item["score"],
+        reverse=True
+    )
+    for item in fused:
+        item["score"] = round(item["score"], 6)
+    return fused[:num_results]
+
+
+async def _aengine_search(name: str, query: str, num_results: int, cache: str,
+                          strict: bool = False):
+    """
+    异步调用单个引擎（先查缓存，未命中时排队获取限速令牌后发起请求）
+
+    Args:
+        strict: 引擎出错并返回空列表时抛出该异常，而不是当作无结果
+
+    Returns:
+        (SearchResult 列表, {"cache": 缓存元数据, "rate_limit": 限速排队信息,
+                             "timings": 分阶段耗时, "truncated": 截断说明, "errors": 出错信息})
+    """
+    timer = _new_timings()
+    started = time.perf_counter()
+    status = "error"
+    results = None
+    meta = {}
+    try:
+        with timings.use(timer):
+            results, meta["cache"] = _cache_lookup(name, query, num_results, cache)
+            if results is not None:
+                status = "cache"
+            elif cache == "only":
+                status = "miss"
+                results = []
+            else:
+                search_engine = create_engine(name)
+                bucket = ratelimit.get_bucket(name)
+                if bucket is not None:
+                    meta["rate_limit"] = await bucket.aacquire()
+                try:
+                    # 引擎自身遵守总时限，这里兜底不遵守时限的引擎
+                    results = await retry.await_within(
+                        search_engine.asearch(query, num_results), grace=DEADLINE_GRACE
+                    )
+                except retry.DeadlineExceeded as e:
+                    results = []
+                    search_engine.last_error = e
+                status = _engine_status(results, search_engine)
+                if strict and status == "error":
+                    raise search_engine.last_error
+                if _engine_report(name, results, search_engine, meta):
+                    _cache_store(name, query, num_results, results, cache)
+    finally:
+        _observe(name, status, started, results, timer)
+
+    if TIMINGS:
+        meta["timings"] = timer.to_dict()
+    return results, meta
+
+
+async def amulti_search(query: str, engines: List[str], num_results: int = 10,
+                        cache: str = "on") -> dict:
+    """
+    并发调用多个搜索引擎并融合结果
+
+    所有引擎同时发起请求，总耗时取决于最慢的引擎而非各引擎之和。
+
+    Args:
+        query: 搜索关键词
+        engines: 引擎名称列表
+        num_results: 返回结果数量
+        cache: 缓存模式 (on, off, only)
+
+    Returns:
+        搜索结果字典
+    """
+    with retry.use_deadline(DEADLINE):
+        outcomes = await asyncio.gather(
+            *(_aengine_search(name, query, num_results, cache) for name in engines),
+            return_exceptions=True
+        )
+
+    ranked = {}
+    errors = {}
+    cache_meta = {}
+    rate_meta = {}
+    timings_meta = {}
+    truncated_meta = {}
+    for name, outcome in zip(engines, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[name] = str(outcome)
+            continue
+        ranked[name], meta = outcome
+        cache_meta[name] = meta["cache"]
+        if "rate_limit" in meta:
+            rate_meta[name] = meta["rate_limit"]
+        if "timings" in meta:
+            timings_meta[name] = meta["timings"]
+        if "truncated" in meta:
+            truncated_meta[name] = meta["truncated"]
+        errors.update(meta.get("errors", {}))
+
+    results = _project_dicts(fuse_results(ranked, num_results))
+
+    output = {
+        "query": query,
+        "engine": ",".join(engines),
+        "engines": engines,
+        "count": len(results),
+        "results": results,
+        "cache": cache_meta
+    }
+    if rate_meta:
+        output["rate_limit"] = rate_meta
+    if timings_meta:
+        output["timings"] = timings_meta
+    if truncated_meta:
+        output["truncated"] = truncated_meta
+    if errors:
+        output["errors"] = errors
+    return output
+
+
+def _run(coro):
+    """在新的事件循环中运行协程，结束时关闭该循环的异步 HTTP 客户端"""
+    async def run():
+        try:
+            return await coro
+        finally:
+            await _aclose_http()
+
+    return asyncio.run(run())
+
+
+def multi_search(query: str, engines: List[str], num_results: int = 10,
+                 cache: str = "on") -> dict:
+    """amulti_search 的同步入口"""
+    return _run(amulti_search(query, engines, num_results, cache))
+
+
+def search(query: str, engine: str = "google", num_results: int = 10,
+           cache: str = "on") -> dict:
     """
     执行搜索
 
     Args:
         query: 搜索关键词
-        engine: 搜索引擎名称
+        engine: 搜索引擎名称，"all" 或逗号分隔的多个引擎时执行并发聚合搜索
         num_results: 返回结果数量
+        cache: 缓存模式 (on 读写缓存, off 不使用缓存, only 只读缓存不联网)
 
     Returns:
         搜索结果字典
     """
-    engine_class = ENGINES.get(engine.lower())
+    if cache not in CACHE_MODES:
+        raise ValueError(f"不支持的缓存模式: {cache}")
+
+    if engine.strip().lower() == "all" or "," in engine:
+        return multi_search(query, resolve_engines(engine), num_results, cache)
+    if POLICY is not None:
+        return _run(asearch(query, engine, num_results, cache))
+
+    name = engine.lower()
+    engine_class = ENGINES.get(name)
     if not engine_class:
         available = ", ".join(ENGINES.keys())
         raise ValueError(f"不支持的搜索引擎: {engine}。可用引擎: {available}")
 
-    search_engine = engine_class()
-    results = search_engine.search(query, num_results)
+    timer = _new_timings()
+    started = time.perf_counter()
+    status = "error"
+    results = None
+    rate_meta = None
+    engine_meta = {}
+    try:
+        with timings.use(timer), retry.use_deadline(DEADLINE):
+            results, cache_meta = _cache_lookup(name, query, num_results, cache)
+            if results is not None:
+                status = "cache"
+            elif cache == "only":
+                status = "miss"
+                results = []
+            else:
+                search_engine = create_engine(name)
+                bucket = ratelimit.get_bucket(name)
+                if bucket is not None:
+                    rate_meta = bucket.acquire()
+                results = search_engine.search(query, num_results)
+                status = _engine_status(results, search_engine)
+                if _engine_report(name, results, search_engine, engine_meta):
+                    _cache_store(name, query, num_results, results, cache)
+    finally:
+        _observe(name, status, started, results, timer)
+
+    output = {
+        "query": query,
+        "engine": name,
+        "count": len(results),
+        "results": _result_dicts(results),
+        "cache": cache_meta
+    }
+    if rate_meta is not None:
+        output["rate_limit"] = rate_meta
+    if TIMINGS:
+        output["timings"] = timer.to_dict()
+    output.update(engine_meta)
+    return output
+
+
+async def asearch(query: str, engine: str = "google", num_results: int = 10,
+                  cache: str = "on") -> dict:
+    """
+    异步执行搜索，参数与 search() 相同
+
+    Returns:
+        搜索结果字典
+    """
+    if cache not in CACHE_MODES:
+        raise ValueError(f"不支持的缓存模式: {cache}")
+
+    names = resolve_engines(engine)
+    if engine.strip().lower() == "all" or "," in engine:
+        return await amulti_search(query, names, num_results, cache)
+
+    name = names[0]
+    if POLICY is None:
+        with retry.use_deadline(DEADLINE):
+            results, meta = await _aengine_search(name, query, num_results, cache)
+        return {
+            "query": query,
+            "engine": name,
+            "count": len(results),
+            "results": _result_dicts(results),
+            **meta
+        }
+
+    attempts_meta = {}
+
+    async def call(engine_name: str):
+        results, attempts_meta[engine_name] = await _aengine_search(
+            engine_name, query, num_results, cache, strict=True
+        )
+        return results
 
+    with retry.use_deadline(DEADLINE):
+        results, served_by, policy_meta = await POLICY.run(name, call)
     return {
         "query": query,
-        "engine": search_engine.name,
+        "engine": name,
+        "served_by": served_by,
         "count": len(results),
-        "results": [r.to_dict() for r in results]
+        "results": _result_dicts(results),
+        **attempts_meta.get(served_by, {"cache": {}}),
+        "policy": policy_meta
     }
 
 
+def _write_line(out, record: dict):
+    """输出一行 NDJSON（或一条 msgpack 记录）并立即刷新，便于下游流式消费"""
+    serializers.write(out, record, "msgpack" if OUTPUT_FORMAT == "msgpack" else "ndjson")
+
+
+async def _aengine_stream(name: str, query: str, num_results: int, cache: str):
+    """
+    流式调用单个引擎：命中缓存时直接产出缓存结果，否则每解析出一条结果立即产出，结束后写缓存
+
+    Yields:
+        SearchResult
+    """
+    timer = _new_timings()
+    started = time.perf_counter()
+    status = "error"
+    collected = []
+    try:
+        with timings.use(timer):
+            results, _ = _cache_lookup(name, query, num_results, cache)
+            if results is not None:
+                status = "cache"
+                collected = results
+            elif cache == "only":
+                status = "miss"
+            else:
+                search_engine = create_engine(name)
+                bucket = ratelimit.get_bucket(name)
+                if bucket is not None:
+                    await bucket.aacquire()
+                async for result in search_engine.aiter_search(query, num_results):
+                    collected.append(result)
+                    yield result
+                status = _engine_status(collected, search_engine)
+                if status == "error":
+                    raise search_engine.last_error
+                if not search_engine.truncated:
+                    _cache_store(name, query, num_results, collected, cache)
+                return
+
+        for result in collected:
+            yield result
+    finally:
+        _observe(name, status, started, collected, timer)
+
+
+async def aiter_search(query: str, engine: str = "google", num_results: int = 10,
+                       cache: str = "on", errors: Dict[str, str] = None) -> AsyncIterator[dict]:
+    """
+    流式搜索，每解析出一条结果立即产出，不等待全部分页完成
+
+    多个引擎时各引擎并发请求，按到达顺序产出并按归一化 URL 去重（不做融合排序）。
+    总时限到期时停止产出，未完成的引擎记入 errors。
+
+    Args:
+        query: 搜索关键词
+        engine: 搜索引擎名称，"all" 或逗号分隔的多个引擎
+        num_results: 每个引擎返回结果数量
+        cache: 缓存模式
+        errors: 传入字典时记录出错的引擎，引擎名 -> 错误信息
+
+    Yields:
+        结果字典，额外包含 engine 字段
+    """
+    if cache not in CACHE_MODES:
+        raise ValueError(f"不支持的缓存模式: {cache}")
+    names = resolve_engines(engine)
+    queue = asyncio.Queue()
+    done = object()
+
+    async def pump(name: str):
+        # 每个引擎在独立的任务中迭代，计时等上下文变量互不影响
+        try:
+            async for result in _aengine_stream(name, query, num_results, cache):
+                await queue.put((name, result))
+        except Exception as e:
+            if errors is not None:
+                errors[name] = str(e)
+        finally:
+            await queue.put((name, done))
+
+    # 各引擎任务创建时继承总时限
+    with retry.use_deadline(DEADLINE):
+        tasks = {name: asyncio.ensure_future(pump(name)) for name in names}
+        left = retry.remaining()
+    expires = None if left is None else time.monotonic() + left + DEADLINE_GRACE
+    finished = set()
+    seen = set()
+    try:
+        while len(finished) < len(tasks):
+            try:
+                name, result = await asyncio.wait_for(
+                    queue.get(), None if expires is None else max(0.0, expires - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                # 兜底：不遵守总时限的引擎记为超时，已产出的结果保留
+                if errors is not None:
+                    for name in tasks.keys() - finished:
+                        errors[name] = str(retry.DeadlineExceeded())
+                break
+            if result is done:
+                finished.add(name)
+                continue
+            key = normalize_url(result.url)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield {**result.to_dict(), "engine": name}
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+async def astream_search(query: str, engine: str = "google", num_results: int = 10,
+                         cache: str = "on", out=None) -> dict:
+    """
+    流式搜索并逐条输出 NDJSON：每条结果一行（rank 为到达顺序），最后一行为汇总
+
+    Returns:
+        汇总字典 {"query", "engine", "count", "done", "errors"}
+    """
+    out = out or sys.stdout
+    errors = {}
+    count = 0
+    results = aiter_search(query, engine, num_results, cache, errors)
+    try:
+        async for result in results:
+            count += 1
+            _write_line(out, {"rank": count, **project(result, FIELDS)})
+    finally:
+        await results.aclose()
+
+    summary = {"query": query, "engine": engine, "count": count, "done": True}
+    if errors:
+        summary["errors"] = errors
+    _write_line(out, summary)
+    return summary
+
+
+async def asearch_fetch(query: str, engine: str = "google", num_results: int = 10, top: int = 5,
+                        cache: str = "on", concurrency: int = pipeline.DEFAULT_CONCURRENCY,
+                        url_timeout: Optional[float] = pipeline.DEFAULT_URL_TIMEOUT,
+                        deadline: Optional[float] = pipeline.DEFAULT_DEADLINE,
+                        fetch_format: str = "markdown", out=None) -> dict:
+    """
+    搜索并抓取前 top 个结果的正文：搜索结果边到达边抓取，标题、摘要与正文一并返回
+
+    Args:
+        query: 搜索关键词
+        engine: 搜索引擎名称，"all" 或逗号分隔的多个引擎
+        num_results: 每个引擎返回结果数量（至少为 top）
+        top: 抓取的结果数
+        cache: 缓存模式
+        concurrency: 同时抓取的页面数
+        url_timeout: 单个 URL 的时限（秒）
+        deadline: 搜索加抓取的总时限（秒）
+        fetch_format: 正文格式 (markdown, text, html)
+        out: 传入输出流时按完成顺序逐条输出 NDJSON，最后一行为汇总
+
+    Returns:
+        out 为 None 时返回 {"query", "engine", "count", "results", "fetch"}，results 按搜索顺序排列；
+        否则返回汇总字典
+    """
+    started = time.perf_counter()
+    errors = {}
+    records = []
+    results = aiter_search(query, engine, max(num_results, top), cache, errors)
+    fetched = pipeline.afetch_results(
+        results, top, concurrency=concurrency, url_timeout=url_timeout,
+        deadline=deadline, output_format=fetch_format
+    )
+    try:
+        async for record in fetched:
+            records.append(record)
+            if out is not None:
+                _write_line(out, {"rank": record["rank"], **project(record, FIELDS)})
+    finally:
+        await fetched.aclose()
+
+    failed = sum(1 for record in records if "error" in record)
+    stats = {
+        "top": top,
+        "fetched": len(records) - failed,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    if out is not None:
+        summary = {"query": query, "engine": engine, "count": len(records), "done": True,
+                   "fetch": stats}
+        if errors:
+            summary["errors"] = errors
+        _write_line(out, summary)
+        return summary
+
+    records.sort(key=lambda record: record["rank"])
+    output = {
+        "query": query,
+        "engine": engine,
+        "count": len(records),
+        "results": _project_dicts(records),
+        "fetch": stats,
+    }
+    if errors:
+        output["errors"] = errors
+    return output
+
+
+async def abatch_search(lines, engine: str = "google", num_results: int = 10,
+                        cache: str = "on", concurrency: int = 4, out=None) -> int:
+    """
+    批量搜索，每完成一个查询立即输出一行 NDJSON（按完成顺序，包含输入序号 index）
+
+    Args:
+        lines: 可迭代的查询文本行，空行会被跳过
+        engine: 搜索引擎名称
+        num_results: 每个查询返回结果数量
+        cache: 缓存模式
+        concurrency: 同时进行的查询数
+        out: 输出流，默认为 stdout
+
+    Returns:
+        处理的查询数
+    """
+    out = out or sys.stdout
+    # 有界队列：输入再长，内存中最多只有 2 * concurrency 个待处理查询
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    iterator = iter(lines)
+    count = 0
+
+    async def produce():
+        nonlocal count
+        while True:
+            # 逐行读取可能阻塞（如 stdin），放到线程中执行
+            line = await asyncio.to_thread(next, iterator, None)
+            if line is None:
+                break
+            query = line.strip()
+            if not query:
+                continue
+            await queue.put((count, query))
+            count += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            index, query = item
+            try:
+                record = await asearch(query, engine, num_results, cache)
+            except Exception as e:
+                record = {
+                    "error": str(e),
+                    "query": query,
+                    "engine": engine,
+                    "count": 0,
+                    "results": []
+                }
+            _write_line(out, {"index": index, **record})
+
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+    finally:
+        await _aclose_http()
+    return count
+
+
+def batch_search(source: str, engine: str = "google", num_results: int = 10,
+                 cache: str = "on", concurrency: int = 4) -> int:
+    """
+    批量搜索的同步入口
+
+    Args:
+        source: 查询文件路径，"-" 表示从 stdin 读取
+
+    Returns:
+        处理的查询数
+    """
+    if source == "-":
+        return asyncio.run(abatch_search(
+            sys.stdin, engine, num_results, cache, concurrency
+        ))
+    with open(source, encoding="utf-8") as f:
+        return asyncio.run(abatch_search(
+            f, engine, num_results, cache, concurrency
+        ))
+
+
+def _flush_metrics(path: Optional[str]):
+    """把本进程的指标累加到指标文件"""
+    if METRICS is not None and path:
+        try:
+            METRICS.write_file(path)
+        except OSError as e:
+            print(f"写入指标文件失败: {e}", file=sys.stderr)
+
+
 def main():
+    global POLICY, TIMINGS, METRICS, FIELDS, OUTPUT_FORMAT, DEADLINE
     parser = argparse.ArgumentParser(
         description="Web Search - 免费联网搜索工具",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -75,25 +889,62 @@ def main():
   duckduckgo   完全免费
   bing         微软搜索
   baidu        百度搜索
+  all          同时调用所有引擎并融合结果
 
 示例:
   python search.py "AI量化交易"
   python search.py "AI量化交易" --engine bing
   python search.py "AI量化交易" --num 20
   python search.py "AI量化交易" --engine google --num 15
+  python search.py "AI量化交易" --engine all
+  python search.py "AI量化交易" --engines bing,baidu,duckduckgo
+  python search.py --batch queries.txt --concurrency 8 --rate-limit bing=2,baidu=1
+  cat queries.txt | python search.py --batch - --engine duckduckgo
+  python search.py "AI量化交易" --engine bing --timings --metrics-file /var/lib/node_exporter/web_search.prom
+  python search.py "AI量化交易" --engine google --num 50 --stream
+  python search.py "AI量化交易" --fields title,url,domain --format ndjson
+  python search.py "AI量化交易" --engine all --deadline 5 --retries 3
+  python search.py --serve                    # 启动守护进程，之后的调用自动经由它搜索
+  python search.py --serve --server 127.0.0.1:8765
         """
     )
 
     parser.add_argument(
         "query",
+        nargs="?",
         help="搜索关键词"
     )
 
+    parser.add_argument(
+        "-b", "--batch",
+        metavar="FILE",
+        help="批量模式：逐行读取查询（- 表示 stdin），每完成一个输出一行 NDJSON"
+    )
+
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=4,
+        help="批量模式下同时进行的查询数 (默认: 4)"
+    )
+
+    parser.add_argument(
+        "--rate-limit",
+        metavar="SPEC",
+        help="按引擎限速（多进程共享），每秒请求数[:突发容量]，如 bing=2:5,baidu=0.5，0 表示不限速"
+    )
+
     parser.add_argument(
         "-e", "--engine",
-        choices=list(ENGINES.keys()),
+        type=str.lower,
         default="google",
-        help="搜索引擎 (默认: google)"
+        help=f"搜索引擎: {', '.join(BUILTIN_ENGINES)} 或以 entry point 安装的扩展引擎，"
+             "all 表示并发调用所有引擎 (默认: google)"
+    )
+
+    parser.add_argument(
+        "--engines",
+        help="逗号分隔的多个引擎，并发搜索并融合结果，如 bing,baidu,duckduckgo"
     )
 
     parser.add_argument(
@@ -103,6 +954,160 @@ def main():
         help="返回结果数量 (默认: 10)"
     )
 
+    parser.add_argument(
+        "--failover",
+        action="store_true",
+        help="主引擎慢于其 p95 延迟时向备用引擎发对冲请求，失败时自动切换，连续失败的引擎熔断"
+    )
+
+    parser.add_argument(
+        "--fallback",
+        metavar="ENGINES",
+        help="--failover 的备用引擎顺序，逗号分隔，如 bing,duckduckgo"
+    )
+
+    parser.add_argument(
+        "--resolve-redirects",
+        action="store_true",
+        help="并发解析百度跳转链接的真实地址（结果持久化缓存）"
+    )
+
+    parser.add_argument(
+        "-t", "--timeout",
+        type=float,
+        help="单次请求超时秒数，0 表示不限 (默认: 15，也可通过 WEB_SEARCH_TIMEOUT 设置)"
+    )
+
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help="每个查询的总时限（含重试），到期时返回已拿到的部分结果并在 truncated 中说明 "
+             "(默认: 不限，也可通过 WEB_SEARCH_DEADLINE 设置)"
+    )
+
+    parser.add_argument(
+        "--retries",
+        type=int,
+        metavar="N",
+        help="连接重置、超时、429/5xx 等瞬时错误的最大重试次数，按指数退避加随机抖动 "
+             "(默认: 2，也可通过 WEB_SEARCH_RETRIES 设置)"
+    )
+
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不读写本地结果缓存"
+    )
+    cache_group.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="只从本地缓存读取，不发起网络请求"
+    )
+
+    parser.add_argument(
+        "--stale-while-revalidate",
+        type=float,
+        metavar="SECONDS",
+        help="缓存过期后仍返回旧结果的秒数，同时在后台刷新"
+    )
+
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="在输出中附带分阶段耗时（连接、TLS、首字节、下载、解析、摘要清洗）"
+    )
+
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="把按引擎统计的计数和耗时直方图以 Prometheus 文本格式累加写入该文件"
+    )
+
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="在 127.0.0.1:PORT/metrics 暴露 Prometheus 指标（适用于批量模式等长时间运行的进程）"
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="流式输出 NDJSON：每解析出一条结果立即输出一行，最后一行为汇总"
+    )
+
+    parser.add_argument(
+        "--fetch-top",
+        type=int,
+        metavar="K",
+        help="抓取前 K 个结果的正文（复用 web-fetch），搜索结果边到达边并发抓取"
+    )
+
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=pipeline.DEFAULT_CONCURRENCY,
+        help=f"同时抓取的页面数 (默认: {pipeline.DEFAULT_CONCURRENCY})"
+    )
+
+    parser.add_argument(
+        "--fetch-timeout",
+        type=float,
+        default=pipeline.DEFAULT_URL_TIMEOUT,
+        metavar="SECONDS",
+        help=f"单个 URL 的抓取时限 (默认: {pipeline.DEFAULT_URL_TIMEOUT:g})"
+    )
+
+    parser.add_argument(
+        "--fetch-deadline",
+        type=float,
+        default=pipeline.DEFAULT_DEADLINE,
+        metavar="SECONDS",
+        help=f"搜索加抓取的总时限，到期时未完成的 URL 记为失败 (默认: {pipeline.DEFAULT_DEADLINE:g})"
+    )
+
+    parser.add_argument(
+        "--fetch-format",
+        choices=["markdown", "text", "html"],
+        default="markdown",
+        help="正文格式 (默认: markdown)"
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="以守护进程运行：保持连接池和内存缓存常驻，合并相同的并发查询"
+    )
+
+    parser.add_argument(
+        "--server",
+        metavar="ADDRESS",
+        help="守护进程地址，Unix socket 路径或 host:port (默认: 缓存目录下的 search.sock，"
+             "也可通过 WEB_SEARCH_SERVER 设置)"
+    )
+
+    parser.add_argument(
+        "--no-server",
+        action="store_true",
+        help="即使守护进程在运行也在本进程内搜索"
+    )
+
+    parser.add_argument(
+        "--fields",
+        metavar="FIELDS",
+        help="只输出指定的结果字段，逗号分隔，如 title,url 或 title,url,domain"
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=serializers.FORMATS,
+        default="json",
+        help="输出格式: json 缩进 JSON（默认）, ndjson 单行紧凑 JSON（安装 orjson 时更快）, "
+             "msgpack 二进制（需安装 msgpack）；批量和流式模式下 json 按 ndjson 输出"
+    )
+
     parser.add_argument(
         "-j", "--json",
         action="store_true",
@@ -110,12 +1115,144 @@ def main():
     )
 
     args = parser.parse_args()
+    if not args.query and not args.batch and not args.serve:
+        parser.error("需要提供搜索关键词、--batch 或 --serve")
+    if args.concurrency < 1:
+        parser.error("--concurrency 必须大于 0")
+    if args.fetch_top is not None and (args.fetch_top < 1 or args.fetch_concurrency < 1):
+        parser.error("--fetch-top 和 --fetch-concurrency 必须大于 0")
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline 必须大于 0")
+    if args.retries is not None and args.retries < 0:
+        parser.error("--retries 不能小于 0")
+    if args.engines:
+        args.engine = args.engines
+    try:
+        resolve_engines(args.engine)
+    except ValueError as e:
+        parser.error(str(e))
 
     try:
-        result = search(args.query, args.engine, args.num)
+        FIELDS = parse_fields(args.fields)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format == "msgpack":
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            parser.error("msgpack 格式需要安装 msgpack: pip install msgpack")
+    OUTPUT_FORMAT = args.format
+
+    cache = "off" if args.no_cache else "only" if args.cache_only else "on"
 
-        # 始终输出 JSON 格式，避免编码问题
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+    # 这些选项修改的是进程级配置，守护进程无法按请求应用，只在本地搜索时生效
+    local_only = (args.batch or args.failover or args.fallback or args.resolve_redirects
+                  or args.rate_limit or args.timeout is not None or args.stale_while_revalidate is not None
+                  or args.timings or args.metrics_file or args.metrics_port or args.stream
+                  or args.fetch_top or args.deadline is not None or args.retries is not None)
+    if not args.serve and not args.no_server and not local_only:
+        try:
+            reply = request_search(args.query, args.engine, args.num, cache, args.server)
+        except (OSError, ValueError) as e:
+            reply = 500, {"error": f"守护进程请求失败: {e}", "query": args.query,
+                          "engine": args.engine, "count": 0, "results": []}
+        if reply is not None:
+            status, result = reply
+            if "results" in result:
+                result["results"] = _project_dicts(result["results"])
+            serializers.write(sys.stdout, result, OUTPUT_FORMAT)
+            if status != 200:
+                sys.exit(1)
+            return
+    if args.timeout is not None:
+        import http_client
+        http_client.configure(timeout=args.timeout)
+    if args.deadline is not None:
+        DEADLINE = args.deadline
+    if args.retries is not None:
+        retry.configure(retries=args.retries)
+    if args.rate_limit:
+        try:
+            ratelimit.configure(parse_rate_limits(args.rate_limit))
+        except ValueError as e:
+            parser.error(str(e))
+    if args.resolve_redirects:
+        ENGINE_OPTIONS.setdefault("baidu", {})["resolve_redirects"] = True
+    if args.failover or args.fallback:
+        fallbacks = None
+        if args.fallback:
+            fallbacks = {args.engine: resolve_engines(args.fallback)}
+        POLICY = EnginePolicy(
+            fallbacks=fallbacks,
+            state_path=os.path.join(default_cache_dir(), "engine_stats.json")
+        )
+    if args.stale_while_revalidate is not None:
+        get_cache(stale_ttl=args.stale_while_revalidate)
+
+    TIMINGS = args.timings
+    if args.metrics_file or args.metrics_port or args.serve:
+        METRICS = get_registry()
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+
+    if args.serve:
+        try:
+            _run(SearchServer(
+                asearch, args.server, metrics=METRICS, metrics_file=args.metrics_file
+            ).serve_forever())
+        except (OSError, RuntimeError) as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False))
+            sys.exit(1)
+        finally:
+            _flush_metrics(args.metrics_file)
+        return
+
+    if args.batch:
+        try:
+            batch_search(args.batch, args.engine, args.num, cache, args.concurrency)
+        except Exception as e:
+            _write_line(sys.stdout, {"error": str(e)})
+            sys.exit(1)
+        finally:
+            _flush_metrics(args.metrics_file)
+        return
+
+    if args.fetch_top:
+        try:
+            result = _run(asearch_fetch(
+                args.query, args.engine, args.num, args.fetch_top, cache,
+                concurrency=args.fetch_concurrency, url_timeout=args.fetch_timeout,
+                deadline=args.fetch_deadline, fetch_format=args.fetch_format,
+                out=sys.stdout if args.stream else None
+            ))
+            if not args.stream:
+                serializers.write(sys.stdout, result, OUTPUT_FORMAT)
+            if not result["fetch"]["fetched"]:
+                sys.exit(1)
+        except Exception as e:
+            _write_line(sys.stdout, {"error": str(e), "query": args.query, "engine": args.engine})
+            sys.exit(1)
+        finally:
+            _flush_metrics(args.metrics_file)
+        return
+
+    if args.stream:
+        try:
+            summary = _run(astream_search(args.query, args.engine, args.num, cache))
+            if not summary["count"] and summary.get("errors"):
+                sys.exit(1)
+        except Exception as e:
+            _write_line(sys.stdout, {"error": str(e), "query": args.query, "engine": args.engine})
+            sys.exit(1)
+        finally:
+            _flush_metrics(args.metrics_file)
+        return
+
+    try:
+        result = search(args.query, args.engine, args.num, cache)
+
+        # 直接写 UTF-8 字节，避免编码问题
+        serializers.write(sys.stdout, result, OUTPUT_FORMAT)
 
     except Exception as e:
         error_result = {
@@ -125,9 +1262,12 @@ def main():
             "count": 0,
             "results": []
         }
-        print(json.dumps(error_result, ensure_ascii=False, indent=2))
+        serializers.write(sys.stdout, error_result, OUTPUT_FORMAT)
         sys.exit(1)
 
+    finally:
+        _flush_metrics(args.metrics_file)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,82 @@
+"""
+结果序列化
+    json      缩进 2 的 JSON（默认，便于阅读）
+    ndjson    单行紧凑 JSON，安装 orjson 时使用 orjson
+    msgpack   MessagePack 二进制（需安装 msgpack），多条记录首尾相接，可用 msgpack.Unpacker 流式读取
+"""
+import json
+from typing import Callable, Optional
+
+
+FORMATS = ("json", "ndjson", "msgpack")
+
+_orjson_dumps: Optional[Callable] = None
+_orjson_checked = False
+
+
+def _orjson() -> Optional[Callable]:
+    """orjson.dumps，未安装时返回 None"""
+    global _orjson_dumps, _orjson_checked
+    if not _orjson_checked:
+        _orjson_checked = True
+        try:
+            import orjson
+            _orjson_dumps = orjson.dumps
+        except ImportError:
+            pass
+    return _orjson_dumps
+
+
+def dumps(record, fmt: str = "json") -> bytes:
+    """
+    序列化单条记录
+
+    Args:
+        record: 可 JSON 序列化的对象
+        fmt: json / ndjson / msgpack
+
+    Returns:
+        UTF-8 字节串（json、ndjson 以换行结尾）
+    """
+    if fmt == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise ValueError("msgpack 格式需要安装 msgpack: pip install msgpack")
+        return msgpack.packb(record, use_bin_type=True)
+
+    if fmt == "ndjson":
+        fast = _orjson()
+        if fast is not None:
+            try:
+                return fast(record) + b"\n"
+            except TypeError:
+                pass
+        return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    if fmt == "json":
+        return (json.dumps(record, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
+    raise ValueError(f"不支持的输出格式: {fmt}。可用格式: {', '.join(FORMATS)}")
+
+
+def write(out, record, fmt: str = "json"):
+    """
+    序列化并写入输出流后立即刷新，便于下游流式消费
+
+    Args:
+        out: 文本流（有 buffer 属性时直接写字节）或二进制流
+    """
+    data = dumps(record, fmt)
+    buffer = getattr(out, "buffer", None)
+    if buffer is not None:
+        # 先刷新文本层，避免与之前写入的文本乱序
+        out.flush()
+        buffer.write(data)
+        buffer.flush()
+    elif fmt == "msgpack" or not hasattr(out, "encoding"):
+        out.write(data)
+        out.flush()
+    else:
+        out.write(data.decode("utf-8"))
+        out.flush()
@@ -0,0 +1,382 @@
+"""
+搜索守护进程
+常驻进程保持引擎模块、HTTP 连接池和内存 LRU 缓存处于热状态，
+相同的并发查询合并为一次上游请求；search.py 检测到守护进程在运行时自动通过它搜索
+
+监听地址为 Unix socket 路径或 host:port，协议为 HTTP/1.1（支持 keep-alive）:
+    POST /search    请求体 {"query", "engine", "num", "cache"}，返回与 search.py 相同的 JSON
+    GET  /search    同上，参数用查询字符串 q / engine / num / cache
+    GET  /health    运行状态和缓存统计
+    GET  /metrics   Prometheus 指标
+
+环境变量:
+    WEB_SEARCH_SERVER            守护进程地址，off 表示不使用 (默认: 缓存目录下的 search.sock)
+    WEB_SEARCH_SERVER_LRU_SIZE   内存缓存条目数 (默认: 1024)
+    WEB_SEARCH_SERVER_LRU_TTL    内存缓存秒数 (默认: 300)
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from cache import default_cache_dir, normalize_query
+
+
+DEFAULT_PORT = 8765
+
+# 定期把指标累加到指标文件的间隔秒数
+METRICS_FLUSH_INTERVAL = 60
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+def default_address() -> Optional[str]:
+    """
+    守护进程地址，WEB_SEARCH_SERVER=off 时返回 None
+
+    没有 Unix socket 的平台上也返回 None：客户端不自动尝试 TCP 端口（连接被拒绝在 Windows 上约需 2 秒，
+    端口上也可能是其他服务），需要时用 WEB_SEARCH_SERVER 指定
+    """
+    address = os.getenv("WEB_SEARCH_SERVER")
+    if address:
+        return None if address.lower() == "off" else address
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(default_cache_dir(), "search.sock")
+    return None
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    解析监听地址
+
+    Returns:
+        (host, port) 或 Unix socket 路径
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in host:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+class MemoryCache:
+    """内存 LRU 缓存，条目超过 ttl 秒后失效"""
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = (max_entries if max_entries is not None
+                            else int(os.getenv("WEB_SEARCH_SERVER_LRU_SIZE", 1024)))
+        self.ttl = ttl if ttl is not None else float(os.getenv("WEB_SEARCH_SERVER_LRU_TTL", 300))
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None or time.monotonic() - item[0] > self.ttl:
+            self._items.pop(key, None)
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._items[key] = (time.monotonic(), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SearchServer:
+    """常驻搜索服务"""
+
+    def __init__(self, search_func: Callable[..., Awaitable[dict]], address: str = None,
+                 memory: MemoryCache = None, metrics=None, metrics_file: str = None):
+        """
+        Args:
+            search_func: 搜索协程函数，签名同 search.asearch(query, engine, num_results, cache)
+            address: 监听地址（Unix socket 路径或 host:port），默认 default_address()
+            memory: 内存缓存
+            metrics: metrics.MetricsRegistry，提供 /metrics
+            metrics_file: 定期把指标累加写入该文件
+        """
+        self.search_func = search_func
+        self.address = address or default_address() or f"127.0.0.1:{DEFAULT_PORT}"
+        self.memory = memory or MemoryCache()
+        self.metrics = metrics
+        self.metrics_file = metrics_file
+        # 进行中的上游请求，相同查询复用同一个任务
+        self._inflight = {}
+        self.coalesced = 0
+        self.requests = 0
+        self._started = time.time()
+        self._stopping = None
+
+    async def search(self, query: str, engine: str = "google", num_results: int = 10,
+                     cache: str = "on") -> dict:
+        """
+        带内存缓存和请求合并的搜索
+
+        Returns:
+            搜索结果字典，额外包含 daemon 字段: memory 为 hit / miss / coalesced
+        """
+        self.requests += 1
+        engine = engine.strip().lower()
+        key = (engine, normalize_query(query), num_results)
+
+        if cache != "off":
+            cached = self.memory.get(key)
+            if cached is not None:
+                return {**cached, "daemon": {"memory": "hit"}}
+
+        inflight_key = key + (cache,)
+        task = self._inflight.get(inflight_key)
+        status = "coalesced"
+        if task is None:
+            status = "miss"
+            task = asyncio.ensure_future(self.search_func(query, engine, num_results, cache))
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        else:
+            self.coalesced += 1
+
+        # 某个客户端断开时不取消其他客户端共享的上游请求
+        result = await asyncio.shield(task)
+        if status == "miss" and cache == "on" and result.get("count") and not result.get("errors"):
+            self.memory.set(key, result)
+        return {**result, "daemon": {"memory": status}}
+
+    def health(self) -> dict:
+        health = {
+            "status": "ok",
+            "pid": os.getpid(),
+            "address": self.address,
+            "uptime": round(time.time() - self._started, 1),
+            "requests": self.requests,
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "memory": {
+                "entries": len(self.memory),
+                "hits": self.memory.hits,
+                "misses": self.memory.misses,
+            },
+        }
+        # 已加载 DuckDuckGo 引擎时附带各后端的延迟统计
+        duckduckgo = sys.modules.get("engines.duckduckgo")
+        if duckduckgo is not None:
+            health["duckduckgo_backends"] = duckduckgo.backend_stats()
+        return health
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, bytes, str]:
+        """处理单个请求，返回 (状态码, 响应体, Content-Type)"""
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, _json_bytes(self.health()), "application/json"
+
+        if url.path == "/metrics":
+            if self.metrics is None:
+                return 404, b"metrics disabled\n", "text/plain"
+            from metrics import CONTENT_TYPE
+            return 200, self.metrics.render().encode("utf-8"), CONTENT_TYPE
+
+        if url.path != "/search":
+            return 404, _json_bytes({"error": f"未知路径: {url.path}"}), "application/json"
+
+        if method == "POST":
+            try:
+                params = json.loads(body or b"{}")
+            except ValueError:
+                return 400, _json_bytes({"error": "请求体不是合法的 JSON"}), "application/json"
+            if not isinstance(params, dict):
+                return 400, _json_bytes({"error": "请求体必须是 JSON 对象"}), "application/json"
+        elif method == "GET":
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            params.setdefault("query", params.pop("q", None))
+        else:
+            return 405, _json_bytes({"error": f"不支持的方法: {method}"}), "application/json"
+
+        query = params.get("query")
+        engine = params.get("engine") or "google"
+        error = {"query": query, "engine": engine, "count": 0, "results": []}
+        if not query:
+            return 400, _json_bytes({"error": "缺少 query", **error}), "application/json"
+        if not isinstance(query, str) or not isinstance(engine, str):
+            return 400, _json_bytes({"error": "query 和 engine 必须是字符串", **error}), "application/json"
+
+        try:
+            num_results = int(params.get("num") or 10)
+            result = await self.search(query, engine, num_results, params.get("cache") or "on")
+        except (TypeError, ValueError) as e:
+            return 400, _json_bytes({"error": str(e), **error}), "application/json"
+        except Exception as e:
+            return 500, _json_bytes({"error": str(e), **error}), "application/json"
+        return 200, _json_bytes(result), "application/json"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的一个或多个 HTTP 请求"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, payload, content_type = await self._dispatch(method.upper(), target, body)
+
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _start(self):
+        address = parse_address(self.address)
+        if isinstance(address, tuple):
+            return await asyncio.start_server(self._handle, address[0], address[1])
+
+        if os.path.exists(address):
+            if ping(self.address):
+                raise RuntimeError(f"已有守护进程在 {self.address} 运行")
+            # 上次异常退出遗留的 socket 文件
+            os.unlink(address)
+        os.makedirs(os.path.dirname(os.path.abspath(address)), exist_ok=True)
+        server = await asyncio.start_unix_server(self._handle, address)
+        os.chmod(address, 0o600)
+        return server
+
+    async def _flush_metrics(self):
+        while True:
+            await asyncio.sleep(METRICS_FLUSH_INTERVAL)
+            await asyncio.to_thread(self.metrics.write_file, self.metrics_file)
+
+    def stop(self):
+        """停止服务（可在信号处理中调用）"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def serve_forever(self):
+        """启动并运行直到收到 SIGINT / SIGTERM 或调用 stop()"""
+        self._stopping = asyncio.Event()
+        server = await self._start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):  # Windows
+                pass
+
+        flusher = None
+        if self.metrics is not None and self.metrics_file:
+            flusher = asyncio.ensure_future(self._flush_metrics())
+
+        print(json.dumps({"status": "serving", "address": self.address, "pid": os.getpid()},
+                         ensure_ascii=False), file=sys.stderr, flush=True)
+        try:
+            await self._stopping.wait()
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+            server.close()
+            await server.wait_closed()
+            address = parse_address(self.address)
+            if isinstance(address, str) and os.path.exists(address):
+                os.unlink(address)
+
+
+def _json_bytes(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _connection(address: str, timeout: float):
+    """按地址创建 http.client 连接（Unix socket 或 TCP）"""
+    import http.client
+
+    target = parse_address(address)
+    if isinstance(target, tuple):
+        return http.client.HTTPConnection(target[0], target[1], timeout=timeout)
+
+    class UnixHTTPConnection(http.client.HTTPConnection):
+        def connect(self):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            self.sock.connect(target)
+
+    return UnixHTTPConnection("localhost", timeout=timeout)
+
+
+def _reachable(address: str) -> bool:
+    """不导入 http.client 的快速检查：Unix socket 文件不存在时守护进程肯定没有运行"""
+    target = parse_address(address)
+    return isinstance(target, tuple) or os.path.exists(target)
+
+
+def ping(address: str, timeout: float = 1.0) -> bool:
+    """守护进程是否在运行"""
+    if not _reachable(address):
+        return False
+    conn = _connection(address, timeout)
+    try:
+        conn.request("GET", "/health")
+        return conn.getresponse().status == 200
+    except OSError:
+        return False
+    finally:
+        conn.close()
+
+
+def request_search(query: str, engine: str = "google", num_results: int = 10,
+                   cache: str = "on", address: str = None,
+                   timeout: float = 120.0) -> Optional[Tuple[int, dict]]:
+    """
+    通过守护进程搜索
+
+    Returns:
+        (HTTP 状态码, 结果字典)；守护进程未运行（连接失败）时返回 None，由调用方在本地搜索
+    """
+    address = address or default_address()
+    if not address or not _reachable(address):
+        return None
+
+    conn = _connection(address, timeout)
+    try:
+        try:
+            conn.connect()
+        except OSError:
+            return None
+        body = _json_bytes({"query": query, "engine": engine, "num": num_results, "cache": cache})
+        conn.request("POST", "/search", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
@@ -0,0 +1,81 @@
+"""
+文本清洗
+搜索结果摘要和 HTML 片段的快速清洗，输出与旧版 utils 实现逐字一致:
+
+    clean_snippet   合并空白、去掉 "..." 和 "…"，用 str.split / str.replace 在 C 层完成，不走正则
+    clean_snippets  批量清洗一页结果的摘要
+    clean_html      去掉标签和 script/style，安装了 lxml 时直接用 lxml 取文本，
+                    不再为每个片段构建 BeautifulSoup 树
+"""
+from typing import Iterable, List, Optional
+
+
+def clean_snippet(snippet: Optional[str]) -> str:
+    """
+    清理搜索结果摘要：合并连续空白为一个空格，去掉 "..." 和 "…"，去掉首尾空白
+
+    先合并空白再去省略号，因此省略号两侧的空格会保留为两个空格（与旧版一致）
+    """
+    if not snippet:
+        return ""
+    # " ".join(s.split()) 等价于 re.sub(r"\s+", " ", s) 再去掉首尾空格，最后的 strip 会抹平这一差异
+    snippet = " ".join(snippet.split())
+    if "." in snippet or "…" in snippet:
+        snippet = snippet.replace("...", "").replace("…", "")
+    return snippet.strip()
+
+
+def clean_snippets(snippets: Iterable[Optional[str]]) -> List[str]:
+    """批量清理摘要，结果与逐条调用 clean_snippet 相同"""
+    split = str.split
+    join = " ".join
+    cleaned = []
+    append = cleaned.append
+    for snippet in snippets:
+        if not snippet:
+            append("")
+            continue
+        snippet = join(split(snippet))
+        if "." in snippet or "…" in snippet:
+            snippet = snippet.replace("...", "").replace("…", "")
+        append(snippet.strip())
+    return cleaned
+
+
+def _html_text_bs4(html: str) -> str:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "lxml")
+    # 移除 script 和 style 标签
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return soup.get_text()
+
+
+def _html_text_lxml(html: str) -> str:
+    from lxml import etree
+    from lxml.html import document_fromstring
+    root = document_fromstring(html)
+    # 移除 script 和 style 标签（保留其后的文本）；BeautifulSoup 的 get_text 同样不输出
+    # template、rt、rp 中的文本
+    etree.strip_elements(root, "script", "style", "template", "rt", "rp", with_tail=False)
+    return root.text_content()
+
+
+def clean_html(html: Optional[str]) -> str:
+    """清理 HTML 标签，提取纯文本（合并连续空白）"""
+    if not html:
+        return ""
+    # 不含标签和实体时无需解析（NUL 字符需经解析器替换为 U+FFFD）
+    if "<" not in html and "&" not in html and "\x00" not in html:
+        return " ".join(html.split())
+    try:
+        text = _html_text_lxml(html)
+    except Exception:
+        # 未安装 lxml，或 lxml 无法解析（如只有空白的文档）时用 BeautifulSoup
+        text = _html_text_bs4(html)
+    return " ".join(text.split())
+
+
+def clean_html_batch(fragments: Iterable[Optional[str]]) -> List[str]:
+    """批量清理 HTML 片段"""
+    return [clean_html(fragment) for fragment in fragments]
@@ -0,0 +1,123 @@
+"""
+分阶段计时
+通过 httpcore 的 trace 扩展记录连接（含 DNS 解析）、TLS 握手、首字节、下载耗时，
+再加上解析和摘要清洗的耗时，定位慢查询的瓶颈
+
+计时对象保存在 contextvars 中：只有在 use() 的作用域内发出的请求才会被记录，
+asyncio 任务和 to_thread 会自动继承，线程池需要用 contextvars.copy_context().run 提交
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+_current: ContextVar[Optional["Timings"]] = ContextVar("web_search_timings", default=None)
+
+# httpcore trace 事件 -> 阶段名
+_TRACE_STAGES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "receive_response_body": "download",
+}
+
+
+class Timings:
+    """一次搜索的分阶段耗时（秒，同一阶段多次发生时累加，如多个分页请求）"""
+
+    def __init__(self):
+        self.stages = {}
+        self.requests = 0
+        self._started = time.perf_counter()
+        # 分页和跳转解析会在线程池中并发记录
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def make_trace(self):
+        """为单个请求创建 trace 回调"""
+        started = {}
+        with self._lock:
+            self.requests += 1
+
+        def trace(event: str, info: dict):
+            # 事件名形如 "http11.receive_response_headers.complete"
+            _, _, event = event.partition(".")
+            name, _, phase = event.rpartition(".")
+            now = time.perf_counter()
+
+            if phase == "started":
+                started[name] = now
+                return
+            if phase not in ("complete", "failed") or name not in started:
+                return
+
+            if name == "receive_response_headers" and "send_request_headers" in started:
+                # 首字节：从开始发送请求到收到响应头
+                self.add("ttfb", now - started["send_request_headers"])
+            elif name in _TRACE_STAGES:
+                self.add(_TRACE_STAGES[name], now - started[name])
+
+        return trace
+
+    def to_dict(self) -> dict:
+        result = {f"{stage}_ms": round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+        result["total_ms"] = round((time.perf_counter() - self._started) * 1000, 2)
+        result["requests"] = self.requests
+        return result
+
+
+def current() -> Optional[Timings]:
+    """当前上下文中的计时对象，未开启计时时为 None"""
+    return _current.get()
+
+
+@contextmanager
+def use(timings: Timings):
+    """在作用域内开启计时"""
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(stage: str):
+    """计时当前阶段，未开启计时时无额外开销"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.stage(stage):
+        yield
+
+
+def on_request(request):
+    """httpx 同步请求钩子：为请求挂上 trace 回调"""
+    timings = _current.get()
+    if timings is not None:
+        request.extensions["trace"] = timings.make_trace()
+
+
+async def aon_request(request):
+    """httpx 异步请求钩子"""
+    timings = _current.get()
+    if timings is not None:
+        trace = timings.make_trace()
+
+        async def atrace(event: str, info: dict):
+            trace(event, info)
+
+        request.extensions["trace"] = atrace
@@ -1,35 +1,27 @@
 """
 工具函数
 """
-import re
+import os
 from typing import Optional
-from bs4 import BeautifulSoup
 
+# 摘要和 HTML 清洗的实现在 textnorm 中，这里保留原有的导入路径
+from textnorm import clean_html, clean_snippet, clean_snippets  # noqa: F401
 
-def clean_html(html: str) -> str:
-    """清理 HTML 标签，提取纯文本"""
-    if not html:
-        return ""
-    soup = BeautifulSoup(html, "lxml")
-    # 移除 script 和 style 标签
-    for script in soup(["script", "style"]):
-        script.decompose()
-    text = soup.get_text()
-    # 清理多余空白
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-
-def clean_snippet(snippet: str) -> str:
-    """清理搜索结果摘要"""
-    if not snippet:
-        return ""
-    # 移除多余的空白字符
-    snippet = re.sub(r'\s+', ' ', snippet)
-    # 移除常见的无关字符
-    snippet = snippet.replace('...', '')
-    snippet = snippet.replace('…', '')
-    return snippet.strip()
+
+def env_int(name: str, default: int) -> int:
+    """读取整数环境变量，未设置或格式错误时返回默认值"""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """读取浮点数环境变量，未设置或格式错误时返回默认值"""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
 
 
 def truncate_text(text: str, max_length: int = 200) -> str:
@@ -49,3 +41,37 @@ def extract_domain(url: str) -> Optional[str]:
         return parsed.netloc
     except Exception:
         return None
+
+
+# 归一化 URL 时丢弃的跟踪参数
+TRACKING_PARAMS = {
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "gclid", "fbclid", "msclkid", "spm", "from",
+}
+
+
+def normalize_url(url: str) -> str:
+    """
+    归一化 URL，用于跨引擎结果去重
+
+    忽略协议、大小写域名、www 前缀、默认端口、结尾斜杠、锚点和常见跟踪参数
+    """
+    if not url:
+        return ""
+    try:
+        from urllib.parse import urlsplit, parse_qsl, urlencode
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        port = parts.port
+        if port and port not in (80, 443):
+            host = f"{host}:{port}"
+        path = parts.path.rstrip("/")
+        query = urlencode(sorted(
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if k.lower() not in TRACKING_PARAMS
+        ))
+        return f"{host}{path}" + (f"?{query}" if query else "")
+    except Exception:
+        return url.strip().lower()
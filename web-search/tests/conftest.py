@@ -0,0 +1,21 @@
+"""测试配置：让测试直接导入 scripts 下的模块，缓存和限速状态写到临时目录"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import pytest
+
+import cache
+import ratelimit
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """每个测试使用独立的缓存目录和限速配置"""
+    monkeypatch.setenv("WEB_SEARCH_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("WEB_SEARCH_RATE_LIMIT", raising=False)
+    monkeypatch.setattr(cache, "_cache", None)
+    monkeypatch.setattr(ratelimit, "_rates", None)
+    monkeypatch.setattr(ratelimit, "_buckets", {})
+    yield
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+from engines import SearchResult
+from engines.baidu import BaiduEngine
+
+
+class Response:
+    def __init__(self, location: str = None):
+        self.status_code = 302 if location else 200
+        self.headers = {"location": location} if location else {}
+        self.text = ""
+
+
+class Client:
+    """HEAD 返回 Location，记录并发请求数的峰值"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def head(self, url, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return Response("https://target.example/" + url.rsplit("=", 1)[-1])
+
+    get = head
+
+
+class AsyncClient(Client):
+    async def head(self, url, **kwargs):
+        self.active += 1
+        self.requests += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return Response("https://target.example/" + url.rsplit("=", 1)[-1])
+
+
+def results(count: int, prefix: str = "t"):
+    return [SearchResult(title=str(i), url=f"https://www.baidu.com/link?url={prefix}{i}", snippet="")
+            for i in range(count)]
+
+
+def test_redirects_are_resolved_within_concurrency_limit():
+    client = Client()
+    engine = BaiduEngine(client=client, redirect_concurrency=3, redirect_timeout=5)
+    items = results(10)
+    engine.resolve_redirect_urls(items)
+    assert [r.url for r in items] == [f"https://target.example/t{i}" for i in range(10)]
+    assert client.peak <= 3
+
+
+def test_limit_is_shared_across_pages():
+    client = Client()
+    engine = BaiduEngine(client=client, redirect_concurrency=2, redirect_timeout=5)
+    threads = [
+        threading.Thread(target=engine.resolve_redirect_urls, args=(results(5, prefix=f"p{n}-"),))
+        for n in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert client.requests == 15
+    assert client.peak <= 2
+
+
+def test_resolved_redirects_are_cached():
+    client = Client(delay=0)
+    BaiduEngine(client=client).resolve_redirect_urls(results(4))
+    assert client.requests == 4
+
+    items = results(4)
+    BaiduEngine(client=client).resolve_redirect_urls(items)
+    assert client.requests == 4
+    assert items[0].url == "https://target.example/t0"
+
+
+def test_queued_redirects_are_dropped_after_timeout():
+    client = Client(delay=0.2)
+    engine = BaiduEngine(client=client, redirect_concurrency=1, redirect_timeout=0.1)
+    items = results(5)
+    engine.resolve_redirect_urls(items)
+    time.sleep(0.5)
+    # 只有超时前已开始的一个请求被发出
+    assert client.requests == 1
+    assert all("baidu.com/link" in r.url for r in items)
+
+
+def test_async_redirects_respect_limit():
+    client = AsyncClient()
+    engine = BaiduEngine(async_client=client, redirect_concurrency=2, redirect_timeout=5)
+    items = results(6)
+    asyncio.run(engine.aresolve_redirect_urls(items))
+    assert items[5].url == "https://target.example/t5"
+    assert client.peak <= 2
+
+
+def test_bad_env_values_fall_back_to_defaults(monkeypatch):
+    monkeypatch.setenv("BAIDU_REDIRECT_TIMEOUT", "soon")
+    monkeypatch.setenv("BAIDU_REDIRECT_CONCURRENCY", "many")
+    engine = BaiduEngine()
+    assert engine.redirect_timeout == 3.0
+    assert engine.redirect_concurrency == 4
@@ -0,0 +1,150 @@
+import threading
+import time
+
+import pytest
+
+import search
+from cache import SearchCache
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def test_entry_fresh_then_stale_then_expired(tmp_path, clock, monkeypatch):
+    monkeypatch.setenv("WEB_SEARCH_CACHE_TTL", "60")
+    store = SearchCache(str(tmp_path / "r.sqlite3"), stale_ttl=30)
+    store.set("bing", "Hello  World", 10, [{"title": "t", "url": "https://a", "snippet": ""}])
+
+    entry = store.get("bing", "hello world", 10)
+    assert entry is not None and entry.fresh
+
+    clock.now += 70
+    entry = store.get("bing", "hello world", 10)
+    assert entry is not None and not entry.fresh
+
+    clock.now += 30
+    assert store.get("bing", "hello world", 10) is None
+
+
+def test_lru_evicts_least_recently_accessed(tmp_path, clock):
+    store = SearchCache(str(tmp_path / "r.sqlite3"), max_entries=2)
+    store.set("bing", "a", 10, [])
+    clock.now += 1
+    store.set("bing", "b", 10, [])
+    clock.now += 1
+    # 访问 a 后，b 成为最久未访问的条目
+    assert store.get("bing", "a", 10) is not None
+    clock.now += 1
+    store.set("bing", "c", 10, [])
+
+    assert store.get("bing", "a", 10) is not None
+    assert store.get("bing", "b", 10) is None
+    assert store.get("bing", "c", 10) is not None
+
+
+def test_revalidate_runs_once_per_key(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    class SlowEngine:
+        def search(self, query, num_results):
+            calls.append(query)
+            release.wait(5)
+            return []
+
+    monkeypatch.setattr(search, "create_engine", lambda name: SlowEngine())
+
+    assert search._revalidate("bing", "Query", 10)
+    # 归一化后相同的查询不重复刷新
+    assert not search._revalidate("bing", "query ", 10)
+    assert search._revalidate("bing", "query", 20)
+
+    threads = [t for t in threading.enumerate() if t.name == "revalidate-bing"]
+    assert threads and all(t.daemon for t in threads)
+
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert sorted(calls) == ["Query", "query"]
+    # 刷新结束后可以再次刷新
+    assert search._revalidate("bing", "Query", 10)
+
+
+def test_engine_options_are_part_of_the_cache_key(monkeypatch):
+    from engines import SearchResult
+
+    class Engine:
+        truncated = None
+        last_error = None
+
+        def __init__(self, url):
+            self.url = url
+
+        def search(self, query, num_results):
+            return [SearchResult("t", self.url, "s")]
+
+    def create_engine(name):
+        resolve = search._cache_engine(name) != name
+        return Engine("https://target.example/" if resolve else "https://www.baidu.com/link?url=x")
+
+    monkeypatch.setattr(search, "create_engine", create_engine)
+    monkeypatch.setattr(search, "ENGINE_OPTIONS", {})
+    monkeypatch.delenv("BAIDU_RESOLVE_REDIRECTS", raising=False)
+
+    plain = search.search("hello", "baidu", 10)
+    assert plain["cache"]["status"] == "miss"
+    assert search.search("hello", "baidu", 10)["cache"]["status"] == "hit"
+
+    # 开启解析跳转链接后不会命中未解析的缓存结果
+    monkeypatch.setattr(search, "ENGINE_OPTIONS", {"baidu": {"resolve_redirects": True}})
+    resolved = search.search("hello", "baidu", 10)
+    assert resolved["cache"]["status"] == "miss"
+    assert resolved["results"][0]["url"] == "https://target.example/"
+
+    # 由环境变量开启时使用同一缓存键
+    monkeypatch.setattr(search, "ENGINE_OPTIONS", {})
+    monkeypatch.setenv("BAIDU_RESOLVE_REDIRECTS", "1")
+    again = search.search("hello", "baidu", 10)
+    assert again["cache"]["status"] == "hit"
+    assert again["results"][0]["url"] == "https://target.example/"
+
+
+def test_revalidate_takes_token_and_applies_deadline(monkeypatch):
+    import ratelimit
+    import retry
+
+    done = threading.Event()
+    seen = {}
+
+    class Bucket:
+        tokens = 0
+
+        def acquire(self):
+            Bucket.tokens += 1
+
+    class Engine:
+        def search(self, query, num_results):
+            seen["remaining"] = retry.remaining()
+            done.set()
+            return []
+
+    monkeypatch.setattr(ratelimit, "get_bucket", lambda name: Bucket())
+    monkeypatch.setattr(search, "create_engine", lambda name: Engine())
+    monkeypatch.setattr(search, "DEADLINE", None)
+
+    assert search._revalidate("bing", "query", 10)
+    assert done.wait(5)
+    assert Bucket.tokens == 1
+    assert seen["remaining"] is not None and 0 < seen["remaining"] <= search.REVALIDATE_DEADLINE
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+import ratelimit
+from engines import duckduckgo
+from engines.duckduckgo import DEFAULT_BACKENDS, DEFAULT_HEDGE_DELAY, DuckDuckGoEngine, StoppableClient
+from retry import RetryPolicy
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = 0
+
+    def request(self, *args, **kwargs):
+        self.requests += 1
+
+
+class FakeSession:
+    """
+    模拟 DDGS.text()：html 立即返回；lite 像真实后端一样连续请求多页，每页之间有延迟
+
+    failures 个调用先抛出与 DDGS.text() 相同形式（包装一层）的超时异常
+    """
+
+    def __init__(self, pages: int = 5, failures: int = 0):
+        self.client = StoppableClient(FakeClient())
+        self.timeout = 10
+        self.pages = pages
+        self.failures = failures
+        self.calls = 0
+        self.lite_done = threading.Event()
+
+    def text(self, keywords, max_results=None, backend="auto"):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise Exception(TimeoutError("timed out"))
+        if backend == "lite":
+            return self._lite()
+        self.client.request("POST", "https://html.duckduckgo.com/html")
+        return [{"title": backend, "href": f"https://example.com/{backend}", "body": ""}]
+
+    def _lite(self):
+        try:
+            for _ in range(self.pages):
+                self.client.request("POST", "https://lite.duckduckgo.com/lite/")
+                time.sleep(0.05)
+            return [{"title": "lite", "href": "https://example.com/lite", "body": ""}]
+        finally:
+            self.lite_done.set()
+
+
+class FakePool:
+    def __init__(self, **session_options):
+        self.sessions = {}
+        self.released = []
+        self.session_options = session_options
+
+    def acquire(self, backend):
+        return self.sessions.setdefault(backend, FakeSession(**self.session_options.get(backend, {})))
+
+    def release(self, backend, session):
+        self.released.append(backend)
+
+
+class Bucket:
+    def __init__(self):
+        self.tokens = 0
+
+    def acquire(self):
+        self.tokens += 1
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = Bucket()
+    monkeypatch.setattr(ratelimit, "get_bucket", lambda name: bucket)
+    return bucket
+
+
+def use_pool(monkeypatch, **session_options) -> FakePool:
+    pool = FakePool(**session_options)
+    monkeypatch.setattr(duckduckgo, "_pool", pool)
+    monkeypatch.setattr(duckduckgo, "_stats", {})
+    return pool
+
+
+def engine_with(backends, **options) -> DuckDuckGoEngine:
+    engine = DuckDuckGoEngine(backends=backends, **options)
+    engine.available_backends = lambda: list(backends)
+    engine._retry_policy = RetryPolicy(retries=2, base_delay=0)
+    return engine
+
+
+def test_default_backends_exist_in_installed_version():
+    from duckduckgo_search import DDGS
+    for backend in DEFAULT_BACKENDS:
+        assert backend == "auto" or hasattr(DDGS, f"_text_{backend}")
+    assert DuckDuckGoEngine().available_backends()
+
+
+def test_unknown_backends_fall_back_to_auto():
+    assert DuckDuckGoEngine(backends=["api"]).available_backends() == ["auto"]
+
+
+def test_invalid_hedge_delay_is_ignored(monkeypatch):
+    monkeypatch.setenv("DDG_HEDGE_DELAY", "soon")
+    assert DuckDuckGoEngine().hedge_delay is None
+    monkeypatch.setenv("DDG_HEDGE_DELAY", "0.5")
+    assert DuckDuckGoEngine().hedge_delay == 0.5
+
+
+def test_fast_leader_does_not_start_other_backends_without_stats(monkeypatch, bucket):
+    pool = use_pool(monkeypatch)
+    engine = engine_with(["html", "lite"])
+    assert engine._stagger("html") == DEFAULT_HEDGE_DELAY
+
+    results = engine.search("python")
+
+    assert [r.title for r in results] == ["html"]
+    # 尚无统计时不再同时启动全部后端
+    assert list(pool.sessions) == ["html"]
+    assert bucket.tokens == 0
+
+
+def test_losing_backend_stops_before_next_request(monkeypatch, bucket):
+    pool = use_pool(monkeypatch)
+    engine = engine_with(["lite", "html"], hedge_delay=0.01)
+
+    results = engine.search("python")
+
+    assert [r.title for r in results] == ["html"]
+    assert engine.backend == "html"
+    # 对冲启动的 html 另取了一个限速令牌
+    assert bucket.tokens == 1
+    lite = pool.sessions["lite"]
+    assert lite.lite_done.wait(2)
+    # 竞速结束后 lite 在下一次请求前放弃，不会把剩余的页都请求完
+    assert lite.client.requests < lite.pages
+    # 放弃的后端不计入失败统计，会话仍可复用
+    assert not duckduckgo._backend_stats("lite").samples
+    assert "lite" in pool.released
+
+
+def test_transient_error_retries_only_that_backend(monkeypatch, bucket):
+    pool = use_pool(monkeypatch, html={"failures": 1})
+    engine = engine_with(["html", "lite"], hedge_delay=5)
+
+    results = engine.search("python")
+
+    assert [r.title for r in results] == ["html"]
+    assert pool.sessions["html"].calls == 2
+    assert "lite" not in pool.sessions
+
+
+def test_stoppable_client_delegates_attributes():
+    client = StoppableClient(FakeClient())
+    client.request()
+    assert client.requests == 1
+    client.stop = threading.Event()
+    client.stop.set()
+    with pytest.raises(duckduckgo.RaceFinished):
+        client.request()
+    assert client.requests == 1
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from engines.google import GoogleEngine
+
+
+class Response:
+    def __init__(self, data: dict):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self) -> dict:
+        return self.data
+
+
+def page(start: int, count: int, total: int) -> dict:
+    """start 从 1 开始的一页 API 响应"""
+    data = {
+        "items": [
+            {"title": f"r{i}", "link": f"https://example.com/{i}", "snippet": ""}
+            for i in range(start, min(start + count, total + 1))
+        ],
+        "searchInformation": {"totalResults": str(total)},
+        "queries": {},
+    }
+    if start + count <= total:
+        data["queries"]["nextPage"] = [{}]
+    return data
+
+
+class Client:
+    """按 start 参数返回结果总数为 total 的分页，记录请求的 start"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.starts = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params, **kwargs):
+        with self.lock:
+            self.starts.append(params["start"])
+        return Response(page(params["start"], params["num"], self.total))
+
+
+class AsyncClient(Client):
+    async def get(self, url, params, **kwargs):
+        return Client.get(self, url, params)
+
+
+def test_zero_results_sends_no_request():
+    client = Client(total=100)
+    engine = GoogleEngine(api_key="k", cx="c", client=client)
+    assert engine.search("q", 0) == []
+    assert engine.last_error is None
+    assert client.starts == []
+
+
+def test_only_requests_pages_within_total_results():
+    client = Client(total=25)
+    engine = GoogleEngine(api_key="k", cx="c", client=client)
+    results = engine.search("q", 100)
+    assert [r.title for r in results] == [f"r{i}" for i in range(1, 26)]
+    assert sorted(client.starts) == [1, 11, 21]
+
+
+def test_async_only_requests_pages_within_total_results():
+    client = AsyncClient(total=15)
+    engine = GoogleEngine(api_key="k", cx="c", async_client=client)
+    results = asyncio.run(engine.asearch("q", 50))
+    assert len(results) == 15
+    assert sorted(client.starts) == [1, 11]
@@ -0,0 +1,36 @@
+import asyncio
+
+import http_client
+
+
+def test_configure_closes_async_clients():
+    async def main():
+        client = http_client.get_async_client()
+        http_client.configure()
+        # 关闭任务排在当前事件循环上
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return client
+
+    client = asyncio.run(main())
+    assert client.is_closed
+
+
+def test_configure_closes_client_of_idle_loop():
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(_get_client())
+        http_client.configure()
+        assert client.is_closed
+    finally:
+        loop.close()
+
+
+async def _get_client():
+    return http_client.get_async_client()
+
+
+def test_zero_timeout_disables_read_timeout():
+    timeout = http_client.HttpConfig(timeout=0, connect_timeout=5.0).client_kwargs()["timeout"]
+    assert timeout.read is None
+    assert timeout.connect == 5.0
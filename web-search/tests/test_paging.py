@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import ratelimit
+from engines import SearchResult
+from engines.bing import BingEngine
+from engines.paging import PagedEngine
+
+
+class Response:
+    def __init__(self, text: str):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class Client:
+    """按偏移量返回预设的结果页，每行一个 URL；记录请求过的偏移量"""
+
+    def __init__(self, pages: dict):
+        self.pages = pages
+        self.offsets = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        offset = params["offset"]
+        with self.lock:
+            self.offsets.append(offset)
+        return Response("\n".join(self.pages.get(offset, [])))
+
+
+class AsyncClient(Client):
+    async def get(self, url, params=None, **kwargs):
+        return Client.get(self, url, params)
+
+
+class Engine(PagedEngine):
+    base_url = "https://search.example/"
+    headers = {}
+    page_concurrency = 1
+
+    def __init__(self, client):
+        self._client = client
+        self._async_client = client
+
+    def _build_params(self, query, offset, count):
+        return {"q": query, "offset": offset}
+
+    def _parse(self, html, max_results):
+        return [SearchResult(url, url, "") for url in html.splitlines()]
+
+    @property
+    def name(self):
+        return "paged"
+
+
+class Bucket:
+    def __init__(self):
+        self.tokens = 0
+
+    def acquire(self):
+        self.tokens += 1
+
+    async def aacquire(self):
+        self.tokens += 1
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = Bucket()
+    monkeypatch.setattr(ratelimit, "get_bucket", lambda name: bucket if name == "paged" else None)
+    return bucket
+
+
+def page(offset: int, count: int = 10) -> list:
+    return [f"https://example.com/{i}" for i in range(offset, offset + count)]
+
+
+PAGES = {
+    0: page(0),
+    10: page(10),
+    # 第三页与第二页重复（引擎重复返回最后一页），视为已到末页
+    20: page(10) + ["https://example.com/10/"],
+    30: page(30),
+}
+
+
+def test_dedupes_across_pages_and_stops_at_first_page_without_new_results(bucket):
+    client = Client(PAGES)
+    results = Engine(client).search("q", 40)
+    # 第四页有新结果，但在没有新结果的第三页之后，被丢弃
+    assert [r.url for r in results] == page(0) + page(10)
+
+
+def test_async_dedupes_and_stops(bucket):
+    client = AsyncClient(PAGES)
+    results = asyncio.run(Engine(client).asearch("q", 40))
+    assert [r.url for r in results] == page(0) + page(10)
+
+
+def test_takes_rate_limit_token_for_each_later_page(bucket):
+    client = Client({offset: page(offset) for offset in range(0, 50, 10)})
+    results = Engine(client).search("q", 50)
+    assert len(results) == 50
+    # 第一页的令牌由调用方获取
+    assert bucket.tokens == 4
+
+
+def test_async_takes_rate_limit_token_for_each_later_page(bucket):
+    client = AsyncClient({offset: page(offset) for offset in range(0, 50, 10)})
+    results = asyncio.run(Engine(client).asearch("q", 50))
+    assert len(results) == 50
+    assert bucket.tokens == 4
+
+
+def test_page_waiting_for_token_is_dropped_when_iteration_stops(monkeypatch):
+    gate = threading.Event()
+    waiting = threading.Event()
+
+    class SlowBucket:
+        def acquire(self):
+            waiting.set()
+            gate.wait(2)
+
+    monkeypatch.setattr(ratelimit, "get_bucket", lambda name: SlowBucket())
+    client = Client({offset: page(offset) for offset in range(0, 30, 10)})
+    pages = Engine(client).iter_search("q", 30)
+    next(pages)
+    assert waiting.wait(2)
+    pages.close()
+    gate.set()
+    time.sleep(0.05)
+    # 第二页在排队等令牌时迭代已停止，取到令牌后不再发出请求
+    assert client.offsets == [0]
+
+
+def test_later_pages_draw_from_shared_bucket():
+    ratelimit.configure({"paged": (0.001, 2)})
+    client = Client({offset: page(offset) for offset in range(0, 30, 10)})
+    Engine(client).search("q", 30)
+    # 第二、三页取走了突发容量内的两个令牌，下一个请求需要排队
+    wait, depth = ratelimit.get_bucket("paged")._reserve()
+    assert depth == 1 and wait > 0
+
+
+def test_invalid_page_concurrency_env_uses_default(monkeypatch):
+    monkeypatch.setenv("BING_PAGE_CONCURRENCY", "many")
+    assert BingEngine().page_concurrency == 8
+
+
+def test_default_burst_covers_deepest_pagination():
+    from engines.baidu import BaiduEngine
+    for engine in (BingEngine(), BaiduEngine()):
+        bucket = ratelimit.get_bucket(engine.name)
+        # 调用方取第一页的令牌，其余分页各取一个，单个查询不需要排队
+        assert bucket.burst >= engine.max_results // engine.per_page
+        waits = [bucket._reserve()[0] for _ in range(engine.max_results // engine.per_page)]
+        assert not any(waits)
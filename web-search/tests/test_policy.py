@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import pytest
+
+from policy import CircuitBreaker, EnginePolicy
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def open_breaker(threshold: int = 2) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=60)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_admits_exactly_one_probe(clock):
+    breaker = open_breaker()
+    clock.now += 61
+    assert breaker.state == "half-open"
+    assert breaker.available()
+    assert breaker.allow()
+    assert not breaker.available()
+    assert not breaker.allow()
+    assert not breaker.allow()
+
+
+def test_probe_success_closes(clock):
+    breaker = open_breaker()
+    clock.now += 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_reopens_and_restarts_cooldown(clock):
+    breaker = open_breaker()
+    clock.now += 61
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opened_at == clock.now
+    clock.now += 30
+    assert not breaker.allow()
+    clock.now += 31
+    assert breaker.allow()
+
+
+def test_stuck_probe_expires(clock):
+    breaker = open_breaker()
+    clock.now += 61
+    assert breaker.allow()
+    clock.now += 61
+    assert breaker.allow()
+
+
+def test_policy_sends_single_probe_to_half_open_engine(clock):
+    policy = EnginePolicy(fallbacks={"bing": []}, failure_threshold=2, reset_timeout=60)
+    policy.record("bing", 0.1, False)
+    policy.record("bing", 0.1, False)
+    clock.now += 61
+    calls = []
+    release = asyncio.Event()
+
+    async def call(engine):
+        calls.append(engine)
+        await release.wait()
+        return ["result"]
+
+    async def main():
+        first = asyncio.ensure_future(policy.run("bing", call))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await policy.run("bing", call)
+        release.set()
+        return await first
+
+    results, served_by, _ = asyncio.run(main())
+    assert results == ["result"] and served_by == "bing"
+    assert calls == ["bing"]
+    assert policy.breakers["bing"].state == "closed"
+
+
+def test_cancelled_probe_releases_slot(clock):
+    policy = EnginePolicy(fallbacks={"bing": []}, failure_threshold=2, reset_timeout=60)
+    policy.record("bing", 0.1, False)
+    policy.record("bing", 0.1, False)
+    clock.now += 61
+
+    async def call(engine):
+        await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.ensure_future(policy.run("bing", call))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert policy.breakers["bing"].allow()
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucket, parse_rate_limits
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("bing=2:5, baidu=0.5") == {"bing": (2.0, 5), "baidu": (0.5, 1)}
+    with pytest.raises(ValueError):
+        parse_rate_limits("bing")
+    with pytest.raises(ValueError):
+        parse_rate_limits("bing=-1")
+
+
+def test_burst_then_queue(tmp_path, clock):
+    bucket = TokenBucket("bing", rate=2.0, burst=3, path=str(tmp_path / "rl.sqlite3"))
+    assert [bucket._reserve() for _ in range(3)] == [(0.0, 0)] * 3
+    # 突发容量用完后按速率排队
+    assert bucket._reserve() == (0.5, 1)
+    assert bucket._reserve() == (1.0, 2)
+
+
+def test_tokens_refill_over_time(tmp_path, clock):
+    bucket = TokenBucket("bing", rate=1.0, burst=2, path=str(tmp_path / "rl.sqlite3"))
+    bucket._reserve()
+    bucket._reserve()
+    assert bucket._reserve()[0] == 1.0
+    clock.now += 10
+    # 补充的令牌不超过突发容量
+    assert bucket._reserve() == (0.0, 0)
+    assert bucket._reserve() == (0.0, 0)
+    assert bucket._reserve()[0] == 1.0
+
+
+def test_buckets_share_state_by_path(tmp_path, clock):
+    path = str(tmp_path / "rl.sqlite3")
+    TokenBucket("baidu", rate=0.5, burst=1, path=path)._reserve()
+    assert TokenBucket("baidu", rate=0.5, burst=1, path=path)._reserve() == (2.0, 1)
+
+
+def test_get_bucket_respects_configuration():
+    ratelimit.configure({"bing": (0.0, 1)})
+    assert ratelimit.get_bucket("bing") is None
+    assert ratelimit.get_bucket("google") is None
+    assert ratelimit.get_bucket("baidu").rate == 0.5
+
+
+def test_unwritable_state_skips_limiting_with_warning(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    bucket = TokenBucket("bing", 1.0, 1, path=str(blocker / "ratelimit.sqlite3"))
+    for _ in range(3):
+        meta = bucket.acquire()
+        assert meta["waited"] == 0 and meta["queue_depth"] == 0
+        assert meta["warning"].startswith("限速状态不可用")
+
+
+def test_search_works_when_cache_dir_is_unwritable(tmp_path, monkeypatch):
+    import search
+    from engines import SearchResult
+
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("WEB_SEARCH_CACHE_DIR", str(blocker / "cache"))
+
+    class Engine:
+        truncated = None
+        last_error = None
+
+        def search(self, query, num_results):
+            return [SearchResult("t", "https://example.com/", "s")]
+
+    monkeypatch.setattr(search, "create_engine", lambda name: Engine())
+    output = search.search("hello", "bing", 10, cache="off")
+    assert output["count"] == 1
+    assert "warning" in output["rate_limit"]
@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+from server import SearchServer
+
+
+async def fake_search(query, engine, num_results, cache):
+    return {"query": query, "engine": engine, "count": 0, "results": []}
+
+
+def dispatch(method: str, target: str, body: bytes = b""):
+    server = SearchServer(fake_search, address="127.0.0.1:0")
+    status, payload, _ = asyncio.run(server._dispatch(method, target, body))
+    return status, json.loads(payload)
+
+
+@pytest.mark.parametrize("body", [b"[1]", b'"q"', b"null", b"3"])
+def test_post_body_must_be_object(body):
+    status, payload = dispatch("POST", "/search", body)
+    assert status == 400
+    assert "JSON 对象" in payload["error"]
+
+
+def test_post_rejects_non_string_query():
+    status, _ = dispatch("POST", "/search", b'{"query": ["a"]}')
+    assert status == 400
+
+
+def test_post_rejects_bad_num():
+    status, _ = dispatch("POST", "/search", b'{"query": "a", "num": [1]}')
+    assert status == 400
+
+
+def test_post_search():
+    status, payload = dispatch("POST", "/search", b'{"query": "python", "engine": "bing"}')
+    assert status == 200
+    assert payload["query"] == "python" and payload["engine"] == "bing"
+
+
+def test_get_search():
+    status, payload = dispatch("GET", "/search?q=python&engine=bing")
+    assert status == 200 and payload["query"] == "python"
+
+
+def test_no_automatic_tcp_fallback_without_unix_sockets(monkeypatch):
+    import socket
+    import server
+
+    monkeypatch.delenv("WEB_SEARCH_SERVER", raising=False)
+    monkeypatch.delattr(socket, "AF_UNIX", raising=False)
+    assert server.default_address() is None
+
+    def fail(*args, **kwargs):
+        raise AssertionError("不应尝试连接守护进程")
+
+    monkeypatch.setattr(server, "_connection", fail)
+    monkeypatch.setattr(server, "_reachable", fail)
+    assert server.request_search("hello", "bing") is None
+
+    monkeypatch.setenv("WEB_SEARCH_SERVER", "127.0.0.1:9")
+    assert server.default_address() == "127.0.0.1:9"